@@ -0,0 +1 @@
+"""Benchmarks and checks of the pipeline, run with `python -m benchmarks.<name>`."""
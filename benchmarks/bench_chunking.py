@@ -0,0 +1,86 @@
+"""Compare the prompts built from whole documents and from retrieved chunks.
+
+Every PDF of the corpus is extracted and chunked once. For a topic, the best
+documents (as retrieved before chunking) and the best chunks are picked by
+word overlap with the topic, standing in for the vector search, and the prompt
+of each is built. The script reports the chunk statistics, the chunking time
+and the estimated prompt tokens of both. The end-to-end generation latency is
+reported per presentation in the `generation_s` field of the traces.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_chunking path/to/pdfs --topic "attention models"
+"""
+
+import argparse
+import re
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.processing import (
+    ExtractionConfig,
+    chunk_document,
+    estimate_tokens,
+    iter_documents,
+)
+from src.processing.chunking import CHUNK_OVERLAP, CHUNK_TOKENS
+from src.services.prompt import build_prompt
+
+
+def overlap_score(topic: str, text: str) -> int:
+    """Number of distinct words of the topic found in a text."""
+    words = set(re.findall(r"\w+", text.lower()))
+    return len(set(re.findall(r"\w+", topic.lower())) & words)
+
+
+def top(items: list[tuple[str, dict]], topic: str, k: int) -> list[tuple[str, dict]]:
+    """The `k` items whose text shares the most words with the topic."""
+    return sorted(items, key=lambda item: -overlap_score(topic, item[0]))[:k]
+
+
+def main() -> None:
+    """Parse the arguments, build both prompts and print the comparison."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_dir", help="Directory with the PDF corpus.")
+    parser.add_argument("--topic", default="", help="Topic of the presentation.")
+    parser.add_argument("--documents", type=int, default=2, help="Whole documents.")
+    parser.add_argument("--chunks", type=int, default=8, help="Retrieved chunks.")
+    parser.add_argument("--max-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP)
+    args = parser.parse_args()
+
+    pdf_files = sorted(str(p) for p in Path(args.pdf_dir).rglob("*.pdf"))
+    print(f"📚 {len(pdf_files)} PDFs from {args.pdf_dir}")
+
+    documents: list[tuple[str, dict]] = []
+    chunks: list[tuple[str, dict]] = []
+    chunking_s = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        config = ExtractionConfig(asset_dir=tmp)
+        for _, text, metadata in iter_documents(pdf_files, config, []):
+            start = time.perf_counter()
+            chunks += chunk_document(text, metadata, args.max_tokens, args.overlap)
+            chunking_s += time.perf_counter() - start
+            metadata.pop("page_starts", None)
+            documents.append((text, metadata))
+
+    sizes = [estimate_tokens(text) for text, _ in chunks]
+    print(
+        f"✂️ {len(chunks)} chunks of {args.max_tokens} tokens at most "
+        f"(mean {statistics.mean(sizes):.0f}, max {max(sizes)}) "
+        f"in {chunking_s * 1000:.1f} ms"
+    )
+
+    for label, picked in (
+        (f"{args.documents} documents", top(documents, args.topic, args.documents)),
+        (f"{args.chunks} chunks", top(chunks, args.topic, args.chunks)),
+    ):
+        texts = [text for text, _ in picked]
+        metadatas = [metadata for _, metadata in picked]
+        prompt = build_prompt(texts, metadatas, "16:9", args.topic)
+        print(f"📝 {label}: {estimate_tokens(prompt)} prompt tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark the drawing clustering engine against the former rtree + DFS grouping.
+
+Pages of scattered markers are timed, then pages where the drawings heavily
+overlap, e.g. a dense scatter plot, and the drawings of real PDFs if given.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_clustering --sizes 1000 10000 100000 \
+        --dense-sizes 1000 10000 30000 --pdf-dir path/to/pdfs
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+import fitz
+from rtree import index
+
+from src.processing.drawing_clustering import cluster_boxes
+
+
+def legacy_group_bounding_boxes(bboxes, threshold=50) -> list:
+    """Former grouping: rtree adjacency list and a recursive DFS."""
+    idx = index.Index()
+    for i, rect in enumerate(bboxes):
+        idx.insert(i, rect + (-threshold, -threshold, threshold, threshold))
+
+    adj_list = defaultdict(list)
+    for i, rect in enumerate(bboxes):
+        expanded = rect + (-threshold, -threshold, threshold, threshold)
+        for j in idx.intersection(expanded):
+            if i != j:
+                adj_list[i].append(j)
+
+    visited = [False] * len(bboxes)
+    components = []
+
+    def dfs(node, component):
+        visited[node] = True
+        component.append(bboxes[node])
+        for neighbor in adj_list[node]:
+            if not visited[neighbor]:
+                dfs(neighbor, component)
+
+    for i in range(len(bboxes)):
+        if not visited[i]:
+            component: list = []
+            dfs(i, component)
+            components.append(component)
+
+    merged = []
+    for group in components:
+        combined = group[0]
+        for bbox in group[1:]:
+            combined = combined | bbox
+        merged.append(combined)
+    return merged
+
+
+def legacy_process_large_drawing(bboxes, max_drawings=800, threshold=5) -> list:
+    """Former chunked grouping used for pages with many drawings."""
+    if len(bboxes) < max_drawings:
+        return legacy_group_bounding_boxes(bboxes, threshold=threshold)
+    results = []
+    for start in range(0, len(bboxes), max_drawings):
+        chunk = bboxes[start : start + max_drawings]
+        results.extend(legacy_group_bounding_boxes(chunk, threshold=threshold))
+    return legacy_group_bounding_boxes(results, threshold=threshold)
+
+
+def synthetic_page(num_drawings: int, seed: int = 0) -> list[fitz.Rect]:
+    """Random plot-like page: small markers, line segments and a few axes."""
+    rng = random.Random(seed)
+    bboxes = []
+    for _ in range(num_drawings):
+        x, y = rng.uniform(50, 550), rng.uniform(50, 750)
+        if rng.random() < 0.02:
+            bboxes.append(fitz.Rect(x, y, x + rng.uniform(50, 300), y))
+        else:
+            bboxes.append(fitz.Rect(x, y, x + rng.uniform(0, 3), y + rng.uniform(0, 3)))
+    return bboxes
+
+
+def dense_page(num_drawings: int, seed: int = 0) -> list[fitz.Rect]:
+    """Dense scatter plot: markers piled up in a small area, all overlapping."""
+    rng = random.Random(seed)
+    bboxes = []
+    for _ in range(num_drawings):
+        x, y = rng.uniform(200, 240), rng.uniform(300, 340)
+        bboxes.append(fitz.Rect(x, y, x + rng.uniform(0, 30), y + rng.uniform(0, 30)))
+    return bboxes
+
+
+def timed(func, *args, **kwargs) -> tuple[float, Any]:
+    """Run a function and return its wall-clock time and result (or the error)."""
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except RecursionError as e:
+        result = e
+    return time.perf_counter() - start, result
+
+
+def report(label: str, bboxes: list, threshold: float) -> None:
+    """Print the timings of both implementations on one set of boxes."""
+    t_new, new = timed(cluster_boxes, bboxes, threshold=threshold)
+    t_old, old = timed(legacy_process_large_drawing, bboxes, threshold=threshold)
+    old_groups = "RecursionError" if isinstance(old, Exception) else len(old)
+    print(
+        f"{label:<40} {len(bboxes):>8} {t_old:>10.3f} {t_new:>10.3f}"
+        f" {old_groups!s:>15} {len(new):>8}"
+    )
+
+
+def main() -> None:
+    """Parse the arguments and print the comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument(
+        "--dense-sizes", type=int, nargs="+", default=[1000, 10000, 30000]
+    )
+    parser.add_argument("--threshold", type=float, default=5)
+    parser.add_argument("--pdf-dir", help="Optional directory with real PDFs.")
+    args = parser.parse_args()
+
+    print(
+        f"{'page':<40} {'drawings':>8} {'legacy s':>10} {'engine s':>10}"
+        f" {'legacy groups':>15} {'groups':>8}"
+    )
+    for size in args.sizes:
+        report(f"synthetic-{size}", synthetic_page(size), args.threshold)
+    for size in args.dense_sizes:
+        report(f"dense-{size}", dense_page(size), args.threshold)
+
+    if args.pdf_dir:
+        for pdf_path in sorted(Path(args.pdf_dir).rglob("*.pdf")):
+            doc = fitz.open(pdf_path)
+            for page in doc:
+                drawings = page.get_drawings()
+                bboxes = [fitz.Rect(d["rect"]) for d in drawings if d.get("rect")]
+                if len(bboxes) >= 100:
+                    report(f"{pdf_path.name}#{page.number}", bboxes, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.setrecursionlimit(10000)
+    main()
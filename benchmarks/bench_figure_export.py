@@ -0,0 +1,146 @@
+"""Compare the export of vector figures as PNG renderings and as PDF clips.
+
+The vector figures of every PDF of the corpus are identified once, then exported
+in both formats. The script reports the time spent and the bytes written per
+format and, when `pdflatex` is installed, the compile time of a document
+including all the figures of each format.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_figure_export path/to/pdfs
+"""
+
+import argparse
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+from src.processing.asset_store import AssetStore
+from src.processing.document_pool import get_document_pool
+from src.processing.images_processing import (
+    FIGURE_ZOOM,
+    clip_has_raster,
+    extract_vector,
+    render_figure,
+)
+from src.processing.page_layout import PageLayout
+
+
+def figure_clips(pdf_path: str, store: AssetStore) -> list[tuple[int, fitz.Rect]]:
+    """Identify the vector figures of a PDF file by their rendering recipes.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        store (AssetStore): Store receiving the rendering recipes.
+
+    Returns:
+        list: The page number and clip rectangle of every figure.
+    """
+    clips = []
+    with get_document_pool().open(pdf_path) as doc:
+        for page_num, page in enumerate(doc):
+            figures = extract_vector(
+                Path(pdf_path).stem,
+                page,
+                page_num,
+                PageLayout(page),
+                store,
+                page_hash="benchmark",
+                pdf_path=pdf_path,
+            )
+            for fig in figures:
+                recipe = store.recipe(fig.name)
+                if recipe is not None:
+                    clips.append((recipe["page"], fitz.Rect(recipe["clip"])))
+    return clips
+
+
+def export(pdf_files: list[str], fmt: str, out_dir: Path) -> tuple[float, int, int]:
+    """Export the vector figures of a corpus in one format.
+
+    Args:
+        pdf_files (list[str]): Paths to the PDF files.
+        fmt (str): The output format, "png" or "pdf".
+        out_dir (Path): Directory receiving the figures.
+
+    Returns:
+        tuple: The elapsed seconds, the number of figures and the bytes written.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    store = AssetStore(out_dir / "assets")
+    seconds = 0.0
+    count = size = 0
+    for doc_num, pdf_path in enumerate(pdf_files):
+        clips = figure_clips(pdf_path, store)
+        with get_document_pool().open(pdf_path) as doc:
+            for page_num, clip in clips:
+                page = doc[page_num]
+                # Clips with raster content are always rendered, compare the others
+                if clip_has_raster(page, clip):
+                    continue
+                start = time.perf_counter()
+                data = render_figure(page, clip, FIGURE_ZOOM, fmt)
+                seconds += time.perf_counter() - start
+                (out_dir / f"fig{doc_num}_{count}.{fmt}").write_bytes(data)
+                count += 1
+                size += len(data)
+    return seconds, count, size
+
+
+def compile_time(figures_dir: Path) -> float:
+    """Compile a LaTeX document including every figure of a directory.
+
+    Args:
+        figures_dir (Path): Directory with the figures.
+
+    Returns:
+        float: The elapsed seconds of `pdflatex`.
+    """
+    body = "\n".join(
+        f"\\includegraphics[width=0.5\\linewidth]{{{path.name}}}\\par"
+        for path in sorted(figures_dir.glob("*.*"))
+        if path.suffix in (".png", ".pdf")
+    )
+    tex = (
+        "\\documentclass{article}\n\\usepackage{graphicx}\n"
+        f"\\begin{{document}}\n{body}\n\\end{{document}}\n"
+    )
+    (figures_dir / "main.tex").write_text(tex, encoding="utf-8")
+    start = time.perf_counter()
+    subprocess.run(
+        ["pdflatex", "-interaction=nonstopmode", "main.tex"],
+        cwd=figures_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Parse the arguments, export the figures in both formats and print the summary."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_dir", help="Directory with the PDF corpus.")
+    args = parser.parse_args()
+
+    pdf_files = sorted(str(p) for p in Path(args.pdf_dir).rglob("*.pdf"))
+    print(f"📚 {len(pdf_files)} PDFs from {args.pdf_dir}")
+
+    has_latex = shutil.which("pdflatex") is not None
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("png", "pdf"):
+            out_dir = Path(tmp) / fmt
+            seconds, count, size = export(pdf_files, fmt, out_dir)
+            line = f"{fmt}: {count} figures, {size / 1024:.0f} KiB in {seconds:.2f} s"
+            if has_latex and count:
+                line += f", compiled in {compile_time(out_dir):.2f} s"
+            print(f"🖼️ {line}")
+    if not has_latex:
+        print("⚠️ pdflatex not found, compile times skipped")
+
+
+if __name__ == "__main__":
+    main()
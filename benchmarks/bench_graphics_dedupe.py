@@ -0,0 +1,54 @@
+"""Benchmark the near-duplicate graphics deduplication on a corpus.
+
+The documents of the corpus are extracted, with lazy figures, and deduplicated
+as if all were retrieved together. The prompt entries and tokens removed are
+reported.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_graphics_dedupe path/to/pdfs
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from src.processing import dedupe_graphics
+from src.processing.document_processing import read_pdf_content
+from src.processing.extraction_config import ExtractionConfig
+
+
+def passages(pdf_files: list[str], asset_dir: str) -> list[dict]:
+    """Extract the PDF files, with lazy figures, and return one chunk metadata
+    per document."""
+    config = ExtractionConfig(
+        asset_dir=asset_dir, max_workers=1, isolated=False, lazy_figures=True
+    )
+    metadatas = []
+    for pdf_path in pdf_files:
+        _, metas = read_pdf_content(pdf_path, config)
+        metadatas.append(
+            {"pdf_path": pdf_path, "images_passage": metas["images_passage"]}
+        )
+    return metadatas
+
+
+def main() -> None:
+    """Deduplicate the graphics of the whole corpus and print the savings."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_dir", help="Directory with the PDF corpus.")
+    args = parser.parse_args()
+
+    pdf_files = sorted(str(p) for p in Path(args.pdf_dir).rglob("*.pdf"))
+    with tempfile.TemporaryDirectory() as tmp:
+        metadatas = passages(pdf_files, tmp)
+    entries = sum(len(meta["images_passage"].splitlines()) for meta in metadatas)
+    _, stats = dedupe_graphics(metadatas)
+    print(
+        f"📚 {len(pdf_files)} PDFs, {entries} graphics: {stats['groups_merged']} "
+        f"groups of near-duplicates, {stats['entries_removed']} prompt entries and "
+        f"{stats['tokens_removed']} tokens removed"
+    )
+
+
+if __name__ == "__main__":
+    main()
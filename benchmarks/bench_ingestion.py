@@ -0,0 +1,60 @@
+"""Benchmark the scaling of PDF ingestion with the number of worker processes.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_ingestion path/to/pdfs --workers 1 2 4 8
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from src.processing import ExtractionConfig, process_documents
+
+
+def run(pdf_files: list[str], workers: int, repeats: int) -> float:
+    """Time `process_documents` for a given pool size.
+
+    Args:
+        pdf_files (list[str]): PDF files to ingest.
+        workers (int): Number of worker processes.
+        repeats (int): Number of runs, the best one is reported.
+
+    Returns:
+        float: Best wall-clock time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, _, failed = process_documents(
+            pdf_files, ExtractionConfig(max_workers=workers)
+        )
+        best = min(best, time.perf_counter() - start)
+        if failed:
+            print(f"⚠️ {len(failed)} files failed with {workers} workers")
+    return best
+
+
+def main() -> None:
+    """Parse the arguments and print the scaling table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_dir", help="Directory with the PDF corpus.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    pdf_files = sorted(str(p) for p in Path(args.pdf_dir).rglob("*.pdf"))
+    print(f"📚 {len(pdf_files)} PDFs from {args.pdf_dir}")
+
+    baseline = None
+    print(f"{'workers':>8} {'seconds':>9} {'PDFs/s':>8} {'speedup':>8}")
+    for workers in args.workers:
+        seconds = run(pdf_files, workers, args.repeats)
+        baseline = baseline or seconds
+        print(
+            f"{workers:>8} {seconds:>9.2f} {len(pdf_files) / seconds:>8.2f}"
+            f" {baseline / seconds:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
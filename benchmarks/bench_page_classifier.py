@@ -0,0 +1,74 @@
+"""Check that the page classifier leaves the extracted figures unchanged.
+
+Every PDF of the corpus is extracted with and without the page classifier. The
+script fails if any document yields a different set of images and figures, and
+reports the pages skipped and the time spent on both runs.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_page_classifier path/to/pdfs
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from src.processing.document_processing import iter_page_records
+from src.processing.extraction_config import ExtractionConfig
+
+
+def extract(pdf_path: str, classify_pages: bool) -> tuple[list, list, float]:
+    """Extract the graphics of a PDF file.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        classify_pages (bool): Whether the page classifier is enabled.
+
+    Returns:
+        tuple: The sorted graphics names, the page decisions and the elapsed seconds.
+    """
+    config = ExtractionConfig(max_workers=1, classify_pages=classify_pages)
+    start = time.perf_counter()
+    names = []
+    decisions = []
+    for record in iter_page_records(pdf_path, config=config):
+        names += [fig.name for fig in record.graphics]
+        decisions.append(record.decision)
+    return sorted(names), decisions, time.perf_counter() - start
+
+
+def main() -> None:
+    """Parse the arguments, compare both runs and print the summary."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_dir", help="Directory with the PDF corpus.")
+    args = parser.parse_args()
+
+    pdf_files = sorted(str(p) for p in Path(args.pdf_dir).rglob("*.pdf"))
+    print(f"📚 {len(pdf_files)} PDFs from {args.pdf_dir}")
+
+    mismatches = 0
+    pages = skipped = 0
+    time_with = time_without = 0.0
+    for pdf_path in pdf_files:
+        reference, _, seconds_without = extract(pdf_path, classify_pages=False)
+        names, decisions, seconds_with = extract(pdf_path, classify_pages=True)
+        time_without += seconds_without
+        time_with += seconds_with
+        pages += len(decisions)
+        skipped += sum(1 for decision in decisions if not decision["vector"])
+        if names != reference:
+            mismatches += 1
+            print(
+                f"❌ {pdf_path}: {len(reference)} graphics without, {len(names)} with"
+            )
+
+    print(f"📄 {skipped}/{pages} pages skipped by the classifier")
+    print(f"⏱️ {time_without:.2f} s without, {time_with:.2f} s with the classifier")
+    if mismatches:
+        print(f"❌ {mismatches} documents with different graphics")
+        sys.exit(1)
+    print("✅ Same graphics extracted from every document")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Compare the memory and serialised size of graphics records and dictionaries.
+
+Figures are extracted from the corpus, or generated when no corpus is given,
+and held both as the dictionaries used before and as `FigureRecord` objects.
+The script reports, per 1,000 figures, the memory allocated for each form, the
+size of their pickles, and the time to serialise and read them back.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_records [path/to/pdfs] --count 100000
+"""
+
+import argparse
+import pickle
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from src.processing.document_processing import iter_page_records
+from src.processing.extraction_config import ExtractionConfig
+from src.processing.records import FigureRecord, GraphicRecord
+
+
+def corpus_figures(pdf_dir: str) -> list[GraphicRecord]:
+    """Extract the images and figures of every PDF of a directory."""
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        config = ExtractionConfig(asset_dir=tmp, max_workers=1)
+        for pdf_path in sorted(str(p) for p in Path(pdf_dir).rglob("*.pdf")):
+            for page in iter_page_records(pdf_path, config=config):
+                records += page.graphics
+    return records
+
+
+def synthetic_figures(count: int) -> list[GraphicRecord]:
+    """Generate figures shaped like the extracted ones."""
+    return [
+        FigureRecord(
+            f"docpaper_{num % 50:02d}_page{num % 30}_fig{num % 4}_hash{num:08x}.png",
+            f"Figure {num}: Results of the experiment {num} on the test set.",
+            "horizontal",
+            f"{num:032x}",
+            num % 30,
+            (72.0 + num % 7, 100.5, 520.25, 340.0 + num % 11),
+        )
+        for num in range(count)
+    ]
+
+
+def as_dicts(records: list[GraphicRecord]) -> list[dict]:
+    """The dictionaries holding the same metadata, bbox included."""
+    return [
+        {
+            "name": record.name,
+            "caption": record.caption,
+            "ratio": record.ratio,
+            "hash": record.hash,
+            "page": record.page,
+            "bbox": tuple(record.bbox),
+        }
+        for record in records
+    ]
+
+
+def allocated(build) -> tuple[object, int]:
+    """Build an object and measure the memory allocated for it."""
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def main() -> None:
+    """Parse the arguments, measure both forms and print the comparison."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_dir", nargs="?", help="Directory with the PDF corpus.")
+    parser.add_argument("--count", type=int, default=100_000, help="Figures.")
+    args = parser.parse_args()
+
+    source = corpus_figures(args.pdf_dir) if args.pdf_dir else []
+    if not source:
+        source = synthetic_figures(args.count)
+    # Both forms are read back from a pickle and own their strings
+    source_bytes = pickle.dumps(source, protocol=5)
+    per_k = 1000 / len(source)
+    print(f"🖼️ {len(source)} graphics")
+
+    records, records_size = allocated(lambda: pickle.loads(source_bytes))
+    dicts, dicts_size = allocated(lambda: as_dicts(pickle.loads(source_bytes)))
+    print(
+        f"🧠 memory per 1,000: {dicts_size * per_k / 1024:.0f} KiB as dicts, "
+        f"{records_size * per_k / 1024:.0f} KiB as records"
+    )
+
+    for label, dump, load in (
+        ("dicts pickle", lambda: pickle.dumps(dicts, protocol=5), pickle.loads),
+        ("records pickle", lambda: pickle.dumps(records, protocol=5), pickle.loads),
+    ):
+        start = time.perf_counter()
+        data = dump()
+        dump_s = time.perf_counter() - start
+        start = time.perf_counter()
+        load(data)
+        load_s = time.perf_counter() - start
+        print(
+            f"📦 {label}: {len(data) * per_k / 1024:.0f} KiB per 1,000, "
+            f"{dump_s * 1000:.1f} ms to write, {load_s * 1000:.1f} ms to read"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compare the full and incremental extraction of revised PDF files.
+
+Every PDF of the corpus is extracted and recorded in a page manifest, then
+revised by removing a page and editing another one. The revised file is
+extracted again from its changed pages only, and from scratch. The script
+fails if both extractions yield different text, and reports the pages reused
+and the time of both extractions.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_revision path/to/pdfs
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+from src.processing.asset_store import AssetStore
+from src.processing.document_processing import iter_documents
+from src.processing.extraction_config import ExtractionConfig
+from src.processing.page_manifest import PageManifest, finish_page_reuse
+
+
+def revise(pdf_path: str) -> None:
+    """Remove the second page of a PDF file and add a sentence to the fourth one."""
+    doc = fitz.open(pdf_path)
+    if doc.page_count > 2:
+        doc.delete_page(1)
+    page = doc[min(3, doc.page_count - 1)]
+    page.insert_text((50, 50), "A sentence added by the revision.")
+    revised_path = f"{pdf_path}.revised"
+    doc.save(revised_path)
+    doc.close()
+    os.replace(revised_path, pdf_path)
+
+
+def extract(pdf_path: str, asset_dir: str, previous=None) -> tuple[str, dict, float]:
+    """Extract a PDF file, reusing the unchanged pages of its former version.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        asset_dir (str): Root of the asset store.
+        previous (dict, optional): Page manifest entry of the former version.
+
+    Returns:
+        tuple: The text, the metadata and the elapsed seconds.
+    """
+    config = ExtractionConfig(asset_dir=asset_dir, max_workers=1, isolated=False)
+    start = time.perf_counter()
+    documents = iter_documents(
+        [pdf_path], config, [], {pdf_path: previous} if previous is not None else None
+    )
+    [(_, text, metadata)] = list(documents)
+    return text, metadata, time.perf_counter() - start
+
+
+def main() -> None:
+    """Parse the arguments, revise every PDF and print the comparison."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_dir", help="Directory with the PDF corpus.")
+    args = parser.parse_args()
+
+    pdf_files = sorted(str(p) for p in Path(args.pdf_dir).rglob("*.pdf"))
+    print(f"📚 {len(pdf_files)} PDFs from {args.pdf_dir}")
+
+    mismatches = []
+    totals = {"reused": 0, "pages": 0, "full_s": 0.0, "incremental_s": 0.0}
+    config = ExtractionConfig()
+    for pdf_num, source in enumerate(pdf_files):
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = str(Path(tmp) / f"paper{pdf_num}.pdf")
+            shutil.copy(source, pdf_path)
+            assets = str(Path(tmp) / "assets")
+            manifest = PageManifest(Path(tmp) / "pages")
+            text, metadata, _ = extract(pdf_path, assets)
+            manifest.record(pdf_path, "v1", config.extractor_tag, text, metadata)
+
+            entry = manifest.get(pdf_path)
+            if entry is None:
+                sys.exit(f"❌ {source}: its pages were not recorded")
+
+            revise(pdf_path)
+            text, metadata, incremental_s = extract(pdf_path, assets, entry)
+            hashes = metadata["page_hashes"]
+            reused = finish_page_reuse(
+                AssetStore(assets), entry, hashes, metadata["images_passage"]
+            )
+            full_text, _, full_s = extract(pdf_path, str(Path(tmp) / "fresh"))
+
+        if text != full_text:
+            mismatches.append(source)
+        totals["reused"] += reused
+        totals["pages"] += len(hashes)
+        totals["full_s"] += full_s
+        totals["incremental_s"] += incremental_s
+        print(
+            f"📄 {Path(source).name}: {reused}/{len(hashes)} pages reused, "
+            f"{full_s:.2f} s full, {incremental_s:.2f} s incremental"
+        )
+
+    print(
+        f"♻️ {totals['reused']}/{totals['pages']} pages reused, "
+        f"{totals['full_s']:.2f} s full, {totals['incremental_s']:.2f} s incremental"
+    )
+    for source in mismatches:
+        print(f"❌ {source}: the incremental text differs from the full extraction")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
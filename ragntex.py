@@ -2,17 +2,20 @@
 
 import os
 
-from src import demo, init_telemetry
+# The extraction workers run this script again under another name, they must
+# neither build the application nor launch it
+if __name__ == "__main__":
+    from src import demo, init_telemetry
 
-# Setup OpenTelemetry
-_ = init_telemetry()
+    # Setup OpenTelemetry
+    _ = init_telemetry()
 
-# Run Gradio
-if os.getenv("IN_DOCKER") == "true":
-    os.chdir("/")
-    demo.launch(
-        server_name="0.0.0.0",  # nosec: intentional bind all interfaces for HuggingFace Spaces
-        server_port=7860,
-    )
-else:
-    demo.launch(share=True)
+    # Run Gradio
+    if os.getenv("IN_DOCKER") == "true":
+        os.chdir("/")
+        demo.launch(
+            server_name="0.0.0.0",  # nosec: intentional bind all interfaces for HuggingFace Spaces
+            server_port=7860,
+        )
+    else:
+        demo.launch(share=True)
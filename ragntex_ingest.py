@@ -0,0 +1,130 @@
+"""RAGnTex: pre-ingest a corpus of PDF files into a persistent collection.
+
+The PDF files of a directory tree are extracted in parallel, embedded under
+an optional rate limit and stored in a Chroma collection persisted on disk.
+Finished files are logged to a checkpoint, so an interrupted run resumes where
+it stopped when started again with the same arguments. A throughput report
+(PDFs, pages and embeddings per second) is written next to the collection, and
+so are the extracted graphics, under `<db-path>/<collection>.files`. The app
+retrieves from the collection named by CORPUS_COLLECTION (default "corpus")
+along with the files uploaded in each session.
+
+Usage:
+    python ragntex_ingest.py path/to/corpus --db-path chroma --collection corpus \
+        --workers 8 --requests-per-min 1500
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("corpus_dir", type=Path, help="root of the PDF files")
+    parser.add_argument(
+        "--db-path",
+        type=Path,
+        default=Path(os.getenv("CHROMA_PATH", "chroma")),
+        help="directory of the persistent collections (CHROMA_PATH)",
+    )
+    parser.add_argument("--collection", default="corpus", help="collection name")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="extraction worker processes (INGEST_WORKERS)",
+    )
+    parser.add_argument(
+        "--requests-per-min",
+        type=int,
+        default=None,
+        help="embedding requests per minute, 0 for no limit (EMBED_REQUESTS_PER_MIN)",
+    )
+    parser.add_argument(
+        "--in-flight",
+        type=int,
+        default=None,
+        help="embedding requests awaiting a response at once (EMBED_IN_FLIGHT)",
+    )
+    parser.add_argument(
+        "--batch-files", type=int, default=32, help="files ingested per batch"
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="ingest again the files which failed in an earlier run",
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="delete the collection, its graphics and its checkpoint first",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=None,
+        help="checkpoint log, <db-path>/<collection>.checkpoint.jsonl by default",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=None,
+        help="throughput report, <db-path>/<collection>.report.json by default",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Ingest the corpus and write the throughput report."""
+    args = parse_args()
+    if not args.corpus_dir.is_dir():
+        sys.exit(f"❌ Not a directory: {args.corpus_dir}")
+
+    # The settings are read when the database modules are imported
+    os.environ["CHROMA_PATH"] = str(args.db_path)
+    if args.workers is not None:
+        os.environ["INGEST_WORKERS"] = str(args.workers)
+    if args.requests_per_min is not None:
+        os.environ["EMBED_REQUESTS_PER_MIN"] = str(args.requests_per_min)
+    if args.in_flight is not None:
+        os.environ["EMBED_IN_FLIGHT"] = str(args.in_flight)
+
+    # pylint: disable=import-outside-toplevel
+    from src import init_telemetry
+    from src.database import clean_db, ingest_corpus
+
+    _ = init_telemetry()
+    checkpoint = args.checkpoint or args.db_path / f"{args.collection}.checkpoint.jsonl"
+    report_path = args.report or args.db_path / f"{args.collection}.report.json"
+    if args.reset:
+        clean_db(args.collection)
+        checkpoint.unlink(missing_ok=True)
+    try:
+        report = ingest_corpus(
+            args.corpus_dir,
+            args.collection,
+            checkpoint,
+            batch_files=args.batch_files,
+            retry_failed=args.retry_failed,
+        )
+    except KeyboardInterrupt:
+        sys.exit("🛑 Interrupted, run the same command again to resume.")
+
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report.as_dict(), indent=2), encoding="utf-8")
+    rates = report.rates()
+    print(
+        f"✅ {report.done} PDFs ingested ({report.skipped} skipped, "
+        f"{report.failed} failed) in {report.seconds:.1f} s: "
+        f"{rates['pdfs_per_s']:.2f} PDFs/s, {rates['pages_per_s']:.1f} pages/s, "
+        f"{rates['embeddings_per_s']:.1f} embeddings/s"
+    )
+    print(f"📄 Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
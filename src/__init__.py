@@ -1,11 +1,26 @@
-"""Initialize the package by exposing the main interface and telemetry setup."""
+"""Initialize the package by exposing the main interface and telemetry setup.
 
-from .generator import generate_presentation
-from .interface import demo
-from .telemetry import init_telemetry
+The exports are imported on first access, so that the extraction workers, which
+only need `src.processing`, do not build the interface and the database clients.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "demo": ".interface",
+    "init_telemetry": ".telemetry",
+    "generate_presentation": ".generator",
+}
 
 __all__ = [
     "demo",
     "init_telemetry",
     "generate_presentation",
 ]
+
+
+def __getattr__(name: str):
+    """Import an export of the package on first access."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
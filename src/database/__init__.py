@@ -1,7 +1,12 @@
 """This module initializes the database package."""
 
+from .corpus_ingestion import ingest_corpus
 from .database import chroma_client, embed_fn
-from .db_manipulation import (clean_db, ingest_files_to_db,
-                              retrive_files_from_db)
+from .db_manipulation import (clean_db, corpus_asset_store, diff_ingestion,
+                              ingest_files_to_db, retrive_files_from_db)
+from .figure_jobs import cancel_figures, wait_for_figures
+from .ingestion_diff import IngestionDiff
+from .ingestion_jobs import IngestionJob
+from .job_queue import get_job_queue
 
-__all__ = ["chroma_client", "embed_fn", "ingest_files_to_db", "retrive_files_from_db", "clean_db"]
+__all__ = ["chroma_client", "embed_fn", "ingest_files_to_db", "diff_ingestion", "retrive_files_from_db", "clean_db", "corpus_asset_store", "wait_for_figures", "cancel_figures", "IngestionDiff", "IngestionJob", "get_job_queue", "ingest_corpus"]
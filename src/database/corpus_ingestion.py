@@ -0,0 +1,256 @@
+"""Module ingesting a whole corpus of PDF files into a collection, resumably."""
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import fitz
+from langfuse.decorators import langfuse_context, observe
+
+from ..telemetry import Logger
+from .database import chroma_client, collection_data_dir, embed_fn
+from .db_manipulation import ingest_files_to_db
+from .embedding_limiter import get_embedding_limiter
+from .ingestion_jobs import DONE, FAILED
+
+LOGGER = Logger.get_logger()
+
+
+@dataclass
+class CorpusReport:
+    """Outcome and throughput of a corpus ingestion run.
+
+    Attributes:
+        files (int): Number of PDF files found in the corpus.
+        skipped (int): Files finished by an earlier run, not ingested again.
+        done (int): Files ingested by this run.
+        failed (int): Files which failed to be processed by this run.
+        pages (int): Number of pages of the files ingested by this run.
+        embedded (int): Number of chunks embedded by this run.
+        requests (int): Number of embedding requests sent by this run.
+        waited_s (float): Time spent waiting for the embedding rate limit.
+        seconds (float): Duration of the run.
+        chunks (int): Number of chunks in the collection at the end of the run.
+    """
+
+    files: int = 0
+    skipped: int = 0
+    done: int = 0
+    failed: int = 0
+    pages: int = 0
+    embedded: int = 0
+    requests: int = 0
+    waited_s: float = 0.0
+    seconds: float = 0.0
+    chunks: int = 0
+
+    def rates(self) -> dict:
+        """Throughput of the run.
+
+        Returns:
+            dict: The PDFs, pages and embeddings processed per second.
+        """
+        seconds = max(self.seconds, 1e-9)
+        return {
+            "pdfs_per_s": round(self.done / seconds, 3),
+            "pages_per_s": round(self.pages / seconds, 3),
+            "embeddings_per_s": round(self.embedded / seconds, 3),
+        }
+
+    def as_dict(self) -> dict:
+        """The counts and rates of the run, as written in the report file."""
+        return {**asdict(self), "seconds": round(self.seconds, 2), **self.rates()}
+
+
+class CorpusCheckpoint:
+    """Append-only log of the files of a corpus already finished.
+
+    Every finished file adds a JSON line holding its path, size, modification
+    time, final state and number of pages, flushed to disk at once. A run
+    interrupted at any point resumes after the last finished file, and the
+    files modified since they were logged are ingested again.
+
+    Attributes:
+        path (Path): Path of the log.
+        entries (dict[str, dict]): Latest entry of every logged file, keyed by path.
+    """
+
+    def __init__(self, path) -> None:
+        """Load the log, creating its directory if needed.
+
+        Args:
+            path (str or Path): Path of the log.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.entries: dict[str, dict] = {}
+        try:
+            content = self.path.read_text(encoding="utf-8")
+        except OSError:
+            content = ""
+        if content and not content.endswith("\n"):
+            # Drop the line torn by a crash, so the next entries start on their own
+            content = content[: content.rfind("\n") + 1]
+            self.path.write_text(content, encoding="utf-8")
+        for line in content.splitlines():
+            try:
+                entry = json.loads(line)
+                self.entries[entry["path"]] = entry
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def is_finished(self, pdf_path: str, retry_failed: bool = False) -> bool:
+        """Whether a file was finished by an earlier run and not modified since.
+
+        Args:
+            pdf_path (str): Path of the PDF file.
+            retry_failed (bool): Whether the files which failed are ingested again.
+
+        Returns:
+            bool: True if the file can be skipped.
+        """
+        entry = self.entries.get(pdf_path)
+        if entry is None or (retry_failed and entry["state"] == FAILED):
+            return False
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return False
+        return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def record(self, pdf_path: str, state: str, pages: int) -> None:
+        """Log a finished file and flush the log to disk.
+
+        Args:
+            pdf_path (str): Path of the PDF file.
+            state (str): Final state of the file, DONE or FAILED.
+            pages (int): Number of pages of the file.
+        """
+        stat = os.stat(pdf_path)
+        entry = {
+            "path": pdf_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "state": state,
+            "pages": pages,
+        }
+        self.entries[pdf_path] = entry
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def find_pdfs(corpus_dir) -> list[str]:
+    """Find the PDF files of a directory tree, in a stable order.
+
+    Args:
+        corpus_dir (str or Path): Root of the corpus.
+
+    Returns:
+        list[str]: Absolute paths of the PDF files, sorted.
+    """
+    root = Path(corpus_dir).resolve()
+    return sorted(
+        str(path)
+        for path in root.rglob("*")
+        if path.suffix.lower() == ".pdf" and path.is_file()
+    )
+
+
+def count_pages(pdf_path: str) -> int:
+    """Number of pages of a PDF file, 0 if it cannot be opened."""
+    try:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+
+@observe(name="📚 ingest_corpus")
+def ingest_corpus(
+    corpus_dir,
+    collection: str,
+    checkpoint_path,
+    batch_files: int = 32,
+    retry_failed: bool = False,
+    data_dir=None,
+) -> CorpusReport:
+    """Ingest the PDF files of a directory tree into a collection.
+
+    The files are ingested by batches through `ingest_files_to_db`, which
+    extracts them in parallel and skips the content already in the collection.
+    Every finished file is logged to the checkpoint, so a run interrupted at any
+    point resumes where it stopped: the files logged are skipped without being
+    read, and those stored but not logged yet are found in the collection.
+    The graphics are extracted with the text, so a logged file is complete, and
+    kept with the page manifest next to the collection rather than with the
+    session files, which are deleted when the sessions expire.
+
+    Args:
+        corpus_dir (str or Path): Root of the corpus.
+        collection (str): Name of the collection receiving the chunks.
+        checkpoint_path (str or Path): Path of the checkpoint log.
+        batch_files (int): Number of files ingested per batch.
+        retry_failed (bool): Whether the files which failed in an earlier run
+            are ingested again.
+        data_dir (str or Path, optional): Directory receiving the graphics and
+            the page manifest, `collection_data_dir(collection)` by default.
+
+    Returns:
+        CorpusReport: The counts and throughput of the run.
+    """
+    pdf_files = find_pdfs(corpus_dir)
+    data_dir = Path(data_dir) if data_dir else collection_data_dir(collection)
+    checkpoint = CorpusCheckpoint(checkpoint_path)
+    todo = [
+        pdf_path
+        for pdf_path in pdf_files
+        if not checkpoint.is_finished(pdf_path, retry_failed)
+    ]
+    report = CorpusReport(files=len(pdf_files), skipped=len(pdf_files) - len(todo))
+    LOGGER.info(
+        "📚 Corpus of %d PDFs: %d already ingested, %d to ingest",
+        report.files,
+        report.skipped,
+        len(todo),
+    )
+
+    def progress(pdf_path: str, state: str) -> None:
+        if state == DONE:
+            pages = count_pages(pdf_path)
+            checkpoint.record(pdf_path, DONE, pages)
+            report.done += 1
+            report.pages += pages
+        elif state == FAILED:
+            checkpoint.record(pdf_path, FAILED, 0)
+            report.failed += 1
+
+    limiter = get_embedding_limiter()
+    before = limiter.stats()
+    start = time.perf_counter()
+    for batch_start in range(0, len(todo), max(1, batch_files)):
+        batch = todo[batch_start : batch_start + max(1, batch_files)]
+        ingest_files_to_db(batch, collection, progress=progress, data_dir=data_dir)
+        elapsed = time.perf_counter() - start
+        LOGGER.info(
+            "📚 %d/%d PDFs finished, %.2f PDFs/s",
+            report.done + report.failed,
+            len(todo),
+            report.done / max(elapsed, 1e-9),
+        )
+    report.seconds = time.perf_counter() - start
+    after = limiter.stats()
+    report.embedded = after["texts"] - before["texts"]
+    report.requests = after["requests"] - before["requests"]
+    report.waited_s = round(after["waited_s"] - before["waited_s"], 2)
+    report.chunks = chroma_client.get_or_create_collection(
+        name=collection, embedding_function=embed_fn
+    ).count()
+
+    langfuse_context.update_current_observation(
+        output={"output.report": report.as_dict()}
+    )
+    return report
@@ -1,33 +1,60 @@
 """Database module for user-uploaded files."""
 
+import os
+from pathlib import Path
+
 import chromadb
 from chromadb import Documents, EmbeddingFunction, Embeddings
 from google import genai
-from google.api_core import retry
 from google.genai import types
 
 from ..services import client
+from .embedding_batches import get_embedding_batcher
+from .embedding_cache import get_embedding_cache
 
 # Define a helper to retry when per-minute quota is reached.
 is_retriable = lambda e: (isinstance(e, genai.errors.APIError) and e.code in {429, 503})
 
+EMBEDDING_MODEL = "models/text-embedding-004"
+
 
 class GeminiEmbeddingFunction(EmbeddingFunction):
-    """A class to handle retrieval embedding functions using Google Gemini API."""
+    """A class to handle retrieval embedding functions using Google Gemini API.
+
+    The task type is fixed for the instance, so that concurrent sessions
+    embedding documents and queries never share a mutable mode.
 
-    def __init__(self):
-        self.document_mode = True
+    Attributes:
+        task (str): Task type of the embeddings, retrieval_document or
+            retrieval_query.
+    """
+
+    def __init__(self, task: str = "retrieval_document"):
+        self.task = task
 
-    @retry.Retry(predicate=is_retriable)
     def __call__(self, inputs: Documents) -> Embeddings:
-        if self.document_mode:
-            embedding_task = "retrieval_document"
-        else:
-            embedding_task = "retrieval_query"
+        embedding_task = self.task
+
+        # Split into requests within the API limits, sent concurrently, and
+        # retry only the requests which hit the per-minute quota
+        def embed(texts: list[str]) -> Embeddings:
+            return get_embedding_batcher().embed(
+                texts,
+                lambda batch: self._embed_batch(batch, embedding_task),
+                is_retriable,
+            )
+
+        # Only the texts never embedded before are sent, each one once
+        cache = get_embedding_cache()
+        if cache is None:
+            return embed(inputs)
+        return cache.embed(inputs, EMBEDDING_MODEL, embedding_task, embed)
 
+    def _embed_batch(self, batch: list[str], embedding_task: str) -> Embeddings:
+        """Send one embedding request for a batch of texts."""
         response = client.models.embed_content(
-            model="models/text-embedding-004",
-            contents=inputs,
+            model=EMBEDDING_MODEL,
+            contents=batch,
             config=types.EmbedContentConfig(
                 task_type=embedding_task,
             ),
@@ -35,7 +62,30 @@ class GeminiEmbeddingFunction(EmbeddingFunction):
         return [e.values for e in response.embeddings]
 
 
-embed_fn = GeminiEmbeddingFunction()
-embed_fn.document_mode = True
+embed_fn = GeminiEmbeddingFunction("retrieval_document")
+query_embed_fn = GeminiEmbeddingFunction("retrieval_query")
+
+# Collections live in memory, unless CHROMA_PATH names a directory to persist them,
+# e.g. for a corpus ingested beforehand with `ragntex_ingest.py`
+chroma_path = os.getenv("CHROMA_PATH")
+chroma_client = (
+    chromadb.PersistentClient(path=chroma_path) if chroma_path else chromadb.Client()
+)
+
+# Collection ingested beforehand, retrieved from along with the session's one
+CORPUS_COLLECTION = os.getenv("CORPUS_COLLECTION", "corpus")
+
+
+def collection_data_dir(collection: str) -> Path:
+    """Directory of the graphics and page manifest of a persisted collection.
+
+    It lives next to the collection, under CHROMA_PATH, rather than with the
+    session files under `tmp`, so that it is kept as long as the collection.
+
+    Args:
+        collection (str): Name of the collection.
 
-chroma_client = chromadb.Client()
+    Returns:
+        Path: Path to `<CHROMA_PATH>/<collection>.files`.
+    """
+    return Path.cwd() / (chroma_path or "chroma") / f"{collection}.files"
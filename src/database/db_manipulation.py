@@ -1,58 +1,383 @@
 """Module for adding and getting PDF files to/from the database."""
 
-from typing import List, Mapping, Union
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, List, Mapping, Optional, Union
 
+from chromadb.errors import NotFoundError
 from langfuse.decorators import langfuse_context, observe
 
-from ..processing import process_documents
+from ..processing import (
+    AssetStore,
+    ExtractionConfig,
+    chunk_document,
+    get_document_pool,
+    iter_documents,
+    session_assets_dir,
+)
+from ..processing.chunking import CHUNK_OVERLAP, CHUNK_TOKENS
+from ..processing.extraction_config import env_int
+from ..processing.hashing import file_sha256
+from ..processing.page_manifest import (
+    PageManifest,
+    finish_page_reuse,
+    session_manifest_dir,
+)
 from ..telemetry import Logger
-from .database import chroma_client, embed_fn
+from .database import (
+    CORPUS_COLLECTION,
+    EMBEDDING_MODEL,
+    chroma_client,
+    collection_data_dir,
+    embed_fn,
+    query_embed_fn,
+)
+from .embedding_batches import get_embedding_batcher
+from .embedding_cache import get_embedding_cache
+from .embedding_limiter import get_embedding_limiter
+from .figure_jobs import FigureJob, schedule_figures
+from .ingestion_cache import get_ingestion_cache
+from .ingestion_diff import IngestionDiff, chunk_id, diff_entries
+from .ingestion_jobs import CANCELLED, DONE, EMBEDDING, EXTRACTING, FAILED
 
 LOGGER = Logger.get_logger()
 
+# Number of chunks retrieved for a presentation
+RETRIEVAL_CHUNKS = env_int("RETRIEVAL_CHUNKS", 8)
+
+
+def embed_chunks(texts: list[str]) -> list:
+    """Embed the chunks of a document.
+
+    The embedding function splits them into requests within the API limits, sent
+    concurrently (see `embedding_batches`).
+
+    Args:
+        texts (list[str]): Text of the chunks.
+
+    Returns:
+        list: The embedding of every chunk.
+    """
+    return embed_fn(texts) if texts else []
+
+
+def _diff_filter(pdf_hashes: dict[str, str]) -> Optional[dict]:
+    """Filter of the collection entries which can match the given files.
+
+    Only the chunks stored under the path or the content of an uploaded file
+    take part in the comparison, so it does not read the whole collection.
+    """
+    if not pdf_hashes:
+        return None
+    return {
+        "$or": [
+            {"pdf_path": {"$in": list(pdf_hashes)}},
+            {"content_hash": {"$in": sorted(set(pdf_hashes.values()))}},
+        ]
+    }
+
+
+@observe(name="🧮 diff_ingestion")
+def diff_ingestion(pdf_files, session_id) -> IngestionDiff:
+    """Find which files of an upload need to be embedded, without ingesting them.
 
-@observe(name="𝌊 ingest_files_to_db")
-def ingest_files_to_db(pdf_files, session_id) -> list[str]:
-    """Add new files to the database if they are not yet there.
     Args:
         pdf_files (list): List of PDF files to be ingested.
         session_id (str): Unique identifier for the current session.
+
+    Returns:
+        IngestionDiff: The new, unchanged and replaced files, and the stale chunks.
     """
-    # Get or create the database collection
     db = chroma_client.get_or_create_collection(
         name=session_id, embedding_function=embed_fn
     )
+    pdf_hashes = {pdf_path: file_sha256(pdf_path) for pdf_path in pdf_files}
+    entries = db.get(where=_diff_filter(pdf_hashes), include=["metadatas"])
+    diff = diff_entries(entries, pdf_hashes)
+    langfuse_context.update_current_observation(output={"output.diff": diff.summary()})
+    return diff
+
+
+def _store_chunks(db, content_hash: str, documents, metadatas, embeddings) -> list:
+    """Upsert the chunks of a document under ids derived from its content."""
+    ids = [chunk_id(content_hash, meta["chunk"]) for meta in metadatas]
+    db.upsert(
+        documents=documents,
+        embeddings=embeddings,
+        ids=ids,
+        metadatas=metadatas,
+    )
+    return ids
+
+
+def _previous_versions(
+    pdf_files: list[str], manifest: PageManifest, config: ExtractionConfig
+) -> dict[str, dict]:
+    """Find the former version of revised files, whose unchanged pages are reused.
 
-    # Get all the existing entries and extract the known filenames
-    all_entries = db.get(include=["metadatas"]) or []
+    Args:
+        pdf_files (list[str]): New PDF files, replacing a former version or not.
+        manifest (PageManifest): Page manifest of the collection.
+        config (ExtractionConfig): Extraction settings of the ingestion.
 
-    if not all_entries:
-        LOGGER.info("📂 No existing entries in the database. Ingesting all PDFs.")
+    Returns:
+        dict: The page manifest entry of the former version of the revised
+            files extracted with the same settings, keyed by PDF path.
+    """
+    previous = {}
+    for pdf_path in pdf_files:
+        entry = manifest.get(pdf_path)
+        if entry is not None and entry["extractor_tag"] == config.extractor_tag:
+            previous[pdf_path] = entry
+    return previous
 
-    existing_pdfs = set(
-        meta.get("pdf_path")
-        for meta in all_entries["metadatas"]  # type: ignore[union-attr]
-        if meta.get("pdf_path")
+
+def _previous_embeddings(db, stale_ids: list[str]) -> dict:
+    """Embeddings of the chunks of former versions of files, keyed by chunk text."""
+    if not stale_ids:
+        return {}
+    entries = db.get(ids=stale_ids, include=["documents", "embeddings"])
+    return dict(zip(entries["documents"], entries["embeddings"]))
+
+
+def _embed_unknown(documents: list[str], known: dict) -> tuple[list, int]:
+    """Embed the chunks whose text was not embedded before.
+
+    Returns:
+        tuple: The embedding of every chunk and the number of chunks embedded.
+    """
+    missing = [text for text in dict.fromkeys(documents) if text not in known]
+    embedded = dict(zip(missing, embed_chunks(missing))) if missing else {}
+    embeddings = [
+        known[text] if text in known else embedded[text] for text in documents
+    ]
+    return embeddings, len(missing)
+
+
+@observe(name="𝌊 ingest_files_to_db")
+def ingest_files_to_db(
+    pdf_files,
+    session_id,
+    pdf_hashes: Optional[dict[str, str]] = None,
+    progress: Optional[Callable[[str, str], None]] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+    data_dir: Optional[Path] = None,
+) -> list[str]:
+    """Add new files to the database if they are not yet there.
+
+    Chunks are stored under ids derived from the content hash of their file,
+    so uploading a file again, or under another name, embeds nothing. A file
+    uploaded again with new content replaces the chunks of its former version:
+    only its changed pages are extracted and only its changed chunks embedded.
+
+    Args:
+        pdf_files (list): List of PDF files to be ingested.
+        session_id (str): Unique identifier for the current session.
+        pdf_hashes (dict[str, str], optional): SHA-256 hash of the files already
+            computed, keyed by path. The other files are hashed here.
+        progress (callable, optional): Called with the path and the new state of
+            a file whenever it changes (see `ingestion_jobs`).
+        cancelled (callable, optional): Polled between documents, the files not
+            stored yet are left out once it returns True.
+        data_dir (Path, optional): Directory receiving the graphics and the page
+            manifest of a persisted collection (see `collection_data_dir`),
+            whose graphics are extracted with the text. By default they go to
+            the session directory under `tmp`.
+
+    Returns:
+        list[str]: The PDF files which failed to be processed.
+    """
+    # Get or create the database collection
+    db = chroma_client.get_or_create_collection(
+        name=session_id, embedding_function=embed_fn
     )
 
-    # Filter out already ingested PDFs
-    new_pdfs = [file for file in pdf_files if file not in existing_pdfs]
+    # Compare the content of the files with the entries of the collection
+    known_hashes = pdf_hashes or {}
+    pdf_hashes = {
+        pdf_path: known_hashes.get(pdf_path) or file_sha256(pdf_path)
+        for pdf_path in pdf_files
+    }
+    entries = db.get(where=_diff_filter(pdf_hashes), include=["metadatas"])
+    diff = diff_entries(entries, pdf_hashes)
+    LOGGER.info(
+        "📂 Upload of %d PDFs: %d new, %d unchanged, %d replaced",
+        len(pdf_hashes),
+        len(diff.new),
+        len(diff.unchanged),
+        len(diff.replaced),
+    )
+    new_pdfs = diff.new
+    progress = progress or (lambda pdf_path, state: None)
+    for pdf_path in diff.unchanged:
+        progress(pdf_path, DONE)
 
     if not new_pdfs:
+        if diff.stale_ids:
+            db.delete(ids=diff.stale_ids)
         LOGGER.info("📂 No new PDFs to ingest. Skipping ingestion.")
+        langfuse_context.update_current_observation(
+            output={"output.diff": diff.summary()}
+        )
         return []
 
-    # Process new files only
-    documents, metadatas, failed = process_documents(new_pdfs)
+    # Process new files only, keeping their graphics in the session's asset store.
+    # Each document is embedded and stored as soon as it is extracted. In two-phase
+    # mode only the text is extracted here, the graphics follow in the background.
+    two_phase = (
+        data_dir is None and os.getenv("TWO_PHASE_INGESTION", "false").lower() == "true"
+    )
+    if data_dir is None:
+        assets_dir = session_assets_dir(session_id)
+        manifest_dir = session_manifest_dir(session_id)
+    else:
+        assets_dir, manifest_dir = data_dir / "assets", data_dir / "pages"
+    config = ExtractionConfig(asset_dir=str(assets_dir), with_graphics=not two_phase)
+    cache = get_ingestion_cache()
+    cache_tag = (
+        f"{config.extractor_tag}-c{CHUNK_TOKENS}o{CHUNK_OVERLAP}"
+        f"-{EMBEDDING_MODEL.rsplit('/', 1)[-1]}"
+    )
+    failed: list[str] = []
+    figure_jobs = []
+    num_added = 0
+    num_chunks = 0
 
     LOGGER.info("➕ Adding %d new PDFs to the database...", len(new_pdfs))
-    if documents:
-        db.add(
-            documents=documents,
-            ids=[str(i) for i in range(len(documents))],
-            metadatas=metadatas,
+
+    # Serve the files already ingested in any session from the cache, with their
+    # graphics and pages
+    manifest = PageManifest(manifest_dir)
+    store = AssetStore(assets_dir)
+    to_extract = []
+    for pdf_path in new_pdfs:
+        cached = cache.get(pdf_hashes[pdf_path], cache_tag, pdf_path, store, manifest)
+        if cached is None:
+            to_extract.append(pdf_path)
+            continue
+        documents, metadatas, embeddings = (list(field) for field in zip(*cached))
+        _store_chunks(db, pdf_hashes[pdf_path], documents, metadatas, embeddings)
+        progress(pdf_path, DONE)
+        num_added += 1
+        num_chunks += len(documents)
+
+    # Revised files only go through their changed pages and chunks
+    previous = _previous_versions(to_extract, manifest, config)
+    page_counts = {"reused": 0, "reprocessed": 0}
+    known_embeddings = _previous_embeddings(db, diff.stale_ids)
+    num_embedded = 0
+
+    # Each document is split into chunks, which are embedded and stored together
+    for pdf_path in to_extract:
+        progress(pdf_path, EXTRACTING)
+    stored = set(diff.unchanged) | (set(new_pdfs) - set(to_extract))
+    documents_iter = iter_documents(to_extract, config, failed, previous)
+    for pdf_path, document, metadata in documents_iter:
+        if cancelled is not None and cancelled():
+            # Stop the extraction workers, the files left are not stored
+            documents_iter.close()
+            break
+        progress(pdf_path, EMBEDDING)
+        chunks = chunk_document(
+            document, {**metadata, "content_hash": pdf_hashes[pdf_path]}
         )
-    LOGGER.info("✅ Documents ingested successfully.")
+        documents = [text for text, _ in chunks]
+        metadatas = [chunk_metadata for _, chunk_metadata in chunks]
+        embeddings, embedded = _embed_unknown(documents, known_embeddings)
+        num_embedded += embedded
+        ids = _store_chunks(db, pdf_hashes[pdf_path], documents, metadatas, embeddings)
+        hashes = metadata.get("page_hashes")
+        if pdf_path in previous and hashes:
+            # The revision is stored, move the graphics of its reused pages
+            reused = finish_page_reuse(
+                store, previous[pdf_path], hashes, metadata["images_passage"] or ""
+            )
+            page_counts["reused"] += reused
+            page_counts["reprocessed"] += len(hashes) - reused
+        if config.with_graphics:
+            entry = manifest.record(
+                pdf_path, pdf_hashes[pdf_path], config.extractor_tag, document, metadata
+            )
+            cache.put(
+                pdf_hashes[pdf_path],
+                cache_tag,
+                list(zip(documents, metadatas, embeddings)),
+                store,
+                entry,
+            )
+        else:
+            figure_jobs.append(
+                FigureJob(
+                    pdf_path,
+                    pdf_hashes[pdf_path],
+                    ids,
+                    documents,
+                    metadatas,
+                    embeddings,
+                    previous.get(pdf_path),
+                )
+            )
+        stored.add(pdf_path)
+        progress(pdf_path, DONE)
+        num_added += 1
+        num_chunks += len(chunks)
+    for pdf_path in failed:
+        progress(pdf_path, FAILED)
+    for pdf_path in set(to_extract) - stored:
+        progress(pdf_path, CANCELLED)
+    if any(page_counts.values()):
+        LOGGER.info(
+            "♻️ Revised PDFs: %d pages reused, %d pages reprocessed",
+            page_counts["reused"],
+            page_counts["reprocessed"],
+        )
+    LOGGER.info(
+        "✅ %d documents ingested in %d chunks, %d embedded.",
+        num_added,
+        num_chunks,
+        num_embedded,
+    )
+
+    # Drop the chunks of the former versions of the files, now replaced.
+    # Files which failed or were left out by a cancellation keep their former version.
+    stale_ids = [
+        entry_id
+        for pdf_path, ids in diff.stale_by_path.items()
+        if pdf_path in stored
+        for entry_id in ids
+    ]
+    if stale_ids:
+        db.delete(ids=stale_ids)
+        LOGGER.info("♻️ Removed %d stale chunks", len(stale_ids))
+
+    # The text is searchable, extract the graphics without blocking the upload
+    schedule_figures(session_id, figure_jobs, config, cache, cache_tag)
+
+    assets = store.stats()
+    embedding_cache = get_embedding_cache()
+    langfuse_context.update_current_observation(
+        output={
+            "output.assets": assets,
+            "output.num_chunks": num_chunks,
+            "output.num_embedded": num_embedded,
+            "output.pages": page_counts,
+            "output.diff": diff.summary(),
+            "output.ingestion_cache": cache.stats(),
+            "output.documents": get_document_pool().stats(),
+            "output.embedding": get_embedding_limiter().stats(),
+            "output.embedding_batches": get_embedding_batcher().stats(),
+            "output.embedding_cache": (
+                embedding_cache.stats() if embedding_cache else None
+            ),
+        }
+    )
+    LOGGER.info("🗄️ Ingestion cache: %d hits, %d misses", cache.hits, cache.misses)
+    LOGGER.info(
+        "🖼️ Asset store holds %d graphics (%d bytes)",
+        assets["objects"],
+        assets["bytes"],
+    )
 
     return failed
 
@@ -62,42 +387,98 @@ DocumentsBatch = List[List[str]]
 MetadataBatch = List[List[Metadata]]
 
 
+def _retrieval_collections(session_id: str) -> list:
+    """Collections queried for a session: its own and the corpus, if any.
+
+    The corpus collection is only read, it is never created here.
+    """
+    collections = [
+        chroma_client.get_or_create_collection(
+            name=session_id, embedding_function=embed_fn
+        )
+    ]
+    if session_id != CORPUS_COLLECTION:
+        try:
+            collections.append(
+                chroma_client.get_collection(
+                    name=CORPUS_COLLECTION, embedding_function=embed_fn
+                )
+            )
+        except (NotFoundError, ValueError):
+            pass
+    return collections
+
+
+def corpus_asset_store() -> Optional[AssetStore]:
+    """Store of the graphics of the corpus collection, if it was ingested.
+
+    Returns:
+        AssetStore: The store, or None if the corpus has no graphics on disk.
+    """
+    root = collection_data_dir(CORPUS_COLLECTION) / "assets"
+    return AssetStore(root) if root.is_dir() else None
+
+
 @observe(name="🔍 retrieve_files_from_db")
 def retrive_files_from_db(
     topic: str, session_id: str
 ) -> tuple[DocumentsBatch, MetadataBatch]:
-    """Retrieve relevant documents from the database based on the provided topic.
+    """Retrieve relevant chunks from the database based on the provided topic.
+
+    The collection of the session and the corpus collection, when one was
+    ingested beforehand with `ragntex_ingest.py`, are both queried. Their
+    results are merged by distance, a chunk stored in both counted once.
+
     Args:
-        topic (str): The topic for which to retrieve documents.
+        topic (str): The topic for which to retrieve chunks.
         session_id (str): Unique identifier for the current session.
     Returns:
         tuple: A 2-element tuple:
-            - list[str]: List of retrieved documents.
-            - list[dict]: List of metadata associated with the documents.
+            - list[str]: List of retrieved chunks.
+            - list[dict]: List of metadata associated with the chunks, including
+              the path of their PDF file and their page range.
     """
-    # Get or create the database collection
-    db = chroma_client.get_or_create_collection(
-        name=session_id, embedding_function=embed_fn
-    )
-    if not db:
+    collections = _retrieval_collections(session_id)
+    if not collections[0]:
         LOGGER.error("❌ Database collection not found or could not be created.")
         return [], []
 
     LOGGER.info("🔍 Retrieving relevant documents...")
-    embed_fn.document_mode = False
     query_oneline = topic.replace("\n", " ")
 
-    n_yelded_docs = 2
-    result = db.query(query_texts=[query_oneline], n_results=n_yelded_docs)
+    # The collections embed documents, the query is embedded for retrieval
+    n_yelded_docs = RETRIEVAL_CHUNKS
+    query_embeddings = query_embed_fn([query_oneline])
+    results: dict[str, tuple[float, str, dict]] = {}
+    counts: dict[str, int] = {}
+    for db in collections:
+        result = db.query(query_embeddings=query_embeddings, n_results=n_yelded_docs)
+        [ids] = result.get("ids") or [[]]
+        [distances] = result.get("distances") or [[]]
+        [documents] = result.get("documents") or [[]]
+        [metadatas] = result.get("metadatas") or [[]]
+        counts[db.name] = len(ids)
+        for entry_id, distance, document, metadata in zip(
+            ids, distances, documents, metadatas
+        ):
+            if entry_id not in results or distance < results[entry_id][0]:
+                results[entry_id] = (distance, document, metadata)
+    closest = sorted(results.values(), key=lambda result: result[0])[:n_yelded_docs]
+    documents = [document for _, document, _ in closest]
+    metadatas = [metadata for _, _, metadata in closest]
+
+    embedding_cache = get_embedding_cache()
     langfuse_context.update_current_observation(
         output={
             "input.query_oneline": query_oneline,
             "output.n_results": n_yelded_docs,
-            "output.metadatas": result["metadatas"],
+            "output.collections": counts,
+            "output.metadatas": [metadatas],
+            "output.embedding_cache": (
+                embedding_cache.stats() if embedding_cache else None
+            ),
         }
     )
-    [documents] = result.get("documents") or [[]]
-    [metadatas] = result.get("metadatas") or [[]]
 
     return [documents], [metadatas]
 
@@ -113,6 +494,10 @@ def clean_db(session_id: str) -> None:
     if db:
         chroma_client.delete_collection(name=session_id)
         LOGGER.info("🗑️ Cleaning database for session ID: %s", session_id)
+        # The graphics and pages of a persisted collection go with it
+        data_dir = collection_data_dir(session_id)
+        if data_dir.is_dir():
+            shutil.rmtree(data_dir)
     else:
         LOGGER.warning(
             "❌ Database collection not found for session ID: %s", session_id
@@ -0,0 +1,245 @@
+"""Module splitting the embedding requests into batches sent concurrently."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from ..processing.chunking import estimate_tokens
+from ..processing.extraction_config import env_int
+from ..telemetry import Logger
+from .embedding_limiter import get_embedding_limiter
+
+LOGGER = Logger.get_logger()
+
+# Limits of one embedding request: number of texts and estimated tokens
+EMBED_BATCH_ITEMS = env_int("EMBED_BATCH_ITEMS", 100)
+EMBED_BATCH_TOKENS = env_int("EMBED_BATCH_TOKENS", 20000)
+
+# Maximal number of embedding requests awaiting a response, process-wide
+EMBED_IN_FLIGHT = env_int("EMBED_IN_FLIGHT", 4)
+
+# Attempts of a failed batch after the first, and first delay between them
+EMBED_RETRIES = env_int("EMBED_RETRIES", 5)
+RETRY_DELAY_S = 1.0
+RETRY_MAX_DELAY_S = 60.0
+
+# Number of recent requests whose latency is kept for the percentiles
+LATENCY_WINDOW = 1000
+
+
+def plan_batches(texts: list[str], max_items: int, max_tokens: int) -> list[range]:
+    """Split texts into consecutive batches within the limits of a request.
+
+    A text longer than `max_tokens` on its own is sent alone, the API truncates it.
+
+    Args:
+        texts (list[str]): Texts to embed.
+        max_items (int): Maximal number of texts per batch.
+        max_tokens (int): Maximal number of estimated tokens per batch.
+
+    Returns:
+        list[range]: Indices of the texts of every batch, in order.
+    """
+    batches = []
+    start, tokens = 0, 0
+    for num, text in enumerate(texts):
+        text_tokens = estimate_tokens(text)
+        if num > start and (
+            num - start >= max_items or tokens + text_tokens > max_tokens
+        ):
+            batches.append(range(start, num))
+            start, tokens = num, 0
+        tokens += text_tokens
+    if start < len(texts):
+        batches.append(range(start, len(texts)))
+    return batches
+
+
+class EmbeddingBatcher:
+    """Batching layer of the embedding requests, shared by the threads of the process.
+
+    The texts of a call are split by count and estimated tokens, and the batches
+    are sent concurrently, at most `in_flight` at once across all the calls, each
+    one waiting for the rate limit of the process (see `embedding_limiter`).
+    A batch failing with a retriable error is sent again alone, with exponential
+    backoff, and the embeddings are returned in the order of the texts.
+
+    Attributes:
+        max_items (int): Maximal number of texts per request.
+        max_tokens (int): Maximal number of estimated tokens per request.
+        in_flight (int): Maximal number of requests awaiting a response.
+        retries (int): Number of attempts of a failed batch after the first.
+    """
+
+    def __init__(
+        self,
+        max_items: int = EMBED_BATCH_ITEMS,
+        max_tokens: int = EMBED_BATCH_TOKENS,
+        in_flight: int = EMBED_IN_FLIGHT,
+        retries: int = EMBED_RETRIES,
+    ) -> None:
+        """Initialise the batcher.
+
+        Args:
+            max_items (int): Maximal number of texts per request.
+            max_tokens (int): Maximal number of estimated tokens per request.
+            in_flight (int): Maximal number of requests awaiting a response.
+            retries (int): Number of attempts of a failed batch after the first.
+        """
+        self.max_items = max(1, max_items)
+        self.max_tokens = max(1, max_tokens)
+        self.in_flight = max(1, in_flight)
+        self.retries = max(0, retries)
+        self._slots = threading.BoundedSemaphore(self.in_flight)
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._tokens = 0
+        self._max_batch_items = 0
+        self._max_batch_tokens = 0
+        self._retries = 0
+        self._failed = 0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def embed(
+        self,
+        texts: list[str],
+        send: Callable[[list[str]], list],
+        is_retriable: Callable[[Exception], bool] = lambda error: False,
+    ) -> list:
+        """Embed texts in batches.
+
+        Args:
+            texts (list[str]): Texts to embed.
+            send (Callable): Function sending one embedding request for a batch
+                of texts, and returning their embeddings.
+            is_retriable (Callable): Whether an error of a request is worth a
+                retry, e.g. a quota reached. No error is retried by default.
+
+        Returns:
+            list: The embedding of every text, in order.
+        """
+        texts = list(texts)
+        batches = plan_batches(texts, self.max_items, self.max_tokens)
+        if len(batches) <= 1:
+            return self._send_batch(texts, send, is_retriable)
+        workers = min(self.in_flight, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    self._send_batch,
+                    texts[batch.start : batch.stop],
+                    send,
+                    is_retriable,
+                )
+                for batch in batches
+            ]
+            embeddings: list = []
+            for future in futures:
+                embeddings += future.result()
+        return embeddings
+
+    def _send_batch(
+        self,
+        batch: list[str],
+        send: Callable[[list[str]], list],
+        is_retriable: Callable[[Exception], bool],
+    ) -> list:
+        """Send the request of a batch, again while it fails with a retriable error."""
+        tokens = sum(estimate_tokens(text) for text in batch)
+        limiter = get_embedding_limiter()
+        delay = RETRY_DELAY_S
+        attempt = 0
+        while True:
+            with self._slots:
+                limiter.acquire(len(batch))
+                start = time.perf_counter()
+                try:
+                    embeddings = send(batch)
+                except Exception as error:
+                    if attempt >= self.retries or not is_retriable(error):
+                        with self._lock:
+                            self._failed += 1
+                        raise
+                    with self._lock:
+                        self._retries += 1
+                    failure = error
+                else:
+                    self._record(len(batch), tokens, time.perf_counter() - start)
+                    return embeddings
+            attempt += 1
+            LOGGER.warning(
+                "🔁 Embedding batch of %d texts failed (%s), retry %d/%d in %.1f s",
+                len(batch),
+                failure,
+                attempt,
+                self.retries,
+                delay,
+            )
+            time.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_DELAY_S)
+
+    def _record(self, items: int, tokens: int, latency: float) -> None:
+        """Count a successful request."""
+        with self._lock:
+            self._batches += 1
+            self._items += items
+            self._tokens += tokens
+            self._max_batch_items = max(self._max_batch_items, items)
+            self._max_batch_tokens = max(self._max_batch_tokens, tokens)
+            self._latencies.append(latency)
+
+    def stats(self) -> dict:
+        """Batch sizes, latency and retries of the requests, for logs and telemetry.
+
+        Returns:
+            dict: The numbers of batches, texts and tokens sent, the mean and
+                maximal batch sizes, the mean, 95th percentile and maximal
+                latencies of the recent requests, and the numbers of retries
+                and of batches which failed for good.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            batches = max(self._batches, 1)
+            return {
+                "batches": self._batches,
+                "texts": self._items,
+                "tokens": self._tokens,
+                "mean_batch_texts": round(self._items / batches, 1),
+                "max_batch_texts": self._max_batch_items,
+                "mean_batch_tokens": round(self._tokens / batches, 1),
+                "max_batch_tokens": self._max_batch_tokens,
+                "latency_mean_ms": round(
+                    1000 * sum(latencies) / max(len(latencies), 1), 1
+                ),
+                "latency_p95_ms": (
+                    round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1)
+                    if latencies
+                    else 0.0
+                ),
+                "latency_max_ms": round(1000 * latencies[-1], 1) if latencies else 0.0,
+                "retries": self._retries,
+                "failed": self._failed,
+            }
+
+
+_EMBEDDING_BATCHER: Optional[EmbeddingBatcher] = None
+_BATCHER_LOCK = threading.Lock()
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Get the process-wide embedding batcher.
+
+    Its limits are read from EMBED_BATCH_ITEMS, EMBED_BATCH_TOKENS,
+    EMBED_IN_FLIGHT and EMBED_RETRIES.
+
+    Returns:
+        EmbeddingBatcher: The shared batcher.
+    """
+    global _EMBEDDING_BATCHER  # pylint: disable=global-statement
+    with _BATCHER_LOCK:
+        if _EMBEDDING_BATCHER is None:
+            _EMBEDDING_BATCHER = EmbeddingBatcher()
+        return _EMBEDDING_BATCHER
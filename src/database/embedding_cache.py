@@ -0,0 +1,441 @@
+"""Module implementing the persistent cache of the embeddings of texts."""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from ..processing.extraction_config import env_int
+from ..telemetry import Logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+LOGGER = Logger.get_logger()
+
+# Number of rows of the vector file when it is created, doubled when full
+INITIAL_CAPACITY = 1024
+
+# Number of records the index log holds beyond its live entries before it is
+# rewritten as a snapshot
+COMPACT_MIN_RECORDS = 4096
+
+
+class CacheLockedError(RuntimeError):
+    """Raised when the cache directory is already used by another cache."""
+
+
+class EmbeddingCache:
+    """On-disk cache of embeddings, keyed by model, task type and text hash.
+
+    The vectors are rows of a float32 file, memory-mapped, so a lookup reads
+    only the rows it needs. An index maps the key of every cached text to its
+    row, in order of use: once the file reaches its size cap, the rows of the
+    least recently used texts are reused.
+
+    The index is kept on disk as an append-only log of JSON lines: the rows
+    stored, used and evicted by every call, so an update costs the size of the
+    call rather than of the whole index, and the order of use survives a
+    restart. Evictions are logged before their rows are rewritten and new rows
+    after their vectors are written, so the log never points to a row being
+    rewritten and a crash loses the latest entries at worst. Once the log holds
+    more records than twice its live entries, it is replaced atomically by a
+    snapshot of the index. One cache at a time uses a directory, it holds an
+    advisory lock on the directory until closed.
+
+    Attributes:
+        root (Path): Directory holding the vector file and its index log.
+        max_bytes (int): Size cap of the vector file, 0 disables eviction.
+        dim (int): Dimension of the embeddings, 0 until the first is stored.
+        hits (int): Number of texts served from the cache.
+        misses (int): Number of texts embedded, and stored in the cache.
+        deduped (int): Number of texts repeated within a call, embedded once.
+        evictions (int): Number of entries evicted to make room.
+    """
+
+    def __init__(self, root, max_bytes: int = 0) -> None:
+        """Open the cache, creating its directory if needed.
+
+        Args:
+            root (str or Path): Directory holding the vector file and its index log.
+            max_bytes (int): Size cap of the vector file, 0 disables eviction.
+
+        Raises:
+            CacheLockedError: If another cache, in this process or another one,
+                uses the directory.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(  # pylint: disable=consider-using-with
+            self.root / "lock", "a", encoding="utf-8"
+        )
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as e:
+                self._lock_file.close()
+                raise CacheLockedError(f"{self.root} is used by another cache") from e
+        self.max_bytes = max_bytes
+        self.dim = 0
+        self.hits = 0
+        self.misses = 0
+        self.deduped = 0
+        self.evictions = 0
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._free: list[int] = []
+        self._vectors: Optional[np.memmap] = None
+        self._log_records = 0
+        self._lock = threading.Lock()
+        self._load()
+        self._compact()
+        self._log = self._log_path.open(  # pylint: disable=consider-using-with
+            "a", encoding="utf-8"
+        )
+
+    @property
+    def _index_path(self) -> Path:
+        # Index replaced as a whole by earlier versions, read once and dropped
+        return self.root / "index.json"
+
+    @property
+    def _log_path(self) -> Path:
+        return self.root / "index.log"
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.root / "vectors.f32"
+
+    @staticmethod
+    def key(model: str, task: str, text: str) -> str:
+        """Key of the embedding of a text.
+
+        Args:
+            model (str): Name of the embedding model.
+            task (str): Task type of the embedding, e.g. retrieval_query.
+            text (str): The embedded text.
+
+        Returns:
+            str: The model, task type and SHA-256 hash of the text.
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model}:{task}:{digest}"
+
+    def _read_log(self) -> tuple[int, int, list[tuple[str, int]]]:
+        """Replay the index log, or read the index of an earlier version.
+
+        Returns:
+            tuple: The dimension and capacity of the vector file and the
+                entries of the index, least recently used first.
+
+        Raises:
+            OSError: If neither can be read.
+            ValueError: If the index of an earlier version is malformed.
+        """
+        if not self._log_path.exists() and self._index_path.exists():
+            former = json.loads(self._index_path.read_text(encoding="utf-8"))
+            return (
+                int(former["dim"]),
+                int(former["capacity"]),
+                [(str(key), int(row)) for key, row in former["entries"]],
+            )
+
+        content = self._log_path.read_text(encoding="utf-8")
+        # The line torn by a crash, if any, is dropped when the log is compacted
+        lines = content[: content.rfind("\n") + 1].splitlines()
+        dim = capacity = records = 0
+        index: OrderedDict[str, int] = OrderedDict()
+        # Key held by every row, as the log is replayed
+        keys: dict[int, str] = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+                if "capacity" in record:
+                    dim, capacity = int(record["dim"]), int(record["capacity"])
+                for key, row in record.get("put", []):
+                    index.pop(keys.get(row, ""), None)
+                    index[key] = row
+                    keys[row] = key
+                for row in record.get("use", []):
+                    if keys.get(row) in index:
+                        index.move_to_end(keys[row])
+                for row in record.get("evict", []):
+                    index.pop(keys.pop(row, ""), None)
+                records += sum(
+                    len(value) for value in record.values() if isinstance(value, list)
+                )
+            except (ValueError, TypeError, AttributeError):
+                continue
+        self._log_records = records
+        return dim, capacity, [(k, r) for k, r in index.items() if r < capacity]
+
+    def _load(self) -> None:
+        """Read the index and map the vector file, starting empty if unreadable."""
+        try:
+            dim, capacity, entries = self._read_log()
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        try:
+            size = self._vectors_path.stat().st_size
+        except OSError:
+            size = 0
+        if not dim or not capacity:
+            return
+        if size < capacity * dim * 4:
+            LOGGER.warning("⚠️ Embedding cache vector file truncated, starting empty")
+            return
+        self.dim = dim
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim)
+        )
+        self._index = OrderedDict(entries)
+        used = set(self._index.values())
+        self._free = [row for row in range(capacity - 1, -1, -1) if row not in used]
+
+    def _compact(self) -> None:
+        """Replace the index log by a snapshot of the index, atomically."""
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        records = [{"dim": self.dim, "capacity": capacity}]
+        if self._index:
+            records.append({"put": list(self._index.items())})
+        tmp_path = self.root / f".index.log.{uuid.uuid4().hex}"
+        tmp_path.write_text(
+            "".join(json.dumps(record) + "\n" for record in records),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self._log_path)
+        self._index_path.unlink(missing_ok=True)
+        self._log_records = len(self._index)
+
+    def _append(self, **record) -> None:
+        """Append a record to the index log, compacting the log when it is long.
+
+        Args:
+            record: The rows put, used or evicted, or the new vector file shape.
+        """
+        self._log.write(json.dumps(record) + "\n")
+        self._log.flush()
+        self._log_records += sum(
+            len(value) for value in record.values() if isinstance(value, list)
+        )
+        if self._log_records > max(COMPACT_MIN_RECORDS, 2 * len(self._index)):
+            self._log.close()
+            self._compact()
+            self._log = self._log_path.open(  # pylint: disable=consider-using-with
+                "a", encoding="utf-8"
+            )
+
+    @property
+    def max_entries(self) -> int:
+        """Number of embeddings fitting the size cap, 0 for no cap."""
+        if self.max_bytes <= 0 or not self.dim:
+            return 0
+        return max(1, self.max_bytes // (self.dim * 4))
+
+    def _grow(self, needed: int) -> None:
+        """Make room for `needed` new rows, growing the file or evicting entries."""
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if len(self._free) < needed:
+            wanted = max(INITIAL_CAPACITY, capacity * 2, len(self._index) + needed)
+            if self.max_entries:
+                wanted = min(wanted, self.max_entries)
+            if wanted > capacity:
+                if self._vectors is not None:
+                    self._vectors.flush()
+                    self._vectors = None
+                with open(self._vectors_path, "ab") as f:
+                    f.truncate(wanted * self.dim * 4)
+                self._vectors = np.memmap(
+                    self._vectors_path,
+                    dtype=np.float32,
+                    mode="r+",
+                    shape=(wanted, self.dim),
+                )
+                self._free = list(range(wanted - 1, capacity - 1, -1)) + self._free
+                self._append(dim=self.dim, capacity=wanted)
+        evicted = []
+        while len(self._free) < needed and self._index:
+            _, row = self._index.popitem(last=False)
+            self._free.append(row)
+            evicted.append(row)
+        if evicted:
+            self.evictions += len(evicted)
+            # The evicted rows are about to be rewritten, drop them from disk first
+            self._append(evict=evicted)
+            LOGGER.info("🧹 Evicted %d entries from the embedding cache", len(evicted))
+
+    def get_many(self, keys: list[str]) -> list[Optional[list[float]]]:
+        """Look up the embeddings of several keys, marking them recently used.
+
+        Args:
+            keys (list[str]): Keys built with `EmbeddingCache.key`.
+
+        Returns:
+            list: The embedding of every key, None for those not cached.
+        """
+        with self._lock:
+            found: list[Optional[list[float]]] = []
+            used = []
+            for key in keys:
+                row = self._index.get(key)
+                if row is None or self._vectors is None:
+                    found.append(None)
+                    continue
+                self._index.move_to_end(key)
+                found.append(self._vectors[row].tolist())
+                used.append(row)
+            if used:
+                self._append(use=used)
+            return found
+
+    def put_many(self, keys: list[str], embeddings: list) -> None:
+        """Store the embeddings of several keys and enforce the size cap.
+
+        Args:
+            keys (list[str]): Distinct keys built with `EmbeddingCache.key`.
+            embeddings (list): The embedding of every key.
+        """
+        if not keys:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            if not self.dim:
+                self.dim = vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                LOGGER.warning(
+                    "⚠️ Embeddings of dimension %d not cached, the cache holds %d",
+                    vectors.shape[1],
+                    self.dim,
+                )
+                return
+            new = [num for num, key in enumerate(keys) if key not in self._index]
+            if self.max_entries:
+                # Only the latest entries fit when a call brings more than the cap
+                new = new[-self.max_entries :]
+            if not new:
+                return
+            self._grow(len(new))
+            vectors_file = self._vectors
+            if vectors_file is None:
+                return
+            stored = []
+            for num in new:
+                row = self._free.pop()
+                vectors_file[row] = vectors[num]
+                self._index[keys[num]] = row
+                stored.append((keys[num], row))
+            vectors_file.flush()
+            self._append(put=stored)
+
+    def embed(
+        self,
+        texts: list[str],
+        model: str,
+        task: str,
+        embed_missing: Callable[[list[str]], list],
+    ) -> list[list[float]]:
+        """Embed texts, computing only the embeddings not cached yet.
+
+        Texts repeated within the call are embedded once.
+
+        Args:
+            texts (list[str]): Texts to embed.
+            model (str): Name of the embedding model.
+            task (str): Task type of the embedding, e.g. retrieval_query.
+            embed_missing (Callable): Function embedding a list of texts.
+
+        Returns:
+            list: The embedding of every text, in order.
+        """
+        keys = [self.key(model, task, text) for text in texts]
+        found = {
+            key: vector
+            for key, vector in zip(keys, self.get_many(keys))
+            if vector is not None
+        }
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        cached = sum(1 for key in keys if key in found)
+        if missing:
+            embeddings = embed_missing(list(missing.values()))
+            self.put_many(list(missing), embeddings)
+            found.update(zip(missing, (list(e) for e in embeddings)))
+        with self._lock:
+            self.hits += cached
+            self.misses += len(missing)
+            self.deduped += len(keys) - cached - len(missing)
+        return [found[key] for key in keys]
+
+    def stats(self) -> dict:
+        """Counters and size of the cache.
+
+        Returns:
+            dict: Number of hits, misses, in-call duplicates and evictions since
+                the cache was opened, hit rate, and number and size of the
+                cached embeddings.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.deduped
+            capacity = 0 if self._vectors is None else self._vectors.shape[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "deduped": self.deduped,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._index),
+                "bytes": capacity * self.dim * 4,
+            }
+
+    def close(self) -> None:
+        """Write the pending vectors and release the cache directory."""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            self._index.clear()
+            self._free = []
+            self._log.close()
+            self._lock_file.close()
+
+
+_EMBEDDING_CACHE: Optional[EmbeddingCache] = None
+_CACHE_LOCKED = False
+_CACHE_LOCK = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the process-wide embedding cache, opening it on first use.
+
+    The cache lives in EMBEDDING_CACHE_DIR (default `cache/embeddings` in the
+    working directory) and its vectors are capped to EMBEDDING_CACHE_MAX_MB
+    megabytes. Disabled by setting EMBEDDING_CACHE to false, or when another
+    process already uses the directory.
+
+    Returns:
+        EmbeddingCache: The shared embedding cache, or None when disabled.
+    """
+    global _EMBEDDING_CACHE, _CACHE_LOCKED  # pylint: disable=global-statement
+    if os.getenv("EMBEDDING_CACHE", "true").lower() != "true":
+        return None
+    with _CACHE_LOCK:
+        if _EMBEDDING_CACHE is None and not _CACHE_LOCKED:
+            root = os.getenv(
+                "EMBEDDING_CACHE_DIR", str(Path.cwd() / "cache" / "embeddings")
+            )
+            max_bytes = env_int("EMBEDDING_CACHE_MAX_MB", 256) * 1024 * 1024
+            try:
+                _EMBEDDING_CACHE = EmbeddingCache(root, max_bytes)
+            except CacheLockedError:
+                _CACHE_LOCKED = True
+                LOGGER.warning(
+                    "⚠️ Embedding cache %s used by another process, running without it",
+                    root,
+                )
+        return _EMBEDDING_CACHE
@@ -0,0 +1,89 @@
+"""Module limiting the rate of the embedding requests sent to the API."""
+
+import threading
+import time
+from typing import Optional
+
+from ..processing.extraction_config import env_int
+
+
+class EmbeddingLimiter:
+    """Rate limit of the embedding requests, shared by the threads of the process.
+
+    Requests are spaced evenly, so that no more than `per_minute` of them start
+    in any minute, whichever thread sends them. The requests and embedded texts
+    are counted for the throughput reports.
+
+    Attributes:
+        per_minute (int): Maximal number of requests per minute, 0 disables the limit.
+        requests (int): Number of requests sent.
+        texts (int): Number of texts embedded by these requests.
+        waited_s (float): Total time spent waiting for the limit, in seconds.
+    """
+
+    def __init__(self, per_minute: int = 0) -> None:
+        """Initialise the limiter.
+
+        Args:
+            per_minute (int): Maximal number of requests per minute, 0 disables
+                the limit.
+        """
+        self.per_minute = per_minute
+        self.requests = 0
+        self.texts = 0
+        self.waited_s = 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, texts: int) -> float:
+        """Wait until a request can be sent, and count it.
+
+        Args:
+            texts (int): Number of texts embedded by the request.
+
+        Returns:
+            float: Seconds waited.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            if self.per_minute > 0:
+                self._next_start = start + 60 / self.per_minute
+            self.requests += 1
+            self.texts += texts
+            self.waited_s += start - now
+        if start > now:
+            time.sleep(start - now)
+        return start - now
+
+    def stats(self) -> dict:
+        """Counts of the limiter, for logs and telemetry.
+
+        Returns:
+            dict: The limit, numbers of requests and texts, and time waited.
+        """
+        return {
+            "per_minute": self.per_minute,
+            "requests": self.requests,
+            "texts": self.texts,
+            "waited_s": round(self.waited_s, 2),
+        }
+
+
+_EMBEDDING_LIMITER: Optional[EmbeddingLimiter] = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def get_embedding_limiter() -> EmbeddingLimiter:
+    """Get the process-wide embedding rate limiter.
+
+    The limit is read from EMBED_REQUESTS_PER_MIN, unlimited by default.
+
+    Returns:
+        EmbeddingLimiter: The shared limiter.
+    """
+    global _EMBEDDING_LIMITER  # pylint: disable=global-statement
+    with _LIMITER_LOCK:
+        if _EMBEDDING_LIMITER is None:
+            _EMBEDDING_LIMITER = EmbeddingLimiter(env_int("EMBED_REQUESTS_PER_MIN", 0))
+        return _EMBEDDING_LIMITER
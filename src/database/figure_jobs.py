@@ -0,0 +1,275 @@
+"""Module running the second, graphics phase of the ingestion in the background."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from chromadb.errors import NotFoundError
+from langfuse.decorators import langfuse_context, observe
+
+from ..processing import (
+    ExtractionConfig,
+    get_asset_store,
+    iter_documents,
+    with_images,
+)
+from ..processing.extraction_config import env_int
+from ..processing.page_manifest import PageManifest, session_manifest_dir
+from ..telemetry import Logger
+from .database import chroma_client, embed_fn
+from .ingestion_cache import IngestionCache
+
+LOGGER = Logger.get_logger()
+
+# Seconds the generation waits for the figures of the retrieved documents
+FIGURES_DEADLINE = env_int("FIGURES_DEADLINE", 60)
+
+# Number of sessions whose graphics are extracted at once
+FIGURE_WORKERS = env_int("FIGURE_WORKERS", 2)
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=FIGURE_WORKERS, thread_name_prefix="figures")
+_PENDING: dict[tuple[str, str], threading.Event] = {}
+# Batches of jobs waiting per session, a session is listed while its queue runs
+_QUEUES: dict[str, deque] = {}
+_CANCELLED: set[str] = set()
+_LOCK = threading.Lock()
+
+
+@dataclass
+class FigureJob:
+    """A document ingested text-only, waiting for its graphics.
+
+    Attributes:
+        pdf_path (str): Path to the PDF file.
+        content_hash (str): SHA-256 hash of the PDF file, to cache the final result.
+        ids (list[str]): Collection ids of the chunks of the document.
+        documents (list[str]): Text of the chunks.
+        metadatas (list[dict]): Metadata of the chunks, with their page ranges.
+        embeddings (list[list[float]]): Embeddings of the chunks.
+        previous (dict, optional): Page manifest entry of the former version of
+            the file, whose unchanged pages are reused.
+    """
+
+    pdf_path: str
+    content_hash: str
+    ids: list
+    documents: list
+    metadatas: list
+    embeddings: list
+    previous: Optional[dict] = None
+
+
+def schedule_figures(
+    session_id: str,
+    jobs: list[FigureJob],
+    config: ExtractionConfig,
+    cache: IngestionCache,
+    cache_tag: str,
+) -> None:
+    """Extract the graphics of documents ingested text-only in the background.
+
+    Each session has its own queue, run by a shared pool of FIGURE_WORKERS
+    threads, so that a large upload does not hold back the other sessions.
+
+    Args:
+        session_id (str): Unique identifier for the current session.
+        jobs (list[FigureJob]): Documents waiting for their graphics.
+        config (ExtractionConfig): Extraction settings of the session.
+        cache (IngestionCache): Cache receiving the complete ingestion results.
+        cache_tag (str): Extractor version and embedding model tag.
+    """
+    if not jobs:
+        return
+    batch = (jobs, replace(config, with_graphics=True), cache, cache_tag)
+    with _LOCK:
+        for job in jobs:
+            _PENDING[(session_id, job.pdf_path)] = threading.Event()
+        queue = _QUEUES.get(session_id)
+        if queue is None:
+            _QUEUES[session_id] = deque([batch])
+            _EXECUTOR.submit(_run_queue, session_id)
+        else:
+            queue.append(batch)
+    LOGGER.info("🖼️ Extracting graphics of %d PDFs in the background", len(jobs))
+
+
+def cancel_figures(session_id: str) -> None:
+    """Drop the background graphics extraction of an expired session.
+
+    Queued documents are not extracted, the running extraction stops before
+    storing its next document. Generations waiting for them go on text-only.
+
+    Args:
+        session_id (str): Unique identifier for the current session.
+    """
+    with _LOCK:
+        queue = _QUEUES.get(session_id)
+        if queue is not None:
+            queue.clear()
+            _CANCELLED.add(session_id)
+        pending = [key for key in _PENDING if key[0] == session_id]
+    for key in pending:
+        _finish(*key)
+
+
+def _cancelled(session_id: str) -> bool:
+    """Whether the graphics extraction of a session was cancelled."""
+    with _LOCK:
+        return session_id in _CANCELLED
+
+
+def _run_queue(session_id: str) -> None:
+    """Run the queued batches of a session one at a time, until its queue is empty."""
+    while True:
+        with _LOCK:
+            queue = _QUEUES[session_id]
+            if not queue:
+                del _QUEUES[session_id]
+                _CANCELLED.discard(session_id)
+                return
+            jobs, config, cache, cache_tag = queue.popleft()
+        _extract_figures(session_id, jobs, config, cache, cache_tag)
+
+
+@observe(name="🖼️ extract_figures")
+def _extract_figures(
+    session_id: str,
+    jobs: list[FigureJob],
+    config: ExtractionConfig,
+    cache: IngestionCache,
+    cache_tag: str,
+) -> None:
+    """Fill the images passage of documents ingested text-only."""
+    by_path = {job.pdf_path: job for job in jobs}
+    failed: list[str] = []
+    try:
+        # The collection is gone if the session expired in the meantime
+        db = chroma_client.get_collection(name=session_id, embedding_function=embed_fn)
+        manifest = PageManifest(session_manifest_dir(session_id))
+        previous = {job.pdf_path: job.previous for job in jobs if job.previous}
+        documents = iter_documents(list(by_path), config, failed, previous)
+        for pdf_path, text, metadata in documents:
+            if _cancelled(session_id):
+                LOGGER.info("🚫 Session %s expired, graphics dropped", session_id)
+                break
+            job = by_path[pdf_path]
+            entry = manifest.record(
+                pdf_path, job.content_hash, config.extractor_tag, text, metadata
+            )
+            metadatas = _chunk_metadatas(job, metadata["images_passage"])
+            cache.put(
+                job.content_hash,
+                cache_tag,
+                list(zip(job.documents, metadatas, job.embeddings)),
+                get_asset_store(session_id),
+                entry,
+            )
+            db.update(ids=job.ids, metadatas=metadatas)
+            _finish(session_id, pdf_path)
+
+        # Let the generation go on text-only for the files which failed
+        for pdf_path in failed:
+            job = by_path[pdf_path]
+            db.update(ids=job.ids, metadatas=_chunk_metadatas(job, ""))
+    except (NotFoundError, ValueError):
+        LOGGER.info("🚫 Session %s expired, graphics dropped", session_id)
+    except Exception as e:
+        LOGGER.error(
+            "❌ Error extracting graphics for session %s", session_id, exc_info=e
+        )
+    finally:
+        for pdf_path in by_path:
+            _finish(session_id, pdf_path)
+
+    langfuse_context.update_current_observation(
+        output={"output.num_pdfs": len(jobs), "output.failed": failed}
+    )
+
+
+def _chunk_metadatas(job: FigureJob, images_passage: str) -> list[dict]:
+    """Metadata of the chunks of a document, with the graphics of their pages."""
+    return [
+        {**with_images(metadata, images_passage), "figures_ready": True}
+        for metadata in job.metadatas
+    ]
+
+
+def _finish(session_id: str, pdf_path: str) -> None:
+    """Mark the graphics of a PDF file as done and wake up the waiting generations."""
+    with _LOCK:
+        event = _PENDING.pop((session_id, pdf_path), None)
+    if event is not None:
+        event.set()
+
+
+@observe(name="⏳ wait_for_figures")
+def wait_for_figures(
+    session_id: str, metadatas: list, timeout: float = FIGURES_DEADLINE
+) -> list:
+    """Wait for the graphics of the retrieved chunks, up to a deadline.
+
+    Only the documents of the chunks passed in are waited for. Chunks whose
+    graphics are still missing when the deadline passes are used text-only.
+
+    Args:
+        session_id (str): Unique identifier for the current session.
+        metadatas (list): Metadata of the retrieved chunks.
+        timeout (float): Maximal number of seconds to wait.
+
+    Returns:
+        list: The metadata of the chunks, refreshed with their images passage.
+    """
+    deadline = time.monotonic() + timeout
+    waiting = [meta for meta in metadatas if meta.get("figures_ready") is False]
+    if not waiting:
+        return metadatas
+
+    start = time.monotonic()
+    for meta in waiting:
+        with _LOCK:
+            event = _PENDING.get((session_id, meta["pdf_path"]))
+        if event is not None:
+            event.wait(max(0.0, deadline - time.monotonic()))
+
+    # Read the metadata filled by the background extraction
+    try:
+        db = chroma_client.get_collection(name=session_id, embedding_function=embed_fn)
+    except (NotFoundError, ValueError):
+        LOGGER.warning(
+            "❌ Database collection not found for session ID: %s", session_id
+        )
+        return metadatas
+    refreshed = []
+    for meta in metadatas:
+        if meta.get("figures_ready") is False:
+            entries = db.get(
+                where={
+                    "$and": [
+                        {"pdf_path": meta["pdf_path"]},
+                        {"chunk": meta.get("chunk", 0)},
+                    ]
+                },
+                include=["metadatas"],
+            )
+            meta = (entries["metadatas"] or [meta])[0]
+        refreshed.append(meta)
+
+    text_only = sorted(
+        {meta["pdf_path"] for meta in refreshed if not meta.get("figures_ready")}
+    )
+    if text_only:
+        LOGGER.warning(
+            "⏳ Graphics not ready after %d s, using text only for: %s",
+            timeout,
+            ", ".join(text_only),
+        )
+    langfuse_context.update_current_observation(
+        output={
+            "output.waited_s": round(time.monotonic() - start, 3),
+            "output.text_only": text_only,
+        }
+    )
+    return refreshed
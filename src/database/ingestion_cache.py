@@ -0,0 +1,265 @@
+"""Module implementing the cross-session cache of ingested PDF files."""
+
+import json
+import os
+import re
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from ..processing.asset_store import AssetStore
+from ..processing.extraction_config import env_int
+from ..processing.page_manifest import PageManifest
+from ..telemetry import Logger
+
+LOGGER = Logger.get_logger()
+
+# Graphics file name of an images passage line
+GRAPHICS_NAME = re.compile(r'"path": "gfx/([^"]+)"')
+
+
+class IngestionCache:
+    """On-disk cache of the extraction and embedding results of PDF files.
+
+    Entries are keyed by the SHA-256 hash of the PDF bytes and a tag naming
+    the extractor version, chunking settings and embedding model, so a paper
+    uploaded again in any session skips extraction, chunking and embedding. The least recently used
+    entries are evicted once the cache grows over its size cap.
+
+    The graphics of every entry are kept in an asset store of the cache, and
+    its pages as recorded in the page manifest, so that a hit fills the asset
+    store and the page manifest of the session as an extraction would.
+
+    Attributes:
+        root (Path): Directory holding one JSON file per entry.
+        assets (AssetStore): Store of the graphics and recipes of the entries,
+            named after their entry.
+        max_bytes (int): Size cap of the cache, 0 disables eviction.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups not found in the cache.
+    """
+
+    def __init__(self, root, max_bytes: int = 0) -> None:
+        """Initialise the cache, creating its directory if needed.
+
+        Args:
+            root (str or Path): Directory holding the cache entries.
+            max_bytes (int): Size cap of the cache, 0 disables eviction.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.assets = AssetStore(self.root / "assets")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, content_hash: str, tag: str) -> Path:
+        """Path of the entry of a PDF file for an extractor tag."""
+        safe_tag = re.sub(r"[^a-zA-Z0-9_.-]", "_", tag)
+        return self.root / f"{content_hash}-{safe_tag}.json"
+
+    def get(
+        self,
+        content_hash: str,
+        tag: str,
+        pdf_path: str,
+        store: Optional[AssetStore] = None,
+        manifest: Optional[PageManifest] = None,
+    ) -> Optional[list[tuple[str, dict, list]]]:
+        """Look up the ingestion results of a PDF file.
+
+        The graphics names of the cached images passages are rewritten to the
+        name of the uploaded file, so they match the rest of the session.
+
+        Args:
+            content_hash (str): SHA-256 hash of the PDF file.
+            tag (str): Extractor version, chunking and embedding model tag.
+            pdf_path (str): Path of the uploaded PDF file.
+            store (AssetStore, optional): Asset store of the session, receiving
+                the graphics and recipes of the document on a hit.
+            manifest (PageManifest, optional): Page manifest of the session,
+                receiving the pages of the document on a hit.
+
+        Returns:
+            list: The text, metadata and embedding of every chunk of the
+                document, or None on a miss. Entries stored without their
+                graphics are missed when a store is given.
+        """
+        entry_path = self._entry_path(content_hash, tag)
+        try:
+            entry = json.loads(entry_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entry = None
+        if entry is None or (store is not None and "graphics" not in entry):
+            self.misses += 1
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        self.hits += 1
+
+        stem = os.path.splitext(os.path.basename(pdf_path))[0]
+
+        def rename(text: str) -> str:
+            return text.replace(f"doc{entry['stem']}_page", f"doc{stem}_page")
+
+        chunks = []
+        for chunk in entry["chunks"]:
+            metadata = dict(chunk["metadata"])
+            metadata["pdf_path"] = pdf_path
+            metadata["content_hash"] = content_hash
+            metadata["images_passage"] = rename(metadata["images_passage"])
+            chunks.append((chunk["document"], metadata, chunk["embedding"]))
+
+        if store is not None:
+            renames = {
+                f"{entry_path.stem}-{name}": rename(name)
+                for name in entry.get("graphics", [])
+            }
+            store.import_graphics(self.assets, renames, pdf_path)
+        if manifest is not None and entry.get("manifest"):
+            pages = entry["manifest"]["pages"]
+            for page in pages:
+                page["images"] = [rename(line) for line in page["images"]]
+            manifest.put(pdf_path, entry["manifest"])
+        return chunks
+
+    def put(
+        self,
+        content_hash: str,
+        tag: str,
+        chunks: list[tuple[str, dict, list]],
+        store: Optional[AssetStore] = None,
+        manifest_entry: Optional[dict] = None,
+    ) -> None:
+        """Store the ingestion results of a PDF file and enforce the size cap.
+
+        Args:
+            content_hash (str): SHA-256 hash of the PDF file.
+            tag (str): Extractor version, chunking and embedding model tag.
+            chunks (list): The text, metadata (including its images passage) and
+                embedding of every chunk of the document.
+            store (AssetStore, optional): Asset store of the session holding the
+                graphics of the document, copied into the cache.
+            manifest_entry (dict, optional): Page manifest entry of the document.
+        """
+        entry_path = self._entry_path(content_hash, tag)
+        graphics = sorted(
+            {
+                match.group(1)
+                for _, metadata, _ in chunks
+                for match in GRAPHICS_NAME.finditer(metadata["images_passage"])
+            }
+        )
+        entry: dict = {
+            "stem": os.path.splitext(os.path.basename(chunks[0][1]["pdf_path"]))[0],
+            "manifest": manifest_entry,
+            "chunks": [
+                {
+                    "document": document,
+                    "metadata": metadata,
+                    "embedding": [float(value) for value in embedding],
+                }
+                for document, metadata, embedding in chunks
+            ],
+        }
+        if store is not None:
+            self.assets.import_graphics(
+                store, {name: f"{entry_path.stem}-{name}" for name in graphics}
+            )
+            entry["graphics"] = graphics
+        tmp_path = self.root / f".{entry_path.name}.{uuid.uuid4().hex}"
+        tmp_path.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(tmp_path, entry_path)
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove the least recently used entries until the cache fits its cap.
+
+        The graphics count towards the cap, those of an evicted entry are
+        removed with it unless another entry shows them too.
+
+        Returns:
+            int: Number of bytes freed.
+        """
+        if self.max_bytes <= 0:
+            return 0
+
+        entries = []
+        total = self.assets.stats()["bytes"]
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                freed += self._remove_graphics(Path(path))
+                os.remove(path)
+                freed += size
+            except OSError:
+                pass
+        if freed:
+            self.assets.prune()
+            LOGGER.info("🧹 Evicted %d bytes from the ingestion cache", freed)
+        return freed
+
+    def _remove_graphics(self, entry_path: Path) -> int:
+        """Unregister the graphics of an entry, returning the bytes of the blobs
+        no other entry shows."""
+        try:
+            entry = json.loads(entry_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return 0
+        names = [f"{entry_path.stem}-{name}" for name in entry.get("graphics", [])]
+        freed = 0
+        for name in names:
+            try:
+                stat = (self.assets.names_dir / name).stat()
+            except OSError:
+                continue
+            # Linked from the blob and this name only
+            if stat.st_nlink <= 2:
+                freed += stat.st_size
+        self.assets.remove(names)
+        return freed
+
+    def stats(self) -> dict:
+        """Hit and miss counters of the cache.
+
+        Returns:
+            dict: Number of hits and misses since the cache was opened.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_INGESTION_CACHE: Optional[IngestionCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_ingestion_cache() -> IngestionCache:
+    """Get the process-wide ingestion cache, opening it on first use.
+
+    The cache lives in INGESTION_CACHE_DIR (default `cache/ingestion` in the
+    working directory) and is capped to INGESTION_CACHE_MAX_MB megabytes.
+
+    Returns:
+        IngestionCache: The shared ingestion cache.
+    """
+    global _INGESTION_CACHE  # pylint: disable=global-statement
+    with _CACHE_LOCK:
+        if _INGESTION_CACHE is None:
+            root = os.getenv(
+                "INGESTION_CACHE_DIR", str(Path.cwd() / "cache" / "ingestion")
+            )
+            max_bytes = env_int("INGESTION_CACHE_MAX_MB", 512) * 1024 * 1024
+            _INGESTION_CACHE = IngestionCache(root, max_bytes)
+        return _INGESTION_CACHE
@@ -0,0 +1,103 @@
+"""Module comparing uploaded PDF files with the content already in a collection."""
+
+from dataclasses import dataclass, field
+
+
+def chunk_id(content_hash: str, chunk: int) -> str:
+    """Stable collection id of a chunk, derived from the content of its PDF file.
+
+    Args:
+        content_hash (str): SHA-256 hash of the PDF file.
+        chunk (int): Index of the chunk in the document.
+
+    Returns:
+        str: The id of the chunk.
+    """
+    return f"{content_hash}-{chunk}"
+
+
+@dataclass
+class IngestionDiff:
+    """What an upload changes in a collection, computed before any embedding.
+
+    Attributes:
+        new (list[str]): PDF files whose content is not in the collection yet,
+            the only ones to extract and embed.
+        unchanged (list[str]): PDF files whose content is already in the
+            collection, under their path or another one.
+        replaced (list[str]): Paths of the uploaded files whose previous content
+            is in the collection.
+        stale_ids (list[str]): Ids of the chunks of the replaced content, removed
+            once the new content is stored.
+        stale_by_path (dict[str, list[str]]): The same ids, keyed by the path of
+            the replaced file.
+    """
+
+    new: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    replaced: list[str] = field(default_factory=list)
+    stale_ids: list[str] = field(default_factory=list)
+    stale_by_path: dict[str, list[str]] = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        """Number of files and chunks in each category, for logs and telemetry.
+
+        Returns:
+            dict: The counts keyed by category.
+        """
+        return {
+            "new": len(self.new),
+            "unchanged": len(self.unchanged),
+            "replaced": len(self.replaced),
+            "stale_chunks": len(self.stale_ids),
+        }
+
+
+def diff_entries(entries: dict, pdf_hashes: dict[str, str]) -> IngestionDiff:
+    """Compare uploaded PDF files with the entries of a collection.
+
+    A file is new when no chunk of the collection comes from the same content,
+    whatever its path. The chunks stored for the path of an uploaded file, from
+    an earlier version of it, become stale.
+
+    Args:
+        entries (dict): Ids and metadatas of the collection, as returned by `get`.
+        pdf_hashes (dict[str, str]): SHA-256 hash of every uploaded PDF file.
+
+    Returns:
+        IngestionDiff: The files to ingest, the ones to skip and the stale chunks.
+    """
+    stored = []
+    for entry_id, meta in zip(entries.get("ids") or [], entries.get("metadatas") or []):
+        meta = meta or {}
+        stored.append(
+            (entry_id, meta.get("pdf_path", ""), meta.get("content_hash", ""))
+        )
+
+    # Chunks of an earlier version of an uploaded file are replaced
+    diff = IngestionDiff()
+    for pdf_path, content_hash in pdf_hashes.items():
+        stale = [
+            entry_id
+            for entry_id, path, old_hash in stored
+            if path == pdf_path and old_hash != content_hash
+        ]
+        if stale:
+            diff.replaced.append(pdf_path)
+            diff.stale_ids += stale
+            diff.stale_by_path[pdf_path] = stale
+
+    # Content kept in the collection is not embedded again, whatever its path
+    stale_ids = set(diff.stale_ids)
+    known_hashes = {
+        content_hash
+        for entry_id, _, content_hash in stored
+        if entry_id not in stale_ids
+    }
+    for pdf_path, content_hash in pdf_hashes.items():
+        if content_hash in known_hashes:
+            diff.unchanged.append(pdf_path)
+        else:
+            known_hashes.add(content_hash)
+            diff.new.append(pdf_path)
+    return diff
@@ -0,0 +1,175 @@
+"""Module describing the ingestion jobs and the progress of their files."""
+
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+# States of a file of an ingestion job, in the order they are reached
+QUEUED = "queued"
+EXTRACTING = "extracting"
+EMBEDDING = "embedding"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+
+@dataclass
+class FileProgress:
+    """Progress of one file of an ingestion job.
+
+    Attributes:
+        content_hash (str): SHA-256 hash of the file, empty if not known yet.
+        state (str): Current state of the file.
+        entered (dict[str, float]): Time at which the file reached every state.
+    """
+
+    content_hash: str = ""
+    state: str = QUEUED
+    entered: dict[str, float] = field(default_factory=dict)
+
+    def seconds(self) -> float:
+        """Seconds spent since the file was queued, until it was finished."""
+        start = self.entered.get(QUEUED, time.time())
+        end = self.entered.get(self.state) if self.state in FINAL_STATES else None
+        return (end or time.time()) - start
+
+
+@dataclass
+class IngestionJob:
+    """An upload ingested in the background, persisted with its progress.
+
+    Attributes:
+        session_id (str): Unique identifier of the session the files belong to.
+        files (dict[str, FileProgress]): Progress of every file, keyed by path.
+        job_id (str): Unique identifier of the job.
+        cancelled (bool): Whether the cancellation of the job was requested.
+        error (str): Error which stopped the whole job, if any.
+    """
+
+    session_id: str
+    files: dict[str, FileProgress]
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    cancelled: bool = False
+    error: str = ""
+
+    @classmethod
+    def create(
+        cls, session_id: str, pdf_files: list[str], pdf_hashes: dict[str, str]
+    ) -> "IngestionJob":
+        """Create a job with all its files queued.
+
+        Args:
+            session_id (str): Unique identifier for the current session.
+            pdf_files (list[str]): Paths of the PDF files to ingest.
+            pdf_hashes (dict[str, str]): SHA-256 hash of the files, keyed by path.
+
+        Returns:
+            IngestionJob: The new job.
+        """
+        now = time.time()
+        files = {
+            pdf_path: FileProgress(pdf_hashes.get(pdf_path, ""), QUEUED, {QUEUED: now})
+            for pdf_path in pdf_files
+        }
+        return cls(session_id, files)
+
+    def set_state(self, pdf_path: str, state: str) -> None:
+        """Move a file to a new state, unless it is already finished.
+
+        Args:
+            pdf_path (str): Path of the PDF file.
+            state (str): The new state.
+        """
+        progress = self.files.get(pdf_path)
+        if progress is None or progress.state in FINAL_STATES:
+            return
+        progress.state = state
+        progress.entered.setdefault(state, time.time())
+
+    def finish(self, state: str) -> None:
+        """Move all the files not finished yet to a final state.
+
+        Args:
+            state (str): The final state, FAILED or CANCELLED.
+        """
+        for pdf_path in self.files:
+            self.set_state(pdf_path, state)
+
+    def requeue(self) -> None:
+        """Move the files not finished yet back to the queue, as if just queued."""
+        now = time.time()
+        for progress in self.files.values():
+            if progress.state not in FINAL_STATES:
+                progress.state = QUEUED
+                progress.entered = {QUEUED: progress.entered.get(QUEUED, now)}
+
+    def is_finished(self) -> bool:
+        """Whether all the files of the job are finished."""
+        return all(progress.state in FINAL_STATES for progress in self.files.values())
+
+    def hashes(self) -> dict[str, str]:
+        """SHA-256 hash of the files known when the job was created."""
+        return {
+            pdf_path: progress.content_hash
+            for pdf_path, progress in self.files.items()
+            if progress.content_hash
+        }
+
+    def summary(self) -> dict[str, int]:
+        """Number of files in every state, for logs and telemetry.
+
+        Returns:
+            dict[str, int]: The counts keyed by state, zeros left out.
+        """
+        counts: dict[str, int] = {}
+        for progress in self.files.values():
+            counts[progress.state] = counts.get(progress.state, 0) + 1
+        return counts
+
+    def save(self, root: Path) -> None:
+        """Write the job to its JSON file, atomically.
+
+        Args:
+            root (Path): Directory of the jobs of the session.
+        """
+        root.mkdir(parents=True, exist_ok=True)
+        tmp_path = root / f".{self.job_id}.{uuid.uuid4().hex}"
+        tmp_path.write_text(json.dumps(asdict(self)), encoding="utf-8")
+        os.replace(tmp_path, root / f"{self.job_id}.json")
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["IngestionJob"]:
+        """Read a job back from its JSON file.
+
+        Args:
+            path (Path): Path of the JSON file.
+
+        Returns:
+            IngestionJob: The job, or None if the file cannot be read.
+        """
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            data["files"] = {
+                pdf_path: FileProgress(**progress)
+                for pdf_path, progress in data["files"].items()
+            }
+            return cls(**data)
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+
+def session_jobs_dir(session_id: str) -> Path:
+    """Directory of the ingestion jobs of a session.
+
+    Args:
+        session_id (str): Unique identifier for the current session.
+
+    Returns:
+        Path: Path to the directory of the job files.
+    """
+    return Path.cwd() / "tmp" / session_id / "jobs"
@@ -0,0 +1,316 @@
+"""Module running the ingestion of uploaded files as background jobs."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from langfuse.decorators import langfuse_context, observe
+
+from ..processing.extraction_config import env_int
+from ..telemetry import Logger
+from .db_manipulation import ingest_files_to_db
+from .ingestion_jobs import (
+    CANCELLED,
+    FAILED,
+    FINAL_STATES,
+    QUEUED,
+    IngestionJob,
+    session_jobs_dir,
+)
+
+LOGGER = Logger.get_logger()
+
+
+class JobQueue:
+    """Bounded queue of ingestion jobs, run by a pool of background threads.
+
+    Every job is persisted to the session directory whenever one of its files
+    changes state, so its progress can be followed from the UI and the jobs
+    interrupted by a restart are resumed (see `resume`). The jobs of one session run one at a time, in
+    submission order, since they update the same collection.
+
+    Attributes:
+        max_jobs (int): Maximal number of jobs queued or running at once.
+    """
+
+    def __init__(self, max_jobs: int, workers: int) -> None:
+        """Initialise the queue and its threads.
+
+        Args:
+            max_jobs (int): Maximal number of jobs queued or running at once.
+            workers (int): Number of jobs run in parallel.
+        """
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="ingestion"
+        )
+        self._jobs: dict[str, IngestionJob] = {}
+        # Ids of the jobs queued or running, until their run has returned
+        self._active: set[str] = set()
+        self._session_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def has_room(self) -> bool:
+        """Whether a new job can be submitted.
+
+        Returns:
+            bool: True if fewer than `max_jobs` jobs are unfinished.
+        """
+        with self._lock:
+            return len(self._active) < self.max_jobs
+
+    def submit(
+        self, session_id: str, pdf_files: list[str], pdf_hashes: dict[str, str]
+    ) -> IngestionJob:
+        """Queue the ingestion of uploaded files.
+
+        The bound of the queue is not enforced here: callers check `has_room`
+        before saving the uploaded files.
+
+        Args:
+            session_id (str): Unique identifier for the current session.
+            pdf_files (list[str]): Paths of the PDF files to ingest.
+            pdf_hashes (dict[str, str]): SHA-256 hash of the files, keyed by path.
+
+        Returns:
+            IngestionJob: The queued job.
+        """
+        job = IngestionJob.create(session_id, pdf_files, pdf_hashes)
+        self._enqueue(job)
+        LOGGER.info("📥 Queued ingestion job %s of %d PDFs", job.job_id, len(pdf_files))
+        return job
+
+    def resume(self, root: Optional[Path] = None) -> int:
+        """Queue again the jobs left unfinished by an earlier process.
+
+        The ingestion skips the content already stored, so the files of an
+        interrupted job are queued again rather than reported as failed. Jobs
+        whose cancellation was requested are finished as cancelled instead.
+
+        Args:
+            root (Path, optional): Directory holding the session directories,
+                `tmp` of the working directory by default.
+
+        Returns:
+            int: Number of jobs queued again.
+        """
+        root = root or Path.cwd() / "tmp"
+        resumed = 0
+        for path in sorted(root.glob("*/jobs/*.json")):
+            job = IngestionJob.load(path)
+            if job is None or job.is_finished():
+                continue
+            with self._lock:
+                if job.job_id in self._jobs:
+                    continue
+            if job.cancelled:
+                job.finish(CANCELLED)
+                job.save(path.parent)
+                continue
+            job.requeue()
+            self._enqueue(job)
+            resumed += 1
+        if resumed:
+            LOGGER.info("🔁 Resumed %d interrupted ingestion jobs", resumed)
+        return resumed
+
+    def jobs(self, session_id: str) -> list[IngestionJob]:
+        """Jobs of a session, oldest first.
+
+        Jobs persisted by an earlier process are read back from their files.
+
+        Args:
+            session_id (str): Unique identifier for the current session.
+
+        Returns:
+            list[IngestionJob]: The running, queued and finished jobs.
+        """
+        root = session_jobs_dir(session_id)
+        with self._lock:
+            jobs = {
+                job.job_id: job
+                for job in self._jobs.values()
+                if job.session_id == session_id
+            }
+        for path in root.glob("*.json"):
+            if path.stem in jobs:
+                continue
+            job = IngestionJob.load(path)
+            if job is not None:
+                jobs[job.job_id] = job
+        return sorted(
+            jobs.values(),
+            key=lambda job: min(
+                (progress.entered.get(QUEUED, 0) for progress in job.files.values()),
+                default=0,
+            ),
+        )
+
+    def pending_files(self, session_id: str) -> list[str]:
+        """Files of a session still queued or being ingested.
+
+        Args:
+            session_id (str): Unique identifier for the current session.
+
+        Returns:
+            list[str]: Paths of the unfinished files.
+        """
+        with self._lock:
+            return [
+                pdf_path
+                for job in self._jobs.values()
+                if job.session_id == session_id
+                for pdf_path, progress in job.files.items()
+                if progress.state not in FINAL_STATES
+            ]
+
+    def cancel(self, session_id: str) -> int:
+        """Cancel the unfinished jobs of a session.
+
+        Queued jobs are not started, running ones stop before storing their
+        next document, whose extraction workers are killed.
+
+        Args:
+            session_id (str): Unique identifier for the current session.
+
+        Returns:
+            int: Number of jobs cancelled.
+        """
+        with self._lock:
+            jobs = [
+                job
+                for job in self._jobs.values()
+                if job.session_id == session_id and job.job_id in self._active
+            ]
+            for job in jobs:
+                job.cancelled = True
+        if jobs:
+            LOGGER.info("🚫 Cancelled %d ingestion jobs", len(jobs))
+        return len(jobs)
+
+    def wait(self, session_id: str, timeout: Optional[float] = None) -> bool:
+        """Wait for the jobs of a session to finish.
+
+        Args:
+            session_id (str): Unique identifier for the current session.
+            timeout (float, optional): Maximal number of seconds to wait.
+
+        Returns:
+            bool: True if all the jobs of the session are finished.
+        """
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: not any(
+                    self._jobs[job_id].session_id == session_id
+                    for job_id in self._active
+                ),
+                timeout,
+            )
+
+    def forget(self, session_id: str) -> None:
+        """Drop the jobs of an expired session from memory.
+
+        Args:
+            session_id (str): Unique identifier for the current session.
+        """
+        with self._lock:
+            for job_id in [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.session_id == session_id and job_id not in self._active
+            ]:
+                del self._jobs[job_id]
+            if not any(job.session_id == session_id for job in self._jobs.values()):
+                self._session_locks.pop(session_id, None)
+
+    def _enqueue(self, job: IngestionJob) -> None:
+        """Register a job, persist it and submit it to the threads."""
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._active.add(job.job_id)
+            self._session_locks.setdefault(job.session_id, threading.Lock())
+        job.save(session_jobs_dir(job.session_id))
+        self._executor.submit(self._run, job)
+
+    def _update(self, job: IngestionJob, pdf_path: str, state: str) -> None:
+        """Record the new state of a file of a job and persist the job."""
+        with self._changed:
+            job.set_state(pdf_path, state)
+            try:
+                job.save(session_jobs_dir(job.session_id))
+            except OSError as e:
+                # The session may have expired and its directory been deleted
+                LOGGER.warning("⚠️ Could not save ingestion job %s: %s", job.job_id, e)
+            self._changed.notify_all()
+
+    def _finish(self, job: IngestionJob, state: str) -> None:
+        """Move the unfinished files of a job to a final state."""
+        for pdf_path, progress in job.files.items():
+            if progress.state not in FINAL_STATES:
+                self._update(job, pdf_path, state)
+
+    @observe(name="🧵 ingestion_job")
+    def _run(self, job: IngestionJob) -> None:
+        """Ingest the files of a job, reporting the progress of every file."""
+        try:
+            with self._session_locks[job.session_id]:
+                if not job.cancelled:
+                    ingest_files_to_db(
+                        [
+                            pdf_path
+                            for pdf_path, progress in job.files.items()
+                            if progress.state not in FINAL_STATES
+                        ],
+                        job.session_id,
+                        job.hashes(),
+                        progress=lambda pdf_path, state: self._update(
+                            job, pdf_path, state
+                        ),
+                        cancelled=lambda: job.cancelled,
+                    )
+        except Exception as e:
+            LOGGER.error("❌ Ingestion job %s failed", job.job_id, exc_info=e)
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            self._finish(job, CANCELLED if job.cancelled else FAILED)
+            with self._changed:
+                self._active.discard(job.job_id)
+                self._changed.notify_all()
+
+        langfuse_context.update_current_observation(
+            output={
+                "output.job_id": job.job_id,
+                "output.files": job.summary(),
+                "output.seconds": {
+                    pdf_path: round(progress.seconds(), 2)
+                    for pdf_path, progress in job.files.items()
+                },
+                "output.error": job.error or None,
+            }
+        )
+
+
+_JOB_QUEUE: Optional[JobQueue] = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide ingestion job queue, starting it on first use.
+
+    At most INGEST_QUEUE_SIZE jobs (default 8) are queued or running at once,
+    and INGEST_JOB_WORKERS of them (default 1) run in parallel. The jobs
+    interrupted by a restart are queued again when the queue starts.
+
+    Returns:
+        JobQueue: The shared job queue.
+    """
+    global _JOB_QUEUE  # pylint: disable=global-statement
+    with _QUEUE_LOCK:
+        if _JOB_QUEUE is None:
+            _JOB_QUEUE = JobQueue(
+                env_int("INGEST_QUEUE_SIZE", 8), env_int("INGEST_JOB_WORKERS", 1)
+            )
+            _JOB_QUEUE.resume()
+        return _JOB_QUEUE
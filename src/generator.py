@@ -1,5 +1,6 @@
 """Module to put it all together and manage the generation of a presentation."""
 
+import time
 from dataclasses import dataclass
 from typing import Optional
 
@@ -8,8 +9,11 @@ from langfuse.decorators import langfuse_context, observe
 from src.compilation import (compile_presentation, escape_latex_special_chars,
                              json_to_tex, replace_unicode_greek)
 # from datetime import datetime
-from src.database import retrive_files_from_db
-from src.processing import create_output_folder, find_used_gfx
+from src.database import (corpus_asset_store, get_job_queue,
+                          retrive_files_from_db, wait_for_figures)
+from src.processing import (create_output_folder, dedupe_graphics,
+                            estimate_tokens, find_used_gfx, get_asset_store,
+                            normalise_assets, rename_assets)
 from src.services import build_prompt, client, generate_with_retry
 from src.telemetry import Logger
 
@@ -58,17 +62,35 @@ def generate_presentation(
 
     trace_id = langfuse_context.get_current_trace_id()
 
+    # Files still ingested in the background are left out of this presentation
+    pending = get_job_queue().pending_files(session_id)
+    if pending:
+        LOGGER.info("⏳ Generating from the ready files, %d in progress", len(pending))
+
     [documents], [metadatas] = retrive_files_from_db(config.topic, session_id)
 
     if not documents or not metadatas:
         LOGGER.error("❌ No documents found for the topic: %s", config.topic)
         return "❌ No documents found for the given topic.", trace_id, None
 
+    # Wait for the graphics still extracted in the background, if any
+    metadatas = wait_for_figures(session_id, metadatas)
+
+    # Show the graphics reused across the retrieved documents only once
+    metadatas, dedupe_stats = dedupe_graphics(metadatas)
+    if dedupe_stats["entries_removed"]:
+        LOGGER.info(
+            "🪞 Removed %d near-duplicate graphics from the prompt (%d tokens)",
+            dedupe_stats["entries_removed"],
+            dedupe_stats["tokens_removed"],
+        )
+
     prompt = build_prompt(documents, metadatas, config.aspect_ratio, config.topic)
 
     # Generate the presentation code
     model_name = config.model_name
     LOGGER.info("⭐️ Generating response...")
+    start = time.perf_counter()
     try:
         answer = generate_with_retry(client, model_name, prompt)
     except Exception as e:
@@ -81,6 +103,11 @@ def generate_presentation(
             "session_id": session_id,
             "aspect_ratio": config.aspect_ratio,
             "prompt_length": len(prompt),
+            "prompt_tokens": estimate_tokens(prompt),
+            "num_chunks": len(documents),
+            "graphics_dedupe": dedupe_stats,
+            "ingestion_pending": len(pending),
+            "generation_s": round(time.perf_counter() - start, 3),
             "output.response": answer.text,
         }
     )
@@ -88,9 +115,12 @@ def generate_presentation(
 
     work_dir = create_output_folder(session_id)
 
-    find_used_gfx(answer, work_dir, metadatas)
+    stores = [get_asset_store(session_id), corpus_asset_store()]
+    find_used_gfx(answer, work_dir, metadatas, [store for store in stores if store])
+    renames = normalise_assets(answer.text, work_dir, config.aspect_ratio)
+    presentation_json = rename_assets(answer.text, renames)
     latex_code = json_to_tex(
-        answer.text, config.theme, config.color_theme, config.aspect_ratio
+        presentation_json, config.theme, config.color_theme, config.aspect_ratio
     )
     latex_code = replace_unicode_greek(latex_code)
     latex_code = escape_latex_special_chars(latex_code)
@@ -1,15 +1,22 @@
 """This module initializes the UI package."""
 
 from .gradio_interface import demo
-from .manage_files import delete_files, download_files, upload_files
-from .session_manager import (check_session_status, create_session,
-                              with_update_session)
+from .manage_files import (
+    cancel_ingestion,
+    delete_files,
+    download_files,
+    ingestion_status,
+    upload_files,
+)
+from .session_manager import check_session_status, create_session, with_update_session
 
 __all__ = [
     "demo",
     "upload_files",
     "download_files",
     "delete_files",
+    "ingestion_status",
+    "cancel_ingestion",
     "create_session",
     "with_update_session",
     "check_session_status",
@@ -9,11 +9,17 @@ from gradio_pdf import PDF
 
 from ..generator import generate_presentation
 from ..telemetry import submit_feedback
-from .manage_files import download_files, upload_files
-from .session_manager import (check_session_status, create_session,
-                              with_update_session)
+from .manage_files import (
+    cancel_ingestion,
+    download_files,
+    ingestion_status,
+    upload_files,
+)
+from .session_manager import check_session_status, create_session, with_update_session
 
 SESSION_TIMEOUT = 900
+# Seconds between two refreshes of the ingestion progress
+INGESTION_POLL_S = 2
 
 
 def update_config(key, value, config) -> dict:
@@ -298,6 +304,7 @@ with gr.Blocks(theme=theme, js=JS_FUNC) as demo:
                 file_types=[".pdf"], file_count="multiple", label="Select PDF Files"
             )
             upload_button = gr.Button("Upload Files", variant="primary")
+            cancel_button = gr.Button("Cancel Processing", variant="secondary")
 
             gr.Markdown("## 🎨 Step 2: Choose the parameters")
             config_state = gr.State({})
@@ -413,6 +420,10 @@ with gr.Blocks(theme=theme, js=JS_FUNC) as demo:
             upload_output = gr.Textbox(
                 label="Upload Status", lines=3, interactive=False
             )
+            ingestion_output = gr.Textbox(
+                label="Processing Status", lines=3, interactive=False
+            )
+            ingestion_timer = gr.Timer(INGESTION_POLL_S)
 
             gr.Markdown("## 📝 Presentation Processing")
             compilation_status = gr.Textbox(
@@ -524,6 +535,20 @@ with gr.Blocks(theme=theme, js=JS_FUNC) as demo:
         outputs=[upload_output, uploaded_files_state],
     )
 
+    # Follow the background ingestion of the uploaded files
+    ingestion_timer.tick(
+        fn=ingestion_status,
+        inputs=session_id_state,
+        outputs=ingestion_output,
+        show_progress="hidden",
+    )
+
+    cancel_button.click(
+        fn=with_update_session(cancel_ingestion),
+        inputs=session_id_state,
+        outputs=upload_output,
+    )
+
     trace_id_state = gr.State("")
     submit_topic_button.click(
         fn=with_update_session(lambda x: ""),
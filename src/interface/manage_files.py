@@ -1,18 +1,43 @@
 """Module to handle file uploads and downloads via UI."""
 
+import os
 import re
 import shutil
+import uuid
 import zipfile
 from pathlib import Path
 
-from ..database import ingest_files_to_db
+from ..database import get_job_queue
+from ..database.ingestion_jobs import (
+    CANCELLED,
+    DONE,
+    EMBEDDING,
+    EXTRACTING,
+    FAILED,
+    FINAL_STATES,
+    QUEUED,
+)
+from ..processing.hashing import move_with_sha256
 from ..telemetry.logging_utils import Logger
+from .upload_manifest import UploadManifest
 
 LOGGER = Logger.get_logger()
 
+STATE_ICONS = {
+    QUEUED: "🕒",
+    EXTRACTING: "📖",
+    EMBEDDING: "🧮",
+    DONE: "✅",
+    FAILED: "❌",
+    CANCELLED: "🚫",
+}
+
 
 def upload_files(files: list, session_id: str) -> tuple[str, list[str]]:
-    """Upload files and save them in the temporary directory.
+    """Upload files, save them in the temporary directory and queue their ingestion.
+    Every file is hashed while it is moved, and files whose content is already
+    in the session are dropped before any parsing. The ingestion runs in the
+    background, its progress is reported by `ingestion_status`.
     Args:
         files (list): List of file-like objects to be uploaded.
         session_id (str): Unique identifier for the current session.
@@ -22,56 +47,121 @@ def upload_files(files: list, session_id: str) -> tuple[str, list[str]]:
     """
     if not files:
         return "❌ No new files selected.", []
+    if not get_job_queue().has_room():
+        return "⏳ Too many uploads are being processed, please retry shortly.", []
 
     upload_dir = Path.cwd() / "tmp" / session_id
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    manifest = UploadManifest(upload_dir)
 
     messages = []
     saved_paths = []
+    pdf_hashes = {}
 
     for file in files:
+        staged_path = None
         try:
             temp_path = Path(file.name)
             # Prepare the safe file name
             safe_name = re.sub(r"[^a-zA-Z0-9_]", "_", temp_path.stem)
             safe_name = re.sub(r"_+", "_", safe_name)
             file_name = f"{safe_name}{temp_path.suffix}"
-            target_path = upload_dir / file_name
-
-            if target_path.exists():
-                messages.append(f"⚠️ File already exists: {file_name}")
-                continue
 
             if not temp_path.exists():
                 messages.append(f"❌ File not found: {file_name}")
                 continue
 
-            shutil.move(str(temp_path), str(target_path))
-            messages.append(f"✅ Uploaded new file: {file_name}")
+            # Hash the file while moving it, a rename on the same filesystem
+            staged_path = upload_dir / f".upload_{uuid.uuid4().hex}{temp_path.suffix}"
+            content_hash = move_with_sha256(temp_path, staged_path)
+
+            duplicate = manifest.find(content_hash)
+            if duplicate is not None:
+                staged_path.unlink()
+                if duplicate == file_name:
+                    messages.append(f"⚠️ File already exists: {file_name}")
+                else:
+                    messages.append(
+                        f"⚠️ File already uploaded as {duplicate}: {temp_path.name}"
+                    )
+                continue
+
+            # A file uploaded again under the same name is a revision of it,
+            # another file with the same sanitised name is kept next to it
+            file_name = manifest.place(temp_path.name, file_name)
+            target_path = upload_dir / file_name
+            revised = target_path.exists()
+            os.replace(staged_path, target_path)
+            manifest.record(file_name, content_hash, temp_path.name)
+            if revised:
+                messages.append(f"🔄 Uploaded revised file: {file_name}")
+            else:
+                messages.append(f"✅ Uploaded new file: {file_name}")
             LOGGER.info("📤 Uploaded file %s to %s", file_name, upload_dir)
 
             saved_paths.append(str(target_path))
+            pdf_hashes[str(target_path)] = content_hash
 
         except (FileNotFoundError, PermissionError, shutil.Error, OSError) as e:
             LOGGER.error("❌ Error uploading %s", file_name, exc_info=e)
             messages.append(f"❌ Error uploading {file_name}: {e}")
+            if staged_path is not None:
+                staged_path.unlink(missing_ok=True)
 
     if saved_paths:
-        failed = ingest_files_to_db(saved_paths, session_id)
-        if failed:
-            messages.append(
-                f"⚠️ Failed to process files: {', '.join(Path(f).name for f in failed)}"
-            )
-            LOGGER.warning(
-                "⚠️ Failed to process files: %s", ", ".join(Path(f).name for f in failed)
-            )
-        else:
-            messages.append("🛠️ All files processed successfully!")
-            LOGGER.info("🛠️ All files processed successfully!")
+        job = get_job_queue().submit(session_id, saved_paths, pdf_hashes)
+        messages.append(
+            f"⏳ Processing {len(saved_paths)} files in the background, "
+            f"job {job.job_id}"
+        )
 
     return "\n".join(messages), saved_paths
 
 
+def ingestion_status(session_id: str) -> str:
+    """Describe the progress of the ingestion jobs of a session.
+    Args:
+        session_id (str): Unique identifier for the current session.
+    Returns:
+        str: One line per uploaded file with its state and timing, and a summary
+            of the files ready for the generation.
+    """
+    lines = []
+    ready = pending = 0
+    for job in get_job_queue().jobs(session_id):
+        for pdf_path, progress in job.files.items():
+            lines.append(
+                f"{STATE_ICONS.get(progress.state, '❔')} {Path(pdf_path).name}: "
+                f"{progress.state} ({progress.seconds():.0f} s)"
+            )
+            ready += progress.state == DONE
+            pending += progress.state not in FINAL_STATES
+        if job.error:
+            lines.append(f"❌ Job {job.job_id}: {job.error}")
+    if not lines:
+        return ""
+    if pending:
+        lines.append(
+            f"🛠️ {ready} files ready, {pending} in progress: "
+            "presentations can already be generated from the ready ones."
+        )
+    else:
+        lines.append(f"🛠️ {ready} files ready.")
+    return "\n".join(lines)
+
+
+def cancel_ingestion(session_id: str) -> str:
+    """Cancel the ingestion jobs of a session still running or queued.
+    Args:
+        session_id (str): Unique identifier for the current session.
+    Returns:
+        str: Message indicating how many jobs were cancelled.
+    """
+    cancelled = get_job_queue().cancel(session_id)
+    if not cancelled:
+        return "⚠️ No ingestion in progress."
+    return f"🚫 Cancelling {cancelled} ingestion jobs..."
+
+
 def download_files(compilation_status, folder_path, session_id) -> list[str]:
     """Prepare downloadable zip archive from the specified folder path.
 
@@ -4,9 +4,11 @@ import threading
 import time
 import uuid
 from functools import wraps
+from pathlib import Path
 from typing import Any, Callable
 
-from ..database import clean_db
+from ..database import cancel_figures, clean_db, get_job_queue
+from ..processing import evict_asset_store, get_document_pool
 from ..telemetry.logging_utils import Logger
 from .manage_files import delete_files
 
@@ -62,9 +64,14 @@ def watch_session(session_id, timeout=600) -> None:
         if time.time() - session["last_active"] > timeout:
             LOGGER.info("🕒 Session expired, ID: %s", session_id)
             del session_data[session_id]
+            get_job_queue().cancel(session_id)
+            cancel_figures(session_id)
             time.sleep(10)
+            evict_asset_store(session_id)
+            get_document_pool().release(Path.cwd() / "tmp" / session_id)
             delete_files(session_id)
             clean_db(session_id)
+            get_job_queue().forget(session_id)
             LOGGER.info("🧹 Deleted session with ID: %s", session_id)
             break
 
@@ -0,0 +1,92 @@
+"""Module keeping the content hash and original name of the files uploaded in a session."""
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+
+class UploadManifest:
+    """Per-session record of the uploaded files, keyed by their saved name.
+
+    For every file saved in the upload directory, the manifest keeps the
+    SHA-256 hash of its content and the name it was uploaded under. Uploads
+    with known content are rejected before being parsed, and different files
+    whose names sanitise to the same one are both kept under distinct names.
+
+    Attributes:
+        upload_dir (Path): Directory of the uploaded files.
+        path (Path): JSON file holding the manifest.
+        files (dict): Hash and original name of every file, keyed by file name.
+    """
+
+    def __init__(self, upload_dir) -> None:
+        """Load the manifest of an upload directory, creating it if needed.
+
+        Args:
+            upload_dir (str or Path): Directory of the uploaded files.
+        """
+        self.upload_dir = Path(upload_dir)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.upload_dir / "uploads.json"
+        try:
+            self.files = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.files = {}
+
+    def find(self, content_hash: str) -> Optional[str]:
+        """Find a saved file with the given content.
+
+        Args:
+            content_hash (str): SHA-256 hash of the content.
+
+        Returns:
+            str: Name of the file, or None if no saved file has this content.
+        """
+        for file_name, entry in self.files.items():
+            if (
+                entry["sha256"] == content_hash
+                and (self.upload_dir / file_name).exists()
+            ):
+                return file_name
+        return None
+
+    def place(self, original: str, file_name: str) -> str:
+        """Choose the name under which an upload is saved.
+
+        A file uploaded again under its original name replaces the former
+        version. Another file whose name sanitises to the same one is saved
+        with a numbered suffix instead.
+
+        Args:
+            original (str): Name the file was uploaded under.
+            file_name (str): Its sanitised name.
+
+        Returns:
+            str: The name of the file in the upload directory.
+        """
+        stem, suffix = os.path.splitext(file_name)
+        candidate = file_name
+        num = 1
+        while (self.upload_dir / candidate).exists():
+            entry = self.files.get(candidate)
+            # Files saved before the manifest existed are replaced as before
+            if entry is None or entry["original"] == original:
+                return candidate
+            num += 1
+            candidate = f"{stem}_{num}{suffix}"
+        return candidate
+
+    def record(self, file_name: str, content_hash: str, original: str) -> None:
+        """Record a saved file and write the manifest.
+
+        Args:
+            file_name (str): Name of the file in the upload directory.
+            content_hash (str): SHA-256 hash of its content.
+            original (str): Name it was uploaded under.
+        """
+        self.files[file_name] = {"sha256": content_hash, "original": original}
+        tmp_path = self.upload_dir / f".{self.path.name}.{uuid.uuid4().hex}"
+        tmp_path.write_text(json.dumps(self.files), encoding="utf-8")
+        os.replace(tmp_path, self.path)
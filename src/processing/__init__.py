@@ -1,14 +1,47 @@
 """This module initializes the document processing package."""
 
-from .document_processing import delete_uploaded_files, process_documents
+from .asset_normalisation import normalise_assets, rename_assets
+from .asset_store import (
+    AssetStore,
+    evict_asset_store,
+    get_asset_store,
+    session_assets_dir,
+)
+from .chunking import chunk_document, estimate_tokens, with_images
+from .document_pool import DocumentPool, get_document_pool
+from .document_processing import (
+    delete_uploaded_files,
+    iter_documents,
+    process_documents,
+)
+from .extraction_config import ExtractionConfig
+from .graphics_dedupe import dedupe_graphics, strip_phash
 from .images_processing import find_used_gfx, save_pdf_figures, save_pdf_images
 from .output_folder import create_output_folder
+from .page_manifest import PageManifest, session_manifest_dir
 
 __all__ = [
     "process_documents",
+    "iter_documents",
+    "chunk_document",
+    "estimate_tokens",
+    "with_images",
+    "ExtractionConfig",
+    "dedupe_graphics",
+    "strip_phash",
     "delete_uploaded_files",
     "save_pdf_images",
     "save_pdf_figures",
     "find_used_gfx",
+    "normalise_assets",
+    "rename_assets",
     "create_output_folder",
+    "AssetStore",
+    "get_asset_store",
+    "evict_asset_store",
+    "session_assets_dir",
+    "DocumentPool",
+    "get_document_pool",
+    "PageManifest",
+    "session_manifest_dir",
 ]
@@ -0,0 +1,250 @@
+"""Module fitting the graphics of a presentation to the slides showing them."""
+
+import json
+import os
+import uuid
+from typing import Optional
+
+import fitz
+from langfuse.decorators import langfuse_context, observe
+
+from ..telemetry import Logger
+from .extraction_config import env_int
+
+LOGGER = Logger.get_logger()
+
+# Downscale and re-encode the graphics of a presentation before compiling it
+NORMALISE_ASSETS = os.getenv("ASSET_NORMALISATION", "true").lower() == "true"
+
+# Height of a slide in pixels, its width follows from the aspect ratio
+SLIDE_HEIGHT = env_int("ASSET_SLIDE_HEIGHT", 1080)
+
+# Box of the `\includegraphics` of each layout, as a fraction of the slide width
+# and height (see `json_to_tex`)
+LAYOUT_BOXES = {"two_column": (0.44, 0.80), "single_image": (0.70, 0.40)}
+
+# Rescaling by a factor above this is not worth a new encoding
+MIN_SCALE_GAIN = 0.9
+JPEG_QUALITY = 85
+# Losslessly stored images over this size are tried as JPEG, kept if twice smaller
+PHOTO_PNG_BYTES = 256 * 1024
+
+EXTENSIONS = {"png": ".png", "jpeg": ".jpg"}
+
+
+def slide_pixels(aspect_ratio: str) -> tuple[int, int]:
+    """Size of a slide in pixels.
+
+    Args:
+        aspect_ratio (str): Aspect ratio of the presentation, e.g., "16:9".
+
+    Returns:
+        tuple: The width and height of a slide.
+    """
+    try:
+        width, height = (float(side) for side in aspect_ratio.split(":"))
+    except ValueError:
+        width, height = 16.0, 9.0
+    return round(SLIDE_HEIGHT * width / height), SLIDE_HEIGHT
+
+
+def layout_budgets(presentation_json: str, aspect_ratio: str) -> dict:
+    """Find the largest box each graphics file is shown in.
+
+    Args:
+        presentation_json (str): JSON LLM output of the presentation.
+        aspect_ratio (str): Aspect ratio of the presentation, e.g., "16:9".
+
+    Returns:
+        dict: Width and height in pixels, keyed by graphics file name.
+    """
+    try:
+        slides = json.loads(presentation_json).get("slides", [])
+    except (ValueError, AttributeError):
+        return {}
+
+    slide_width, slide_height = slide_pixels(aspect_ratio)
+    budgets: dict[str, tuple[int, int]] = {}
+    for slide in slides:
+        image = slide.get("image") or {}
+        box = LAYOUT_BOXES.get(slide.get("layout"))
+        if box is None or not image.get("path"):
+            continue
+        name = os.path.basename(image["path"])
+        width, height = round(slide_width * box[0]), round(slide_height * box[1])
+        old_width, old_height = budgets.get(name, (0, 0))
+        budgets[name] = (max(width, old_width), max(height, old_height))
+    return budgets
+
+
+def sniff_format(data: bytes) -> str:
+    """Detect the format of a graphics file from its first bytes.
+
+    Args:
+        data (bytes): Content of the file.
+
+    Returns:
+        str: "png", "jpeg", "pdf", or "other".
+    """
+    if data.startswith(b"\x89PNG"):
+        return "png"
+    if data.startswith(b"\xff\xd8"):
+        return "jpeg"
+    if data.startswith(b"%PDF"):
+        return "pdf"
+    return "other"
+
+
+def encode_asset(
+    data: bytes, box: Optional[tuple[int, int]]
+) -> tuple[bytes, str, bool]:
+    """Downscale a raster graphics to its box and pick an efficient format.
+
+    JPEG files stay JPEG, PNG files stay PNG unless they hold a large opaque
+    photograph, and other formats (e.g. JPEG 2000, not read by pdflatex) are
+    converted to PNG or JPEG. Files small enough for their box and already in
+    a suitable format are returned as they are.
+
+    Args:
+        data (bytes): Content of the graphics file.
+        box (tuple, optional): Width and height of its box in pixels, if shown.
+
+    Returns:
+        tuple: A 3-element tuple:
+            - bytes: The content of the normalised file.
+            - str: Its format, "png", "jpeg", or "pdf".
+            - bool: Whether it was downscaled.
+    """
+    fmt = sniff_format(data)
+    if fmt == "pdf":
+        # Vector figures have no pixels to save
+        return data, fmt, False
+
+    pix = fitz.Pixmap(data)
+    scale = 1.0
+    if box is not None:
+        scale = min(1.0, box[0] / pix.width, box[1] / pix.height)
+    resized = scale < MIN_SCALE_GAIN
+    photo = fmt == "png" and not pix.alpha and len(data) > PHOTO_PNG_BYTES
+    if not resized and not photo and fmt in EXTENSIONS:
+        return data, fmt, False
+
+    if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    if resized:
+        width = max(1, round(pix.width * scale))
+        height = max(1, round(pix.height * scale))
+        pix = fitz.Pixmap(pix, width, height, None)
+
+    if fmt == "jpeg":
+        return pix.tobytes("jpeg", jpg_quality=JPEG_QUALITY), fmt, resized
+    png_bytes = pix.tobytes("png")
+    if not pix.alpha:
+        jpeg_bytes = pix.tobytes("jpeg", jpg_quality=JPEG_QUALITY)
+        if 2 * len(jpeg_bytes) < len(png_bytes):
+            return jpeg_bytes, "jpeg", resized
+    if fmt == "png" and not resized and len(png_bytes) >= len(data):
+        return data, fmt, False
+    return png_bytes, "png", resized
+
+
+@observe(name="🗜️ normalise_assets")
+def normalise_assets(
+    presentation_json: str, work_dir: str, aspect_ratio: str
+) -> dict[str, str]:
+    """Fit the graphics of a presentation to the layouts they are shown in.
+
+    Every raster graphics of the gfx directory is downscaled to the pixel budget
+    of its largest layout at the aspect ratio of the presentation, and stored in
+    an efficient format with the matching extension. Files linked from the asset
+    store are replaced, never modified in place.
+
+    Args:
+        presentation_json (str): JSON LLM output of the presentation.
+        work_dir (str): The working directory where the presentation will be compiled.
+        aspect_ratio (str): Aspect ratio of the presentation, e.g., "16:9".
+
+    Returns:
+        dict[str, str]: New file names of the renamed graphics, keyed by old name.
+    """
+    graphics_dir = os.path.join(work_dir, "gfx")
+    if not NORMALISE_ASSETS or not os.path.isdir(graphics_dir):
+        return {}
+
+    budgets = layout_budgets(presentation_json, aspect_ratio)
+    renames: dict[str, str] = {}
+    stats = {"files": 0, "resized": 0, "converted": 0, "bytes_before": 0}
+    bytes_after = 0
+    for name in sorted(os.listdir(graphics_dir)):
+        path = os.path.join(graphics_dir, name)
+        if name.startswith(".") or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        stats["files"] += 1
+        stats["bytes_before"] += len(data)
+
+        try:
+            new_data, fmt, resized = encode_asset(data, budgets.get(name))
+        except Exception as e:
+            LOGGER.warning("⚠️ Could not normalise %s: %s", name, e)
+            bytes_after += len(data)
+            continue
+        bytes_after += len(new_data)
+
+        stem, ext = os.path.splitext(name)
+        new_name = stem + EXTENSIONS.get(fmt, ext)
+        _replace_asset(
+            graphics_dir, name, new_name, new_data if new_data is not data else None
+        )
+
+        stats["resized"] += resized
+        if new_name != name:
+            stats["converted"] += fmt != sniff_format(data)
+            renames[name] = new_name
+
+    stats["bytes_after"] = bytes_after
+    stats["bytes_saved"] = stats["bytes_before"] - bytes_after
+    LOGGER.info(
+        "🗜️ Normalised %d graphics: %d resized, %d renamed, %d bytes saved",
+        stats["files"],
+        stats["resized"],
+        len(renames),
+        stats["bytes_saved"],
+    )
+    langfuse_context.update_current_observation(
+        output={"output.assets": stats, "output.renamed": renames}
+    )
+    return renames
+
+
+def _replace_asset(
+    graphics_dir: str, name: str, new_name: str, data: Optional[bytes]
+) -> None:
+    """Write or rename a graphics file, without modifying the file it links to."""
+    path = os.path.join(graphics_dir, name)
+    new_path = os.path.join(graphics_dir, new_name)
+    if data is not None:
+        tmp_path = os.path.join(graphics_dir, f".{new_name}.{uuid.uuid4().hex}")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, new_path)
+        if new_name != name:
+            os.remove(path)
+    elif new_name != name:
+        os.replace(path, new_path)
+
+
+def rename_assets(presentation_json: str, renames: dict[str, str]) -> str:
+    """Point the presentation to the renamed graphics files.
+
+    Args:
+        presentation_json (str): JSON LLM output of the presentation.
+        renames (dict[str, str]): New file names, keyed by old name.
+
+    Returns:
+        str: The presentation with the new file names.
+    """
+    for old_name, new_name in renames.items():
+        presentation_json = presentation_json.replace(old_name, new_name)
+    return presentation_json
@@ -0,0 +1,324 @@
+"""Module implementing the per-session store of extracted images and figures."""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from ..telemetry import Logger
+
+LOGGER = Logger.get_logger()
+
+
+class AssetStore:
+    """Content-addressed store of the graphics extracted from a session's PDFs.
+
+    Every blob is written once under `objects/<hash>`, no matter how many
+    documents or pages it appears on. The file names used in the LLM prompt
+    (`doc{pdf}_page{n}_...`) are hard links under `names/` pointing to the
+    blobs, so that selected graphics can be copied to the presentation
+    without parsing the PDFs again.
+
+    Figures extracted lazily only get a rendering recipe under `recipes/`, they
+    are rendered and stored once they are actually used.
+
+    The store lives on disk, so extraction workers running in other processes
+    can fill it through their own instance pointing to the same root.
+
+    Attributes:
+        root (Path): Root directory of the store.
+    """
+
+    def __init__(self, root) -> None:
+        """Initialise the store, creating its directories if needed.
+
+        Args:
+            root (str or Path): Root directory of the store.
+        """
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.names_dir = self.root / "names"
+        self.recipes_dir = self.root / "recipes"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.names_dir.mkdir(parents=True, exist_ok=True)
+        self.recipes_dir.mkdir(parents=True, exist_ok=True)
+
+    def has_object(self, content_hash: str) -> bool:
+        """Check if a blob is already stored.
+
+        Args:
+            content_hash (str): Hash of the blob content.
+
+        Returns:
+            bool: True if the blob is present.
+        """
+        return (self.objects_dir / content_hash).exists()
+
+    def has_name(self, name: str) -> bool:
+        """Check if a graphics file name is registered in the store.
+
+        Args:
+            name (str): File name of the graphics, as used in the prompt.
+
+        Returns:
+            bool: True if the name points to a stored blob.
+        """
+        return (self.names_dir / name).exists()
+
+    def add(self, content_hash: str, data: bytes) -> None:
+        """Store a blob, unless already present.
+
+        Args:
+            content_hash (str): Hash of the blob content.
+            data (bytes): Content of the blob.
+        """
+        object_path = self.objects_dir / content_hash
+        if object_path.exists():
+            return
+        # Write to a private file first, concurrent writers race harmlessly
+        tmp_path = self.objects_dir / f".{content_hash}.{uuid.uuid4().hex}"
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, object_path)
+
+    def put(self, name: str, content_hash: str, data: bytes) -> None:
+        """Store a blob, unless already present, and register a name for it.
+
+        Args:
+            name (str): File name of the graphics, as used in the prompt.
+            content_hash (str): Hash of the blob content.
+            data (bytes): Content of the blob.
+        """
+        self.add(content_hash, data)
+        self.link(name, content_hash)
+
+    def link(self, name: str, content_hash: str) -> bool:
+        """Register a name for an already stored blob.
+
+        Args:
+            name (str): File name of the graphics, as used in the prompt.
+            content_hash (str): Hash of the blob content.
+
+        Returns:
+            bool: True if the blob exists and the name points to it.
+        """
+        object_path = self.objects_dir / content_hash
+        if not object_path.exists():
+            return False
+        _link_or_copy(object_path, self.names_dir / name)
+        return True
+
+    def put_recipe(self, name: str, recipe: dict) -> None:
+        """Register how to render a graphics file which is not stored yet.
+
+        Args:
+            name (str): File name of the graphics, as used in the prompt.
+            recipe (dict): JSON-serialisable rendering parameters.
+        """
+        recipe_path = self.recipes_dir / f"{name}.json"
+        tmp_path = self.recipes_dir / f".{name}.{uuid.uuid4().hex}"
+        tmp_path.write_text(json.dumps(recipe), encoding="utf-8")
+        os.replace(tmp_path, recipe_path)
+
+    def recipe(self, name: str) -> Optional[dict]:
+        """Get the rendering parameters of a graphics file.
+
+        Args:
+            name (str): File name of the graphics, as used in the prompt.
+
+        Returns:
+            dict: The recipe, or None if the name has no recipe.
+        """
+        recipe_path = self.recipes_dir / f"{name}.json"
+        if not recipe_path.exists():
+            return None
+        return json.loads(recipe_path.read_text(encoding="utf-8"))
+
+    def export(self, name: str, target_dir: str) -> bool:
+        """Hard link (or copy) a stored graphics file into a directory.
+
+        Args:
+            name (str): File name of the graphics, as used in the prompt.
+            target_dir (str): Directory where the file is placed.
+
+        Returns:
+            bool: True if the file was found in the store and exported.
+        """
+        name_path = self.names_dir / name
+        if not name_path.exists():
+            return False
+        _link_or_copy(name_path, Path(target_dir) / name)
+        return True
+
+    def rename(self, renames: dict[str, tuple[str, int]]) -> None:
+        """Give graphics new names, e.g. after their page moved in a revised PDF.
+
+        All sources are read before any name is written, so renames may swap
+        names or form chains. The recipes of lazy figures follow their page.
+
+        Args:
+            renames (dict): New name and page number, keyed by current name.
+        """
+        staged = []
+        for name, (new_name, page) in renames.items():
+            tmp_path = None
+            if self.has_name(name):
+                tmp_path = self.names_dir / f".{new_name}.{uuid.uuid4().hex}"
+                _link_or_copy(self.names_dir / name, tmp_path)
+            recipe = self.recipe(name)
+            if recipe is not None:
+                recipe = {**recipe, "page": page}
+            staged.append((new_name, tmp_path, recipe))
+
+        for new_name, tmp_path, recipe in staged:
+            if tmp_path is not None:
+                os.replace(tmp_path, self.names_dir / new_name)
+            else:
+                # A rendering of the page formerly at this number is stale
+                (self.names_dir / new_name).unlink(missing_ok=True)
+            if recipe is not None:
+                self.put_recipe(new_name, recipe)
+            else:
+                (self.recipes_dir / f"{new_name}.json").unlink(missing_ok=True)
+
+    def remove(self, names) -> None:
+        """Unregister graphics names and their recipes, keeping the blobs.
+
+        Args:
+            names (Iterable[str]): File names of the graphics.
+        """
+        for name in names:
+            (self.names_dir / name).unlink(missing_ok=True)
+            (self.recipes_dir / f"{name}.json").unlink(missing_ok=True)
+
+    def import_graphics(
+        self,
+        source: "AssetStore",
+        renames: dict[str, str],
+        pdf_path: Optional[str] = None,
+    ) -> None:
+        """Register the graphics files of another store under new names.
+
+        Blobs are hard linked (or copied across file systems) under the MD5 hash
+        of their content, as when they are extracted, so they are stored once
+        whichever store they come from. Recipes are copied along.
+
+        Args:
+            source (AssetStore): Store holding the graphics.
+            renames (dict[str, str]): New name, keyed by name in the source store.
+            pdf_path (str, optional): Path of the PDF file the copied recipes
+                render the figures from, unchanged if not given.
+        """
+        for name, new_name in renames.items():
+            name_path = source.names_dir / name
+            try:
+                data = name_path.read_bytes()
+            except FileNotFoundError:
+                data = None
+            if data is not None:
+                content_hash = hashlib.md5(data, usedforsecurity=False).hexdigest()
+                _link_or_copy(name_path, self.objects_dir / content_hash)
+                self.link(new_name, content_hash)
+            recipe = source.recipe(name)
+            if recipe is not None:
+                if pdf_path is not None:
+                    recipe = {**recipe, "pdf_path": pdf_path}
+                self.put_recipe(new_name, recipe)
+
+    def prune(self) -> int:
+        """Remove the blobs no name points to anymore.
+
+        A blob is shared with its names through hard links, so it is unused once
+        its link count is back to one.
+
+        Returns:
+            int: Number of bytes freed.
+        """
+        freed = 0
+        for entry in os.scandir(self.objects_dir):
+            if entry.name.startswith("."):
+                continue
+            stat = entry.stat()
+            if stat.st_nlink <= 1:
+                Path(entry.path).unlink(missing_ok=True)
+                freed += stat.st_size
+        return freed
+
+    def stats(self) -> dict:
+        """Size accounting of the store.
+
+        Returns:
+            dict: Number of stored blobs, registered names and bytes on disk.
+        """
+        num_objects = 0
+        num_bytes = 0
+        if self.objects_dir.exists():
+            for entry in os.scandir(self.objects_dir):
+                if entry.is_file() and not entry.name.startswith("."):
+                    num_objects += 1
+                    num_bytes += entry.stat().st_size
+        num_names = (
+            sum(1 for _ in os.scandir(self.names_dir)) if self.names_dir.exists() else 0
+        )
+        return {"objects": num_objects, "names": num_names, "bytes": num_bytes}
+
+    def clear(self) -> int:
+        """Evict everything from the store.
+
+        Returns:
+            int: Number of bytes freed.
+        """
+        freed = self.stats()["bytes"]
+        shutil.rmtree(self.root, ignore_errors=True)
+        return freed
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    """Hard link a file, falling back to a copy across file systems."""
+    if target.exists():
+        return
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def session_assets_dir(session_id: str) -> Path:
+    """Directory of the asset store of a session.
+
+    Args:
+        session_id (str): Unique identifier for the current session.
+
+    Returns:
+        Path: Path to the asset store root.
+    """
+    return Path.cwd() / "tmp" / session_id / "assets"
+
+
+def get_asset_store(session_id: str) -> AssetStore:
+    """Get the asset store of a session, creating it if needed.
+
+    Args:
+        session_id (str): Unique identifier for the current session.
+
+    Returns:
+        AssetStore: The session's asset store.
+    """
+    return AssetStore(session_assets_dir(session_id))
+
+
+def evict_asset_store(session_id: str) -> None:
+    """Remove the asset store of a session and report the freed space.
+
+    Args:
+        session_id (str): Unique identifier for the current session.
+    """
+    root = session_assets_dir(session_id)
+    if not root.exists():
+        return
+    freed = AssetStore(root).clear()
+    LOGGER.info("🧹 Evicted %d bytes of assets for session ID: %s", freed, session_id)
@@ -0,0 +1,253 @@
+"""Module splitting extracted PDF text into token-budgeted chunks for retrieval."""
+
+import re
+from typing import NamedTuple
+
+from .extraction_config import env_int
+
+# Token budget of a chunk (0 keeps whole documents) and overlap between chunks
+CHUNK_TOKENS = env_int("CHUNK_TOKENS", 512)
+CHUNK_OVERLAP = env_int("CHUNK_OVERLAP", 64)
+
+# A page or section start closes the current chunk once it is filled this much
+MIN_FILL = 0.5
+
+# Numbered headings ("2.1 Method", "IV. RESULTS") and the usual unnumbered ones
+HEADING = re.compile(
+    r"^\s*(?:(?:\d{1,2}(?:\.\d{1,2})*|[IVX]{1,5})\.?\s+[A-Z][^\n]{0,78}"
+    r"|(?i:abstract|introduction|background|related work|methods?|methodology"
+    r"|experiments?|results|discussion|conclusions?|acknowledge?ments?|references"
+    r"|bibliography|appendix)\b[^\n]{0,40})\s*$"
+)
+
+# Page of a graphics in the images passage, e.g. "gfx/docpaper_page3_img0_hash..."
+GRAPHICS_PAGE = re.compile(r"_page(\d+)_(?:img|fig)\d+_hash[a-fA-F0-9]{8}\.")
+
+
+class _Unit(NamedTuple):
+    """A line of text, the smallest piece a chunk is made of."""
+
+    page: int
+    text: str
+    tokens: int
+    heading: bool
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text without a tokenizer.
+
+    ASCII text counts about four characters per token, other characters (e.g.
+    CJK scripts) one token each.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (ascii_chars + 3) // 4 + len(text) - ascii_chars
+
+
+def split_pages(text: str, page_starts: list[int]) -> list[str]:
+    """Split the text of a document into the text of its pages.
+
+    Args:
+        text (str): Extracted text of the document.
+        page_starts (list[int]): Offset of every page in the text.
+
+    Returns:
+        list[str]: The text of every page.
+    """
+    ends = page_starts[1:] + [len(text)]
+    return [text[start:end] for start, end in zip(page_starts, ends)]
+
+
+def _page_units(page: int, page_text: str, max_tokens: int) -> list[_Unit]:
+    """Split the text of a page into lines, themselves cut to fit the budget."""
+    units = []
+    for line in page_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        heading = bool(HEADING.match(line))
+        if estimate_tokens(line) <= max_tokens:
+            units.append(_Unit(page, line, estimate_tokens(line), heading))
+            continue
+        # Cut overlong lines on word boundaries
+        words: list[str] = []
+        for word in line.split():
+            if words and estimate_tokens(" ".join(words + [word])) > max_tokens:
+                piece = " ".join(words)
+                units.append(_Unit(page, piece, estimate_tokens(piece), heading))
+                words, heading = [], False
+            words.append(word)
+        if words:
+            piece = " ".join(words)
+            units.append(_Unit(page, piece, estimate_tokens(piece), heading))
+    return units
+
+
+def _overlap_tail(units: list[_Unit], budget: int) -> list[_Unit]:
+    """Last lines of a chunk, repeated at the start of the next one."""
+    tail: list[_Unit] = []
+    tokens = 0
+    for unit in reversed(units):
+        if tokens + unit.tokens > budget:
+            break
+        tail.insert(0, unit)
+        tokens += unit.tokens
+    return tail
+
+
+def pack_units(
+    units: list[_Unit], max_tokens: int, overlap: int
+) -> list[tuple[list[_Unit], int]]:
+    """Pack lines into chunks under the token budget.
+
+    A chunk is closed when the next line would exceed the budget, or when the
+    next line starts a page or a section and the chunk is already half full.
+    Chunks start with the last lines of the previous one, up to `overlap` tokens,
+    unless they start a new section.
+
+    Args:
+        units (list): Lines of the document, in reading order.
+        max_tokens (int): Token budget of a chunk.
+        overlap (int): Token budget of the overlap between consecutive chunks.
+
+    Returns:
+        list: For every chunk, its lines and the number of leading lines repeated
+            from the previous chunk.
+    """
+    chunks: list[tuple[list[_Unit], int]] = []
+    current: list[_Unit] = []
+    repeated = 0
+    tokens = 0
+    for unit in units:
+        full = tokens + unit.tokens > max_tokens
+        boundary = unit.heading or (current and unit.page != current[-1].page)
+        if (
+            current
+            and len(current) > repeated
+            and (full or (boundary and tokens >= MIN_FILL * max_tokens))
+        ):
+            chunks.append((current, repeated))
+            previous, current = current, []
+            if not unit.heading:
+                current = _overlap_tail(
+                    previous, min(overlap, max_tokens - unit.tokens)
+                )
+                # Never repeat a whole chunk
+                if len(current) == len(previous):
+                    current = []
+            repeated = len(current)
+            tokens = sum(u.tokens for u in current)
+        current.append(unit)
+        tokens += unit.tokens
+    if len(current) > repeated:
+        chunks.append((current, repeated))
+    return chunks
+
+
+def filter_images_passage(images_passage: str, page_start: int, page_end: int) -> str:
+    """Keep the lines of an images passage whose graphics lie in a page range.
+
+    Args:
+        images_passage (str): One JSON-like line per graphics of the document.
+        page_start (int): First page of the range.
+        page_end (int): Last page of the range, included.
+
+    Returns:
+        str: The lines of the graphics shown on these pages.
+    """
+    lines = []
+    for line in images_passage.splitlines():
+        match = GRAPHICS_PAGE.search(line)
+        if match and page_start <= int(match.group(1)) <= page_end:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def with_images(metadata: dict, images_passage: str) -> dict:
+    """Give a chunk the graphics of its pages, out of the whole document's.
+
+    Args:
+        metadata (dict): Metadata of the chunk, with its page range.
+        images_passage (str): Images passage of the whole document.
+
+    Returns:
+        dict: A copy of the metadata with the images passage of the chunk.
+    """
+    passage = filter_images_passage(
+        images_passage, metadata["page_start"], metadata["page_end"]
+    )
+    return {
+        **metadata,
+        "images_passage": passage,
+        "num_images": len(passage.splitlines()),
+    }
+
+
+def chunk_document(
+    text: str,
+    metadata: dict,
+    max_tokens: int = CHUNK_TOKENS,
+    overlap: int = CHUNK_OVERLAP,
+) -> list[tuple[str, dict]]:
+    """Split an extracted document into overlapping chunks under a token budget.
+
+    Chunks are cut on line boundaries, preferably at page and section starts,
+    so that each one fits the embedding model and retrieval picks the relevant
+    parts of a paper instead of whole papers. Every chunk keeps the PDF path
+    of the document, its page range (0-based, as in the graphics names) and
+    the graphics of these pages.
+
+    Args:
+        text (str): Extracted text of the document.
+        metadata (dict): Metadata of the document, as yielded by `iter_documents`.
+        max_tokens (int): Token budget of a chunk, 0 keeps the document whole.
+        overlap (int): Tokens repeated from the end of the previous chunk.
+
+    Returns:
+        list: The text and metadata of every chunk, in reading order.
+    """
+    metadata = dict(metadata)
+    page_starts = metadata.pop("page_starts", None) or [0]
+    metadata.pop("page_hashes", None)
+    pages = split_pages(text, page_starts)
+    images_passage = metadata.get("images_passage") or ""
+
+    units = []
+    if max_tokens > 0:
+        for page, page_text in enumerate(pages):
+            units += _page_units(page, page_text, max_tokens)
+    if not units:
+        whole = {
+            **metadata,
+            "chunk": 0,
+            "num_chunks": 1,
+            "page_start": 0,
+            "page_end": len(pages) - 1,
+            "overlap_chars": 0,
+        }
+        return [(text, with_images(whole, images_passage))]
+
+    packed = pack_units(units, max_tokens, overlap)
+    chunks = []
+    for index, (chunk_units, repeated) in enumerate(packed):
+        chunk_text = "\n".join(unit.text for unit in chunk_units)
+        overlap_chars = (
+            len("\n".join(unit.text for unit in chunk_units[:repeated])) + 1
+            if repeated
+            else 0
+        )
+        chunk_metadata = {
+            **metadata,
+            "chunk": index,
+            "num_chunks": len(packed),
+            "page_start": chunk_units[0].page,
+            "page_end": chunk_units[-1].page,
+            "overlap_chars": overlap_chars,
+        }
+        chunks.append((chunk_text, with_images(chunk_metadata, images_passage)))
+    return chunks
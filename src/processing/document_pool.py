@@ -0,0 +1,232 @@
+"""Module managing the open PDF documents shared by the extraction and generation."""
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import fitz
+
+from .extraction_config import env_int
+
+
+class _Handle:
+    """An open PDF document together with the memory map backing it."""
+
+    def __init__(self, pdf_path: str, key: tuple) -> None:
+        self.key = key
+        self.borrowed = False
+        self.size = 0
+        with open(pdf_path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            if self.size == 0:
+                raise fitz.EmptyFileError(f"Cannot open empty file: {pdf_path}")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        try:
+            self.doc = fitz.open(stream=self.view, filetype="pdf")
+        except Exception:
+            self.view.release()
+            self.map.close()
+            raise
+
+    def close(self) -> None:
+        """Close the document, then the memory map it reads from."""
+        self.doc.close()
+        self.view.release()
+        self.map.close()
+
+
+class DocumentPool:
+    """Pool of open PDF documents, read from memory-mapped files.
+
+    The pages of a PDF are read straight from the page cache instead of a private
+    copy, and the handle is kept open in a small LRU, so that the extraction
+    workers processing several page ranges of a document and the generation
+    saving its graphics do not parse it again. Handles are closed when evicted
+    from the LRU or when their files are released, never left to the garbage
+    collector.
+
+    A handle is lent to one user at a time. A document already borrowed, e.g. by
+    another thread, is opened once more for the second user and closed after use.
+
+    Attributes:
+        capacity (int): Maximal number of documents kept open while unused.
+        hits (int): Number of borrows served by an already open document.
+        misses (int): Number of borrows which opened the document.
+    """
+
+    def __init__(self, capacity: int = 8) -> None:
+        """Initialise an empty pool.
+
+        Args:
+            capacity (int): Maximal number of documents kept open while unused.
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._handles: OrderedDict[str, _Handle] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def open(self, pdf_path: str) -> Iterator[fitz.Document]:
+        """Borrow an open document for the duration of a `with` block.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+
+        Yields:
+            fitz.Document: The open document, not to be closed by the caller.
+        """
+        path = os.path.abspath(pdf_path)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        handle = self._borrow(path, key)
+        pooled = handle is not None
+        if handle is None:
+            handle = _Handle(path, key)
+        try:
+            yield handle.doc
+        finally:
+            if pooled:
+                self._give_back(path, handle)
+            else:
+                self._keep(path, handle)
+
+    def _borrow(self, path: str, key: tuple) -> Optional[_Handle]:
+        """Take the pooled handle of a file, if it is open, current and free."""
+        stale = None
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is not None and handle.key != key and not handle.borrowed:
+                # The file changed on disk since it was opened
+                stale = self._handles.pop(path)
+                handle = None
+            if handle is not None and not handle.borrowed:
+                handle.borrowed = True
+                self._handles.move_to_end(path)
+                self.hits += 1
+            else:
+                handle = None
+                self.misses += 1
+        if stale is not None:
+            stale.close()
+        return handle
+
+    def _give_back(self, path: str, handle: _Handle) -> None:
+        """Return a borrowed handle to the pool."""
+        with self._lock:
+            handle.borrowed = False
+            pooled = self._handles.get(path) is handle
+        if not pooled:
+            handle.close()
+            return
+        self._trim()
+
+    def _keep(self, path: str, handle: _Handle) -> None:
+        """Add a freshly opened handle to the pool, unless the file is already pooled."""
+        with self._lock:
+            if path in self._handles:
+                keep = False
+            else:
+                self._handles[path] = handle
+                keep = True
+        if not keep:
+            handle.close()
+            return
+        self._trim()
+
+    def _trim(self) -> None:
+        """Close the least recently used free handles beyond the capacity."""
+        evicted: list[_Handle] = []
+        with self._lock:
+            for path in list(self._handles):
+                if len(self._handles) - len(evicted) <= self.capacity:
+                    break
+                if not self._handles[path].borrowed:
+                    evicted.append(self._handles.pop(path))
+        for handle in evicted:
+            handle.close()
+
+    def release(self, root) -> int:
+        """Close the free handles of the files under a directory, or of one file.
+
+        Args:
+            root (str or Path): Directory or file path.
+
+        Returns:
+            int: Number of documents closed.
+        """
+        root_path = Path(os.path.abspath(root))
+        released = []
+        with self._lock:
+            for path in list(self._handles):
+                handle = self._handles[path]
+                inside = Path(path) == root_path or root_path in Path(path).parents
+                if inside and not handle.borrowed:
+                    released.append(self._handles.pop(path))
+        for handle in released:
+            handle.close()
+        return len(released)
+
+    def close_all(self) -> None:
+        """Close every free handle of the pool."""
+        with self._lock:
+            released = [h for h in self._handles.values() if not h.borrowed]
+            self._handles = OrderedDict(
+                (path, h) for path, h in self._handles.items() if h.borrowed
+            )
+        for handle in released:
+            handle.close()
+
+    def stats(self) -> dict:
+        """Counters of the pool and of MuPDF's native memory.
+
+        Returns:
+            dict: Number of open and borrowed documents, bytes mapped, pool hits and
+                misses, and size of MuPDF's object store.
+        """
+        with self._lock:
+            handles = list(self._handles.values())
+        store_size = fitz.TOOLS.store_size
+        return {
+            "open_documents": len(handles),
+            "borrowed_documents": sum(1 for h in handles if h.borrowed),
+            "mapped_bytes": sum(h.size for h in handles),
+            "hits": self.hits,
+            "misses": self.misses,
+            "native_store_bytes": store_size() if callable(store_size) else store_size,
+        }
+
+
+_DOCUMENT_POOL: Optional[DocumentPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_document_pool() -> DocumentPool:
+    """Get the process-wide document pool, creating it on first use.
+
+    Its capacity is read from DOCUMENT_POOL_SIZE (default 8).
+
+    Returns:
+        DocumentPool: The shared document pool.
+    """
+    global _DOCUMENT_POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _DOCUMENT_POOL is None:
+            _DOCUMENT_POOL = DocumentPool(env_int("DOCUMENT_POOL_SIZE", 8))
+        return _DOCUMENT_POOL
+
+
+def _reset_after_fork() -> None:
+    """Start forked workers with an empty pool, the handles belong to the parent."""
+    global _DOCUMENT_POOL, _POOL_LOCK  # pylint: disable=global-statement
+    _DOCUMENT_POOL = None
+    _POOL_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
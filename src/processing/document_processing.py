@@ -1,123 +1,850 @@
 """Module handling PDF document processing and content extraction."""
 
+import itertools
 import os
 import re
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Generator, Iterator, Optional, Sequence, Union
 
 import fitz
 from langfuse.decorators import langfuse_context, observe
 
 from ..telemetry import Logger
-from .images_processing import extract_images, extract_vector
+from .asset_store import AssetStore
+from .document_pool import get_document_pool
+from .drawing_clustering import page_drawings
+from .extraction_config import ExtractionConfig
+from .hashing import page_sha256
+from .images_processing import (
+    ImageCache,
+    extract_images,
+    extract_vector,
+    resolve_shared_images,
+)
+from .isolated_workers import ExtractionLimitError, IsolatedExecutor
+from .page_classifier import classify_page
+from .page_layout import PageLayout
+from .page_manifest import plan_page_reuse
+from .records import GraphicRecord, PageRecord
 
 LOGGER = Logger.get_logger()
 
 
-@observe(name="⚙️ extract_pdf_content")
-def extract_pdf_content(pdf_path: str) -> tuple[str, list[dict], dict]:
-    """Extract text and images from a PDF file.
+def iter_page_records(
+    pdf_path: str,
+    start: int = 0,
+    stop: Optional[int] = None,
+    config: Optional[ExtractionConfig] = None,
+    cache: Optional[ImageCache] = None,
+) -> Iterator[PageRecord]:
+    """Extract text and graphics from a slice of pages of a PDF file, page by page.
+    Only the page being parsed is held in memory, so consumers which drop
+    each record once processed run in constant memory whatever the PDF size.
+    With `config.with_graphics` disabled, only the text is extracted.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        start (int): Index of the first page to process.
+        stop (int, optional): Index after the last page to process, defaults to
+            the end of the document.
+        config (ExtractionConfig, optional): Extraction settings.
+        cache (ImageCache, optional): Cache of the images already extracted from
+            the document, shared by the pages to extract every image once.
+    Yields:
+        PageRecord: Page record with the page number, its text, the records of
+            its images and figures and the decision of the page classifier.
+    """
+    if cache is None:
+        store = AssetStore(config.asset_dir) if config and config.asset_dir else None
+        cache = ImageCache(store=store)
+    lazy = config is not None and config.lazy_figures and config.with_graphics
+
+    with get_document_pool().open(pdf_path) as doc:
+        check_page_count(doc, config)
+        pdf = os.path.splitext(os.path.basename(pdf_path))[0]
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for page_num in range(start, stop):
+            page = doc[page_num]
+            if config and not config.with_graphics:
+                # Same text as the layout analysis, without parsing the blocks
+                text = page.get_text(flags=fitz.TEXTFLAGS_TEXT).strip()
+                yield PageRecord(page_num, text)
+                continue
+
+            layout = PageLayout(page)
+            contents = page.read_contents()
+            page_hash = page_sha256(page, contents)
+
+            # Extract images
+            figs: list[GraphicRecord] = []
+            figs += extract_images(
+                pdf,
+                doc,
+                page,
+                page_num,
+                layout=layout,
+                cache=cache,
+                max_pixels=config.max_image_pixels if config else 0,
+            )
+
+            # Extract vector graphics, unless the page cannot hold a figure
+            start_time = time.perf_counter()
+            if config is None or config.classify_pages:
+                decision, drawings = classify_page(page, layout, contents)
+            else:
+                decision, drawings = {"page": page_num, "vector": True}, None
+            if decision["vector"] and config and config.max_drawings > 0:
+                drawings = page_drawings(page) if drawings is None else drawings
+                if len(drawings) > config.max_drawings:
+                    decision["drawings"] = len(drawings)
+                    decision["vector"] = False
+                    decision["reason"] = "too-many-drawings"
+            decision["classify_s"] = time.perf_counter() - start_time
+            if decision["vector"]:
+                start_time = time.perf_counter()
+                figs += extract_vector(
+                    pdf,
+                    page,
+                    page_num,
+                    layout=layout,
+                    store=cache.store,
+                    page_hash=page_hash if lazy else None,
+                    drawings=drawings,
+                    pdf_path=pdf_path,
+                    preferred_format=config.figure_format if config else "png",
+                )
+                decision["vector_s"] = time.perf_counter() - start_time
+
+            # Fingerprint the graphics to find their near-duplicates in prompts.
+            # Lazy figures too: only a thumbnail of their area is rendered, from
+            # one parse of the page content shared by all its graphics.
+            if figs and (config is None or config.perceptual_hashes):
+                source = page.get_displaylist() if len(figs) > 1 else page
+                for graphic in figs:
+                    graphic.phash = cache.perceptual_hash(source, graphic)
+
+            yield PageRecord(page_num, layout.text.strip(), figs, decision, page_hash)
+
+        # Images needed by later page ranges, even if no page here kept them
+        if config is None or config.with_graphics:
+            for xref in sorted(cache.shared - cache.hashes.keys()):
+                cache.image_hash(doc, xref)
+
+
+def check_page_count(doc: fitz.Document, config: Optional[ExtractionConfig]) -> None:
+    """Reject a PDF document with more pages than allowed by the configuration.
+
+    Args:
+        doc (fitz.Document): The opened PDF document.
+        config (ExtractionConfig, optional): Extraction settings.
+
+    Raises:
+        ExtractionLimitError: If the document has more than `config.max_pages`.
+    """
+    if config and 0 < config.max_pages < doc.page_count:
+        raise ExtractionLimitError(
+            f"{doc.page_count} pages, over the cap of {config.max_pages}"
+        )
+
+
+def survey_pdf(
+    pdf_path: str,
+    config: ExtractionConfig,
+    with_hashes: bool = False,
+    with_images: bool = False,
+) -> dict:
+    """Read what the planning of the extraction of a PDF file depends on.
+
+    Like `read_page_range`, this parses the untrusted file, so it runs in an
+    extraction worker, under its timeout and memory cap. The page cap is
+    checked before any page is read.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        config (ExtractionConfig): Extraction settings.
+        with_hashes (bool): Whether the pages are hashed, to match them with a
+            former version of the file (see `plan_page_reuse`).
+        with_images (bool): Whether the images of every page are listed, to
+            extract those shared by several page ranges once.
+
+    Returns:
+        dict: The number of pages, and the hash and the image xrefs of every
+            page when requested.
+    """
+    with get_document_pool().open(pdf_path) as doc:
+        check_page_count(doc, config)
+        survey: dict = {"page_count": doc.page_count}
+        if with_hashes:
+            survey["page_hashes"] = [page_sha256(page) for page in doc]
+        if with_images and config.with_graphics:
+            survey["page_images"] = [
+                [
+                    img[0]
+                    for img in doc.get_page_images(page_num, full=True)
+                    if not 0 < config.max_image_pixels < img[2] * img[3]
+                ]
+                for page_num in range(doc.page_count)
+            ]
+    return survey
+
+
+def read_page_range(
+    pdf_path: str,
+    start: int = 0,
+    stop: Optional[int] = None,
+    config: Optional[ExtractionConfig] = None,
+    deferred: frozenset[int] = frozenset(),
+    shared: frozenset[int] = frozenset(),
+) -> tuple[list[str], list[str], dict]:
+    """Digest a slice of pages of a PDF file into its text and images passage.
+    This is the unit of work shipped to the ingestion workers, every
+    worker opens the document on its own. The images metadata are formatted
+    as soon as their page is parsed, so only the compact passage lines are
+    kept and sent back to the main process.
     Args:
         pdf_path (str): Path to the PDF file.
+        start (int): Index of the first page to process.
+        stop (int, optional): Index after the last page to process, defaults to
+            the end of the document.
+        config (ExtractionConfig, optional): Extraction settings.
+        deferred (frozenset[int]): Xrefs of the images extracted by an earlier
+            page range, named after their xref until merged.
+        shared (frozenset[int]): Xrefs of the images also placed in later page
+            ranges, whose hashes are returned with the counters.
     Returns:
         tuple: A 3-element tuple:
-            - str: Extracted text from the PDF.
-            - list: List of dictionaries containing image metadata.
-            - dict: Metadata about the PDF, including the number of images and the PDF path.
+            - list[str]: Extracted text of each processed page.
+            - list[str]: Images passage line of each extracted image.
+            - dict: Number of images, counters of the work done and saved and,
+              when the graphics are extracted, the hash of every page.
     """
-    doc = fitz.open(pdf_path)
-    pdf = os.path.splitext(os.path.basename(pdf_path))[0]
+    store = AssetStore(config.asset_dir) if config and config.asset_dir else None
+    image_cache = ImageCache(store=store, deferred=deferred, shared=shared)
+
+    texts = []
+    image_lines = []
+    decisions = []
+    hashes = []
+    for record in iter_page_records(pdf_path, start, stop, config, image_cache):
+        texts.append(record.text)
+        image_lines += [format_image_line(img) for img in record.graphics]
+        if record.decision is not None:
+            decisions.append(record.decision)
+        if record.hash is not None:
+            hashes.append(record.hash)
 
-    text = ""
-    figs = []
-    for page_num, page in enumerate(doc):
-        # Parse the text
-        text = " ".join([text, page.get_text().strip()])
+    stats = {
+        "num_images": len(image_lines),
+        **image_cache.stats(),
+        **summarise_page_decisions(decisions),
+    }
+    if hashes:
+        stats["page_hashes"] = hashes
+    return texts, image_lines, stats
 
-        # Extract images
-        figs += extract_images(pdf, doc, page, page_num)
 
-        # Extract vector graphics
-        figs += extract_vector(pdf, page, page_num)
+def summarise_page_decisions(decisions: list[dict]) -> dict:
+    """Summarise the page classifier decisions of a page range for the telemetry.
+
+    The time saved on the skipped pages is estimated from the time spent on the
+    processed pages, per drawing.
+
+    Args:
+        decisions (list[dict]): Decisions of `classify_page`, with their timings.
+
+    Returns:
+        dict: Counters of the skipped pages and of the time spent and saved, and
+            the compact decision of each page.
+    """
+    if not decisions:
+        return {}
+    processed = [d for d in decisions if d["vector"]]
+    skipped = [d for d in decisions if not d["vector"]]
+    vector_s = sum(d["vector_s"] for d in processed)
+    processed_drawings = sum(d.get("drawings", 0) for d in processed)
+    # Pages over the drawing cap are left out, they would not have been processed
+    skipped_drawings = sum(
+        d.get("drawings", 0) for d in skipped if d["reason"] != "too-many-drawings"
+    )
+    return {
+        "vector_pages_skipped": len(skipped),
+        "vector_pages_processed": len(processed),
+        "vector_s": vector_s,
+        "page_classifier_s": sum(d["classify_s"] for d in decisions),
+        "vector_saved_s": (
+            vector_s * skipped_drawings / processed_drawings
+            if processed_drawings
+            else 0.0
+        ),
+        "page_decisions": [
+            {key: d[key] for key in ("page", "reason", "drawings", "bound") if key in d}
+            for d in decisions
+        ],
+    }
+
+
+def merge_pdf_content(
+    pdf_path: str,
+    shards: list[tuple[list[str], list[str], dict]],
+    store: Optional[AssetStore] = None,
+) -> tuple[str, dict]:
+    """Merge the digests of consecutive page ranges of one PDF file.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        shards (list): Results of `read_page_range`, in page order.
+        store (AssetStore, optional): Store where the names of the images shared
+            by several page ranges are linked.
+    Returns:
+        tuple: Same as `extract_pdf_content`.
+    """
+    # Every page is preceded by a space, as in the original page-by-page join
+    page_texts = [
+        f" {page_text}" for shard_texts, _, _ in shards for page_text in shard_texts
+    ]
+    text = "".join(page_texts)
 
     # Format the metadata
-    metas = {"num_images": len(figs), "pdf_path": pdf_path}
-    langfuse_context.update_current_observation(output={"figs": figs, "metas": metas})
+    metas: dict = {"num_images": 0, "pdf_path": pdf_path}
+    image_hashes: dict[int, str] = {}
+    for _, _, stats in shards:
+        for key, value in stats.items():
+            if key == "image_hashes":
+                image_hashes.update(value)
+            else:
+                metas[key] = metas[key] + value if key in metas else value
+    metas["images_passage"] = "\n".join(
+        line for _, shard_lines, _ in shards for line in shard_lines
+    )
+    if image_hashes:
+        metas["images_passage"] = resolve_shared_images(
+            metas["images_passage"], image_hashes, store
+        )
+        metas["num_images"] = len(metas["images_passage"].splitlines())
+    metas["page_starts"] = list(
+        itertools.accumulate((len(page) for page in page_texts[:-1]), initial=0)
+    )
 
-    return text, figs, metas
+    return text, metas
 
 
-@observe(name="📊 process_documents")
-def process_documents(pdf_files) -> tuple[list[str], list[dict], list[str]]:
-    """Process a list of PDF files to extract text and images metadata.
+def read_pdf_content(
+    pdf_path: str, config: Optional[ExtractionConfig] = None
+) -> tuple[str, dict]:
+    """Extract text and images from a whole PDF file without any tracing.
     Args:
-        pdf_files (list): List of paths to PDF files.
+        pdf_path (str): Path to the PDF file.
+        config (ExtractionConfig, optional): Extraction settings.
+    Returns:
+        tuple: Same as `extract_pdf_content`.
+    """
+    return merge_pdf_content(pdf_path, [read_page_range(pdf_path, config=config)])
+
+
+def plan_page_shards(page_count: int, shard_pages: int) -> list[tuple[int, int]]:
+    """Split a PDF file into page ranges processed by separate workers.
+    Args:
+        page_count (int): Number of pages of the PDF file.
+        shard_pages (int): Maximal number of pages per range, 0 disables sharding.
+    Returns:
+        list: List of (start, stop) page ranges covering the whole document.
+    """
+    if shard_pages <= 0 or page_count <= shard_pages:
+        return [(0, page_count)]
+    return [
+        (start, min(start + shard_pages, page_count))
+        for start in range(0, page_count, shard_pages)
+    ]
+
+
+def plan_shared_images(
+    page_images: Optional[list[list[int]]],
+    plan: Sequence[tuple[int, Optional[int]]],
+) -> list[tuple[frozenset[int], frozenset[int]]]:
+    """Assign every image placed in several page ranges to the first of them.
+    The page ranges are extracted by separate workers, each with its own image
+    cache, so an image repeated across them (e.g. a logo) would be extracted
+    once per page range. Only the first one extracts it, and returns its hash
+    for the others (see `read_page_range`).
+    Args:
+        page_images (list, optional): Xrefs of the images of every page, listed
+            by `survey_pdf`. Without them, every page range extracts its images.
+        plan (list): The (start, stop) page range of every shard, in page order.
+    Returns:
+        list: The images deferred to an earlier page range and those shared with
+            later ones, as two sets of xrefs per page range.
+    """
+    empty: tuple[frozenset[int], frozenset[int]] = (frozenset(), frozenset())
+    if len(plan) <= 1 or page_images is None:
+        return [empty] * len(plan)
+    shard_xrefs = [
+        {
+            xref
+            for page_xrefs in page_images[
+                start : len(page_images) if stop is None else stop
+            ]
+            for xref in page_xrefs
+        }
+        for start, stop in plan
+    ]
+
+    owners: dict[int, int] = {}
+    for num, xrefs in enumerate(shard_xrefs):
+        for xref in xrefs:
+            owners.setdefault(xref, num)
+    needed_later = {
+        xref
+        for num, xrefs in enumerate(shard_xrefs)
+        for xref in xrefs
+        if owners[xref] < num
+    }
+    return [
+        (
+            frozenset(xref for xref in xrefs if owners[xref] < num),
+            frozenset(xref for xref in xrefs if owners[xref] == num) & needed_later,
+        )
+        for num, xrefs in enumerate(shard_xrefs)
+    ]
+
+
+def plan_changed_shards(
+    page_count: int, reused: dict, shard_pages: int
+) -> list[tuple[int, int]]:
+    """Split the pages of a revised PDF file not reused from its former version.
+    Args:
+        page_count (int): Number of pages of the PDF file.
+        reused (dict): Results of the reused pages, keyed by page number.
+        shard_pages (int): Maximal number of pages per range, 0 disables sharding.
+    Returns:
+        list: List of (start, stop) page ranges covering the pages to extract.
+    """
+    shards: list[tuple[int, int]] = []
+    for page_num in range(page_count):
+        if page_num in reused:
+            continue
+        if (
+            shards
+            and shards[-1][1] == page_num
+            and (shard_pages <= 0 or page_num - shards[-1][0] < shard_pages)
+        ):
+            shards[-1] = (shards[-1][0], page_num + 1)
+        else:
+            shards.append((page_num, page_num + 1))
+    return shards
+
+
+def merge_with_reused(
+    pdf_path: str,
+    plan: Sequence[tuple[int, Optional[int]]],
+    shards: list[tuple[list[str], list[str], dict]],
+    reused: dict,
+    page_hashes: list[str],
+    with_graphics: bool = True,
+    store: Optional[AssetStore] = None,
+) -> tuple[str, dict]:
+    """Merge the extracted page ranges of a PDF file with its reused pages.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        plan (list): The (start, stop) page range of every extracted shard.
+        shards (list): Results of `read_page_range`, one per page range.
+        reused (dict): Text and images passage lines of the reused pages, keyed
+            by page number.
+        page_hashes (list[str]): Hash of every page of the file.
+        with_graphics (bool): Whether the images passage lines are kept.
+        store (AssetStore, optional): Store where the names of the images shared
+            by several page ranges are linked.
+    Returns:
+        tuple: Same as `extract_pdf_content`, with the number of pages reused.
+    """
+    pieces = [(start, shard) for (start, _), shard in zip(plan, shards)]
+    for page_num, (text, lines) in reused.items():
+        lines = lines if with_graphics else []
+        pieces.append(
+            (page_num, ([text], lines, {"num_images": len(lines), "pages_reused": 1}))
+        )
+    pieces.sort(key=lambda piece: piece[0])
+    text, metas = merge_pdf_content(pdf_path, [shard for _, shard in pieces], store)
+    metas.setdefault("pages_reused", 0)
+    metas["page_hashes"] = page_hashes
+    return text, metas
+
+
+def plan_extraction(
+    survey: dict, previous: Optional[dict], shard_pages: int
+) -> tuple[list[tuple[int, int]], list, Optional[dict]]:
+    """Plan the page ranges of a PDF file from its survey.
+    Args:
+        survey (dict): Result of `survey_pdf` for the file.
+        previous (dict, optional): Page manifest entry of the former version of
+            the file, whose unchanged pages are reused.
+        shard_pages (int): Maximal number of pages per range, 0 disables sharding.
+    Returns:
+        tuple: A 3-element tuple:
+            - list: The (start, stop) page range of every shard to extract.
+            - list: The deferred and shared images of every page range (see
+              `plan_shared_images`).
+            - dict: The reused pages keyed by page number, or None if the file
+              is extracted from scratch.
+    """
+    reused = None
+    if previous is not None and "page_hashes" in survey:
+        reused, _, _ = plan_page_reuse(previous, survey["page_hashes"])
+        plan = plan_changed_shards(survey["page_count"], reused, shard_pages)
+    else:
+        plan = plan_page_shards(survey["page_count"], shard_pages)
+    return plan, plan_shared_images(survey.get("page_images"), plan), reused
+
+
+@observe(name="⚙️ extract_pdf_content")
+def extract_pdf_content(
+    pdf_path: str, config: Optional[ExtractionConfig] = None
+) -> tuple[str, dict]:
+    """Extract text and images from a PDF file.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        config (ExtractionConfig, optional): Extraction settings.
     Returns:
         tuple: A 2-element tuple:
-            - list[str]: List of extracted text from each PDF.
-            - list[dict]: List of metadata dictionaries for each PDF.
+            - str: Extracted text from the PDF.
+            - dict: Metadata about the PDF, including the number of images, the PDF
+              path, the images passage and the extraction counters.
     """
-    documents = []
-    metadatas = []
-    failed = []
+    text, metas = read_pdf_content(pdf_path, config)
+    langfuse_context.update_current_observation(output={"metas": metas})
+
+    return text, metas
 
-    for pdf_path in pdf_files:
+
+ExtractionResult = Union[tuple[str, dict], Exception]
+
+
+@dataclass
+class _PendingFile:
+    """A PDF file being extracted by `extract_all`, surveyed or not yet.
+
+    Attributes:
+        pdf_path (str): Path to the PDF file.
+        survey (Future, optional): Future of its survey, None once planned.
+        plan (list): The (start, stop) page range of every shard.
+        shards (list[Future]): Futures of the shards being extracted.
+        reused (dict, optional): Reused pages keyed by page number, None if the
+            file is extracted from scratch.
+        page_hashes (list[str]): Hash of every page, for a revised file.
+        error (Exception, optional): Exception raised by the survey.
+    """
+
+    pdf_path: str
+    survey: Optional[Future] = None
+    plan: list = field(default_factory=list)
+    shards: list = field(default_factory=list)
+    reused: Optional[dict] = None
+    page_hashes: list = field(default_factory=list)
+    error: Optional[Exception] = None
+
+
+def _start_shards(
+    executor: IsolatedExecutor,
+    item: _PendingFile,
+    config: ExtractionConfig,
+    previous: dict[str, dict],
+    shard_pages: int,
+) -> int:
+    """Plan a surveyed file and submit its page ranges, returning how many."""
+    survey_future, item.survey = item.survey, None
+    images: list[tuple[frozenset[int], frozenset[int]]]
+    if survey_future is None:
+        item.plan, images = [(0, None)], [(frozenset(), frozenset())]
+    else:
         try:
-            text, imgs, metas = extract_pdf_content(pdf_path)
-        except Exception as e:
-            LOGGER.error("❌ Error processing %s", pdf_path, exc_info=e)
+            survey = survey_future.result()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            item.error = e
+            return 0
+        item.plan, images, item.reused = plan_extraction(
+            survey, previous.get(item.pdf_path), shard_pages
+        )
+        item.page_hashes = survey.get("page_hashes", [])
+    item.shards = [
+        executor.submit(
+            read_page_range, item.pdf_path, start, stop, config, deferred, shared
+        )
+        for (start, stop), (deferred, shared) in zip(item.plan, images)
+    ]
+    return len(item.shards)
+
+
+def extract_all(
+    pdf_files: list[str],
+    config: ExtractionConfig,
+    previous: Optional[dict[str, dict]] = None,
+) -> Iterator[tuple[str, ExtractionResult]]:
+    """Extract the content of several PDF files, optionally in isolated workers.
+    Large files are split into page ranges so that a single long document is
+    also spread over the workers. Results are yielded in input order as soon
+    as they are ready, and only a bounded number of files is in flight so the
+    memory use does not grow with the size of the upload. An exception raised
+    while processing one file is yielded in place of its result so the other
+    files are unaffected.
+    With `config.isolated`, every page range is extracted in its own process,
+    killed when it runs past the timeout, and whose allocations are capped, so
+    a pathological PDF fails on its own instead of stalling the server. The
+    files are surveyed (page count, page hashes and images) by the workers too,
+    before their page ranges are planned.
+    Files given in `previous` are matched page by page with their former version,
+    only their changed pages are extracted.
+    Args:
+        pdf_files (list[str]): List of paths to PDF files.
+        config (ExtractionConfig): Extraction settings, including the upper bound
+            on the number of worker processes, the page sharding size and the
+            limits of the workers.
+        previous (dict, optional): Page manifest entries of the former versions
+            of revised files, keyed by PDF path (see `PageManifest`).
+    Yields:
+        tuple: The PDF path and either its extraction result or the raised
+            exception. The metadata of revised files hold the hash of every page.
+    """
+    if not pdf_files:
+        return
+    previous = previous or {}
+    shard_pages = config.shard_pages if config.max_workers > 1 else 0
+    store = AssetStore(config.asset_dir) if config.asset_dir else None
+
+    if config.max_workers <= 1 and not config.isolated:
+        for pdf_path in pdf_files:
+            try:
+                if pdf_path in previous:
+                    survey = survey_pdf(pdf_path, config, with_hashes=True)
+                    plan, _, reused = plan_extraction(survey, previous[pdf_path], 0)
+                    shards = [
+                        read_page_range(pdf_path, start, stop, config)
+                        for start, stop in plan
+                    ]
+                    yield pdf_path, merge_with_reused(
+                        pdf_path,
+                        plan,
+                        shards,
+                        reused or {},
+                        survey["page_hashes"],
+                        config.with_graphics,
+                        store,
+                    )
+                else:
+                    yield pdf_path, extract_pdf_content(pdf_path, config)
+            except Exception as e:
+                yield pdf_path, e
+        return
+
+    workers = max(1, config.max_workers)
+    LOGGER.info("🏭 Extracting %d PDFs with %d workers", len(pdf_files), workers)
+    with IsolatedExecutor(
+        max_workers=workers,
+        timeout=config.timeout_s if config.isolated else 0,
+        memory_mb=config.memory_mb if config.isolated else 0,
+    ) as executor:
+        queued = iter(pdf_files)
+        pending: deque[_PendingFile] = deque()
+        in_flight = 0
+        while True:
+            # Keep every worker busy with at most two tasks queued each. Files
+            # are surveyed first when sharded or revised, then split.
+            while in_flight < 2 * workers:
+                next_path = next(queued, None)
+                if next_path is None:
+                    break
+                item = _PendingFile(next_path)
+                if next_path in previous or shard_pages > 0:
+                    item.survey = executor.submit(
+                        survey_pdf,
+                        next_path,
+                        config,
+                        next_path in previous,
+                        shard_pages > 0 or next_path in previous,
+                    )
+                    in_flight += 1
+                else:
+                    in_flight += _start_shards(
+                        executor, item, config, previous, shard_pages
+                    )
+                pending.append(item)
+            if not pending:
+                break
+
+            # Split the surveyed files until the first one is extracted
+            head = pending[0]
+            while True:
+                for item in pending:
+                    if item.survey is not None and item.survey.done():
+                        in_flight += (
+                            _start_shards(executor, item, config, previous, shard_pages)
+                            - 1
+                        )
+                waiting = [item.survey for item in pending if item.survey is not None]
+                if head.survey is None:
+                    running = [future for future in head.shards if not future.done()]
+                    if not running:
+                        break
+                    waiting += running
+                wait(waiting, return_when=FIRST_COMPLETED)
+
+            pending.popleft()
+            in_flight -= len(head.shards)
+            try:
+                if head.error is not None:
+                    raise head.error
+                shards = [future.result() for future in head.shards]
+                if head.reused is not None:
+                    yield head.pdf_path, merge_with_reused(
+                        head.pdf_path,
+                        head.plan,
+                        shards,
+                        head.reused,
+                        head.page_hashes,
+                        config.with_graphics,
+                        store,
+                    )
+                else:
+                    yield head.pdf_path, merge_pdf_content(head.pdf_path, shards, store)
+            except Exception as e:
+                # Do not start the other page ranges of a failed file
+                for future in head.shards:
+                    future.cancel()
+                yield head.pdf_path, e
+
+    if executor.killed:
+        LOGGER.warning("💀 Killed %d extraction workers", executor.killed)
+
+
+def format_image_line(img: GraphicRecord) -> str:
+    """Format the metadata of one extracted image as a line of the images passage.
+    Args:
+        img (GraphicRecord): Record of the image or figure.
+    Returns:
+        str: JSON-like line with the image path, caption and orientation.
+    """
+    caption = img.caption
+    caption_str = str(caption) if caption is not None else ""
+    full_path = f"gfx/{img.name}"
+
+    cleaned_caption = re.sub(
+        r"^(fig(?:ure)?\.?\s*\d+\.\s*)",
+        "",
+        caption_str,
+        flags=re.IGNORECASE,
+    ).strip()
+    caption = cleaned_caption if cleaned_caption else "None"
+
+    # The perceptual hash is only read by `dedupe_graphics`, never shown to the LLM
+    phash = f', "phash": "{img.phash:016x}"' if img.phash else ""
+    return (
+        f'{{"path": "{full_path}", '
+        f'"caption": "{caption}", '
+        f'"orientation": "{img.ratio}"{phash}}}'
+    )
+
+
+def format_images_passage(imgs: list[GraphicRecord]) -> str:
+    """Format the extracted images metadata as passage for the LLM prompt.
+    Args:
+        imgs (list[GraphicRecord]): Records of the images and figures.
+    Returns:
+        str: One JSON-like line per image with its path, caption and orientation.
+    """
+    return "\n".join(format_image_line(img) for img in imgs)
+
+
+def iter_documents(
+    pdf_files,
+    config: Optional[ExtractionConfig] = None,
+    failed: Optional[list] = None,
+    previous: Optional[dict[str, dict]] = None,
+) -> Generator[tuple[str, str, dict], None, None]:
+    """Stream the text and metadata of PDF files, one document at a time.
+    Each document is yielded as soon as it is extracted, so that downstream
+    stages (embedding, database insertion) start before the other files are
+    parsed and only one document is held in memory at a time.
+    Args:
+        pdf_files (list): List of paths to PDF files.
+        config (ExtractionConfig, optional): Extraction settings, such as the
+            number of worker processes. Defaults are read from the environment.
+        failed (list, optional): List collecting the PDF paths which failed to
+            be processed.
+        previous (dict, optional): Page manifest entries of the former versions
+            of revised files, keyed by PDF path. Only their changed pages are
+            extracted.
+    Yields:
+        tuple: The PDF path, its extracted text and its metadata dictionary,
+            including the offsets of the pages in the text (see `chunk_document`)
+            and the hash of every page when known.
+    """
+    config = config or ExtractionConfig()
+
+    for pdf_path, result in extract_all(list(pdf_files), config, previous):
+        if isinstance(result, Exception):
+            LOGGER.error("❌ Error processing %s", pdf_path, exc_info=result)
             langfuse_context.update_current_observation(
                 output={
                     "output.images_passage": None,
                     "output.num_images": None,
                     "output.pdf_path": pdf_path,
+                    "output.error": f"{type(result).__name__}: {result}",
                 }
             )
-            failed.append(pdf_path)
+            if failed is not None:
+                failed.append(pdf_path)
             continue
 
-        documents.append(text)
-
-        # Format images
-        images_info = []
-        for _, img in enumerate(imgs, start=1):
-            caption = img.get("caption")
-            caption_str = str(caption) if caption is not None else ""
-            full_path = f"gfx/{img['name']}"
-
-            cleaned_caption = re.sub(
-                r"^(fig(?:ure)?\.?\s*\d+\.\s*)",
-                "",
-                caption_str,
-                flags=re.IGNORECASE,
-            ).strip()
-            caption = cleaned_caption if cleaned_caption else "None"
-
-            images_info.append(
-                (
-                    f'{{"path": "{full_path}", '
-                    f'"caption": "{caption}", '
-                    f'"orientation": "{img["ratio"]}"}}'
-                )
-            )
-
-        images_passage = "\n".join(images_info)
-        # span.set_attribute("output.images_passage", images_passage)
+        text, metas = result
 
         # Format metadata
         fixed_metadata = {
             "num_images": metas.get("num_images"),
             "pdf_path": metas.get("pdf_path"),
-            "images_passage": images_passage,
+            "images_passage": metas.get("images_passage"),
+            "figures_ready": config.with_graphics,
+            # Offsets of the pages in the text, used to chunk it, not stored
+            "page_starts": metas.get("page_starts"),
+            # Hashes of the pages, recorded in the page manifest, not stored
+            "page_hashes": metas.get("page_hashes"),
         }
 
         langfuse_context.update_current_observation(
             output={
-                "output.images_passage": images_passage,
+                "output.images_passage": metas.get("images_passage"),
                 "output.num_images": metas.get("num_images"),
                 "output.pdf_path": metas.get("pdf_path"),
+                "output.vector_pages_skipped": metas.get("vector_pages_skipped"),
+                "output.vector_saved_s": metas.get("vector_saved_s"),
+                "output.page_decisions": metas.get("page_decisions"),
+                "output.pages_reused": metas.get("pages_reused"),
             }
         )
-        metadatas.append(fixed_metadata)
+        yield pdf_path, text, fixed_metadata
+
+
+@observe(name="📊 process_documents")
+def process_documents(
+    pdf_files, config: Optional[ExtractionConfig] = None
+) -> tuple[list[str], list[dict], list[str]]:
+    """Process a list of PDF files to extract text and images metadata.
+    Args:
+        pdf_files (list): List of paths to PDF files.
+        config (ExtractionConfig, optional): Extraction settings, such as the
+            number of worker processes. Defaults are read from the environment.
+    Returns:
+        tuple: A 3-element tuple:
+            - list[str]: List of extracted text from each PDF.
+            - list[dict]: List of metadata dictionaries for each PDF.
+            - list[str]: List of PDF paths which failed to be processed.
+    """
+    documents = []
+    metadatas = []
+    failed: list[str] = []
+
+    for _, text, metadata in iter_documents(pdf_files, config, failed):
+        documents.append(text)
+        metadatas.append(metadata)
 
     return documents, metadatas, failed
 
@@ -0,0 +1,252 @@
+"""Module clustering the vector drawings of a PDF page into figure candidates."""
+
+import os
+
+import fitz
+import numpy as np
+
+# Use PyMuPDF's own clustering (Page.cluster_drawings) instead of the union-find
+# engine. Its grouping rules differ slightly, so ingestion and generation must agree.
+NATIVE_CLUSTERING = os.getenv("NATIVE_CLUSTERING", "false").lower() == "true"
+
+# Number of box pairs tested at once by `connected_components`, and minimal
+# number of boxes per block, so dense pages do not go box by box
+PAIRS_PER_BLOCK = 1 << 16
+MIN_BLOCK_BOXES = 256
+
+# Blocks whose boxes belong to at most this many components are tested one
+# component at a time, against the boxes of the other components only
+MAX_BLOCK_COMPONENTS = 4
+
+
+def _find_roots(parent: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Find the union-find roots of several nodes at once by pointer jumping."""
+    roots = parent[nodes]
+    while True:
+        up = parent[roots]
+        if np.array_equal(up, roots):
+            return roots
+        roots = up
+
+
+def _union_roots(parent: np.ndarray, left: np.ndarray, right: np.ndarray) -> None:
+    """Union the components of several pairs of roots at once.
+
+    Every root points to a smaller index, so hooking the larger root of each
+    pair under the smaller one never creates a cycle. Pairs still apart after a
+    round, when several hooks competed for the same root, go another round.
+    """
+    while left.size:
+        left = _find_roots(parent, left)
+        right = _find_roots(parent, right)
+        apart = left != right
+        if not apart.any():
+            return
+        left, right = left[apart], right[apart]
+        np.minimum.at(parent, np.maximum(left, right), np.minimum(left, right))
+
+
+def _close_pairs(
+    sweep: tuple[np.ndarray, ...], ends: np.ndarray, rows: np.ndarray, cols: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Find the pairs of boxes which are close among rows and later candidates.
+
+    Args:
+        sweep (tuple): Low and high bounds of the sorted boxes along the sweep
+            axis, then along the other axis.
+        ends (np.ndarray): Index after the last candidate of every sorted box.
+        rows (np.ndarray): Sorted indices of the boxes of the block.
+        cols (np.ndarray): Sorted indices of their candidates.
+
+    Returns:
+        tuple: The positions in `rows` and `cols` of every close pair.
+    """
+    lo, hi, other_lo, other_hi = sweep
+    left, right = np.nonzero(
+        (hi[cols] >= lo[rows, None])
+        & (other_lo[cols] <= other_hi[rows, None])
+        & (other_hi[cols] >= other_lo[rows, None])
+        & (cols < ends[rows, None])
+        & (cols > rows[:, None])
+    )
+    return left, right
+
+
+def connected_components(boxes: np.ndarray, threshold: float) -> np.ndarray:
+    """Label the groups of boxes lying within `2 * threshold` of each other.
+
+    Two boxes are connected when their bounding boxes, expanded by `threshold`
+    on every side, intersect (borders included). Connected components are
+    found with an iterative union-find over a sweep along the axis with the
+    fewest overlapping candidates, so there is no recursion and no chunking.
+    The sweep tests blocks of consecutive boxes against their candidates at
+    once, so pages of heavily overlapping drawings are not processed box by box.
+
+    Args:
+        boxes (np.ndarray): Array of shape (n, 4) with (left, top, right, bottom) rows.
+        threshold (float): The distance threshold to consider two boxes as close.
+
+    Returns:
+        np.ndarray: For each box, the index of the first box of its component.
+    """
+    num_boxes = len(boxes)
+    if num_boxes == 0:
+        return np.empty(0, dtype=np.intp)
+
+    expanded = boxes + np.array([-threshold, -threshold, threshold, threshold])
+
+    # Sweep along the axis where boxes overlap the least
+    sweeps = []
+    for lo_col, hi_col in ((0, 2), (1, 3)):
+        order = np.argsort(expanded[:, lo_col], kind="stable")
+        sorted_boxes = expanded[order]
+        ends = np.searchsorted(
+            sorted_boxes[:, lo_col], sorted_boxes[:, hi_col], side="right"
+        )
+        work = int(np.sum(ends - np.arange(num_boxes)))
+        sweeps.append((work, lo_col, order, sorted_boxes, ends))
+    _, lo_col, order, sorted_boxes, ends = min(sweeps, key=lambda sweep: sweep[0])
+    sweep = (
+        sorted_boxes[:, lo_col],
+        sorted_boxes[:, lo_col + 2],
+        sorted_boxes[:, 1 - lo_col],
+        sorted_boxes[:, 3 - lo_col],
+    )
+
+    # Candidates of a box start after it and before it ends along the sweep axis
+    window_ends = np.maximum.accumulate(np.maximum(ends, np.arange(1, num_boxes + 1)))
+    parent = np.arange(num_boxes)
+    pos = 0
+    while pos < num_boxes:
+        # Take as many boxes as fit the block along with all their candidates
+        most = min(num_boxes - pos, PAIRS_PER_BLOCK)
+        pairs = np.arange(1, most + 1) * (window_ends[pos : pos + most] - pos)
+        size = int(np.searchsorted(pairs, PAIRS_PER_BLOCK, "right"))
+        stop = pos + max(min(MIN_BLOCK_BOXES, most), size)
+        end = int(window_ends[stop - 1])
+        if end <= pos + 1:
+            pos = stop
+            continue
+
+        rows = np.arange(pos, stop)
+        cols = np.arange(pos + 1, end)
+        row_roots = _find_roots(parent, rows)
+        col_roots = _find_roots(parent, cols)
+        components = np.unique(row_roots)
+        if components.size > MAX_BLOCK_COMPONENTS:
+            left, right = _close_pairs(sweep, ends, rows, cols)
+            left, right = row_roots[left], col_roots[right]
+        else:
+            # Boxes already in the component of a box need no test against it
+            left_parts, right_parts = [], []
+            for root in components:
+                in_rows = np.flatnonzero(row_roots == root)
+                in_cols = np.flatnonzero(col_roots != root)
+                found = _close_pairs(sweep, ends, rows[in_rows], cols[in_cols])
+                left_parts.append(row_roots[in_rows[found[0]]])
+                right_parts.append(col_roots[in_cols[found[1]]])
+            left, right = np.concatenate(left_parts), np.concatenate(right_parts)
+        apart = left != right
+        _union_roots(parent, left[apart], right[apart])
+        pos = stop
+
+    # Flatten the trees
+    while True:
+        up = parent[parent]
+        if np.array_equal(up, parent):
+            break
+        parent = up
+
+    # Label every component by the first of its boxes in the input order
+    first = np.full(num_boxes, num_boxes, dtype=np.intp)
+    np.minimum.at(first, parent, order)
+    labels = np.empty(num_boxes, dtype=np.intp)
+    labels[order] = first[parent]
+    return labels
+
+
+def merge_components(boxes: np.ndarray, labels: np.ndarray) -> list[fitz.Rect]:
+    """Merge the boxes of every component into a single bounding box.
+
+    Empty boxes (zero width or height) are ignored by the union, as by
+    `fitz.Rect.__or__`, unless the whole component is empty.
+
+    Args:
+        boxes (np.ndarray): Array of shape (n, 4) with (left, top, right, bottom) rows.
+        labels (np.ndarray): Component label of each box, see `connected_components`.
+
+    Returns:
+        list[fitz.Rect]: One merged box per component, ordered by their first box.
+    """
+    components, inverse = np.unique(labels, return_inverse=True)
+    num_components = len(components)
+
+    non_empty = (boxes[:, 0] < boxes[:, 2]) & (boxes[:, 1] < boxes[:, 3])
+    merged = boxes[components].copy()
+    lows = np.full((num_components, 2), np.inf)
+    highs = np.full((num_components, 2), -np.inf)
+    np.minimum.at(lows, inverse[non_empty], boxes[non_empty, :2])
+    np.maximum.at(highs, inverse[non_empty], boxes[non_empty, 2:])
+
+    has_area = np.isfinite(lows[:, 0])
+    merged[has_area, :2] = lows[has_area]
+    merged[has_area, 2:] = highs[has_area]
+    return [fitz.Rect(*box) for box in merged.tolist()]
+
+
+def cluster_boxes(bboxes, threshold=50) -> list[fitz.Rect]:
+    """Group bounding boxes that are close to each other into larger bounding boxes.
+
+    Args:
+        bboxes (list): A list of bounding boxes (fitz.Rect or 4-tuples).
+        threshold (float): The distance threshold to consider two boxes as close.
+
+    Returns:
+        list[fitz.Rect]: One merged box per group, ordered by their first box.
+    """
+    if not bboxes:
+        return []
+    boxes = np.array([tuple(bbox) for bbox in bboxes], dtype=np.float64)
+    labels = connected_components(boxes, threshold)
+    return merge_components(boxes, labels)
+
+
+def page_drawings(page) -> list[dict]:
+    """Get the drawings of a page, in the form expected by `cluster_drawings`.
+
+    Only the bounding boxes of the drawings are used by the union-find engine, so
+    the raw paths of `page.get_cdrawings()` are enough and spare the conversion
+    of every path item to PyMuPDF objects done by `page.get_drawings()`.
+
+    Args:
+        page (fitz.Page): The PDF page object.
+
+    Returns:
+        list[dict]: One dictionary per drawing, with at least its "rect".
+    """
+    if NATIVE_CLUSTERING:
+        return page.get_drawings()
+    return page.get_cdrawings()
+
+
+def cluster_drawings(drawings, threshold=50, page=None) -> list[fitz.Rect]:
+    """Group the drawings of a page into figure candidates.
+
+    Args:
+        drawings (list): The drawings of the page, as returned by `page_drawings`.
+        threshold (float): The distance threshold to consider two drawings as close.
+        page (fitz.Page, optional): The page, required for the native clustering.
+
+    Returns:
+        list[fitz.Rect]: One bounding box per group of drawings.
+    """
+    if NATIVE_CLUSTERING and page is not None:
+        return page.cluster_drawings(
+            drawings=drawings,
+            x_tolerance=2 * threshold,
+            y_tolerance=2 * threshold,
+            final_filter=False,
+        )
+    # Null rectangles are dropped, as falsy `fitz.Rect` objects
+    rects = [d["rect"] for d in drawings if any(d.get("rect", ()))]
+    return cluster_boxes(rects, threshold)
@@ -0,0 +1,87 @@
+"""Module holding the configuration of the PDF extraction pipeline."""
+
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Bump whenever a change alters the extracted text or graphics metadata, so that
+# results cached by earlier versions are not served anymore
+EXTRACTOR_VERSION = 3
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment.
+
+    Args:
+        name (str): Name of the environment variable.
+        default (int): Value used when the variable is unset or invalid.
+
+    Returns:
+        int: The parsed value or the default.
+    """
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def default_workers() -> int:
+    """Number of extraction workers used when INGEST_WORKERS is not set."""
+    return env_int("INGEST_WORKERS", min(4, os.cpu_count() or 1))
+
+
+@dataclass
+class ExtractionConfig:
+    """Configuration for the PDF extraction pipeline."""
+
+    # Number of worker processes used for ingestion, 1 keeps extraction in-process
+    # unless isolated
+    max_workers: int = field(default_factory=default_workers)
+    # PDFs longer than this are split into page ranges of this size (0 disables)
+    shard_pages: int = field(default_factory=lambda: env_int("INGEST_SHARD_PAGES", 40))
+    # Root of the session's asset store keeping the extracted graphics
+    asset_dir: Optional[str] = None
+    # Extract the images and vector figures, text-only extraction when disabled
+    with_graphics: bool = True
+    # Skip the vector figure detection on pages too sparse to hold a figure
+    classify_pages: bool = field(
+        default_factory=lambda: os.getenv("PAGE_CLASSIFIER", "true").lower() == "true"
+    )
+    # Export vector figures as PDF clips ("pdf") or as 4x PNG renderings ("png")
+    figure_format: str = field(
+        default_factory=lambda: os.getenv("FIGURE_FORMAT", "pdf").lower()
+    )
+    # Identify vector figures by their geometry and render them only when used
+    lazy_figures: bool = field(
+        default_factory=lambda: os.getenv("LAZY_FIGURES", "true").lower() == "true"
+    )
+
+    # Fingerprint the graphics so that near-duplicates are shown once in prompts
+    perceptual_hashes: bool = field(
+        default_factory=lambda: os.getenv("GRAPHICS_DEDUPE", "true").lower() == "true"
+    )
+
+    # Run the extraction in separate processes, killed past the limits below
+    isolated: bool = field(
+        default_factory=lambda: os.getenv("INGEST_ISOLATION", "true").lower() == "true"
+    )
+    # Wall-clock seconds allowed per worker task, 0 disables the timeout
+    timeout_s: int = field(default_factory=lambda: env_int("INGEST_TIMEOUT", 300))
+    # Address space a worker process may allocate in MB, 0 disables the cap
+    memory_mb: int = field(default_factory=lambda: env_int("INGEST_MEMORY_MB", 4096))
+    # PDFs with more pages are rejected, 0 disables the cap
+    max_pages: int = field(default_factory=lambda: env_int("INGEST_MAX_PAGES", 2000))
+    # Pages with more drawings skip the vector figure detection, 0 disables the cap
+    max_drawings: int = field(
+        default_factory=lambda: env_int("INGEST_MAX_DRAWINGS", 100_000)
+    )
+    # Embedded images with more pixels are not extracted, 0 disables the cap
+    max_image_pixels: int = field(
+        default_factory=lambda: env_int("INGEST_MAX_IMAGE_PIXELS", 50_000_000)
+    )
+
+    @property
+    def extractor_tag(self) -> str:
+        """Tag identifying the extractor output, used to key cached results."""
+        figures = "lazy" if self.lazy_figures else "eager"
+        return f"v{EXTRACTOR_VERSION}-{figures}-{self.figure_format}"
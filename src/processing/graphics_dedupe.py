@@ -0,0 +1,198 @@
+"""Module detecting the near-duplicate images and figures shown to the LLM."""
+
+import os
+import re
+from collections import Counter
+from typing import Optional, Union
+
+import fitz
+
+from .chunking import estimate_tokens
+from .extraction_config import env_int
+
+# Size of the grayscale thumbnail the difference hash is computed from, and
+# number of rendered pixels per thumbnail pixel along each axis
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+HASH_OVERSAMPLING = 4
+
+# Graphics whose hashes differ by at most this many bits are near-duplicates
+DEDUPE_DISTANCE = env_int("GRAPHICS_DEDUPE_DISTANCE", 6)
+
+# Fields of an images passage line, written by `format_image_line`
+PHASH_FIELD = re.compile(r', "phash": "([0-9a-f]{16})"')
+CAPTION_FIELD = re.compile(r'"caption": "(.*)", "orientation": "(\w+)"')
+
+
+def perceptual_hash(page: Union[fitz.Page, fitz.DisplayList], bbox) -> int:
+    """Difference hash (dHash) of the area of a page covered by a graphic.
+
+    The area is rendered in grayscale at a low resolution and averaged down to
+    a 9x8 thumbnail, every bit of the hash tells whether a pixel is brighter
+    than its right neighbour. Copies of a graphic drawn at another size, or
+    re-encoded, get the same hash or a close one.
+
+    Args:
+        page (fitz.Page or fitz.DisplayList): The PDF page showing the graphic,
+            or its display list to render several graphics of a page from a
+            single parse of its content.
+        bbox: Left, top, right and bottom of the graphic on the page.
+
+    Returns:
+        int: The 64-bit hash, 0 if the area is empty.
+    """
+    rect = fitz.Rect(*bbox) & page.rect
+    if rect.is_empty or rect.width < 1 or rect.height < 1:
+        return 0
+    matrix = fitz.Matrix(
+        HASH_WIDTH * HASH_OVERSAMPLING / rect.width,
+        HASH_HEIGHT * HASH_OVERSAMPLING / rect.height,
+    )
+    pix = page.get_pixmap(matrix=matrix, clip=rect, colorspace=fitz.csGRAY)
+    samples, width, height, stride = pix.samples, pix.width, pix.height, pix.stride
+    sums = [0] * (HASH_WIDTH * HASH_HEIGHT)
+    counts = [0] * (HASH_WIDTH * HASH_HEIGHT)
+    for y in range(height):
+        row = y * HASH_HEIGHT // height * HASH_WIDTH
+        offset = y * stride
+        for x in range(width):
+            cell = row + x * HASH_WIDTH // width
+            sums[cell] += samples[offset + x]
+            counts[cell] += 1
+    cells = [total / count if count else 0.0 for total, count in zip(sums, counts)]
+
+    value = 0
+    for row in range(0, HASH_WIDTH * HASH_HEIGHT, HASH_WIDTH):
+        for col in range(row, row + HASH_WIDTH - 1):
+            value = value << 1 | (cells[col] > cells[col + 1])
+    return value
+
+
+def strip_phash(line: str) -> str:
+    """Remove the perceptual hash from an images passage line.
+
+    Args:
+        line (str): One JSON-like line of an images passage.
+
+    Returns:
+        str: The line as shown to the LLM.
+    """
+    return PHASH_FIELD.sub("", line)
+
+
+def _caption_score(line: str) -> int:
+    """Rank the caption of a line, longer captions describe the graphic better."""
+    match = CAPTION_FIELD.search(line)
+    if match is None or match.group(1) == "None":
+        return -1
+    return len(match.group(1))
+
+
+def cluster_lines(lines: list[str], max_distance: int) -> dict[str, str]:
+    """Group the near-duplicate graphics of images passage lines.
+
+    Every line joins the first group of the same orientation whose first line
+    has a hash within `max_distance` bits of its own. Lines without a hash form
+    their own group. The representative of a group is its line with the best
+    caption.
+
+    Args:
+        lines (list[str]): Distinct images passage lines, in order of relevance.
+        max_distance (int): Maximal number of differing bits of near-duplicates.
+
+    Returns:
+        dict[str, str]: The representative line of every line.
+    """
+    groups: list[tuple[int, str, list[str]]] = []
+    group_of: dict[str, list[str]] = {}
+    for line in lines:
+        phash_match = PHASH_FIELD.search(line)
+        caption_match = CAPTION_FIELD.search(line)
+        phash = int(phash_match.group(1), 16) if phash_match else 0
+        orientation = caption_match.group(2) if caption_match else ""
+        members: Optional[list[str]] = None
+        if phash:
+            for group_hash, group_orientation, group_members in groups:
+                if (
+                    group_orientation == orientation
+                    and (group_hash ^ phash).bit_count() <= max_distance
+                ):
+                    members = group_members
+                    break
+        if members is None:
+            members = []
+            if phash:
+                groups.append((phash, orientation, members))
+        members.append(line)
+        group_of[line] = members
+
+    position = {line: num for num, line in enumerate(lines)}
+    return {
+        line: max(
+            members, key=lambda member: (_caption_score(member), -position[member])
+        )
+        for line, members in group_of.items()
+    }
+
+
+def dedupe_graphics(metadatas: list[dict]) -> tuple[list[dict], dict]:
+    """Keep one graphic per group of near-duplicates in the retrieved chunks.
+
+    Documents of one group often reuse the same figures (diagrams, logos,
+    re-rendered plots). Only the copy with the best caption is kept, in the
+    first chunk showing the group, so the LLM picks from distinct graphics and
+    only them can end up in the presentation. The perceptual hashes are
+    removed from the images passages in any case. Disabled by setting
+    GRAPHICS_DEDUPE to false.
+
+    Args:
+        metadatas (list[dict]): Metadata of the retrieved chunks, in order of
+            relevance.
+
+    Returns:
+        tuple: The metadata with their images passages deduplicated, and the
+            number of groups merged and of prompt entries and tokens removed.
+    """
+    enabled = os.getenv("GRAPHICS_DEDUPE", "true").lower() == "true"
+    lines = list(
+        dict.fromkeys(
+            line
+            for meta in metadatas
+            for line in (meta.get("images_passage") or "").splitlines()
+        )
+    )
+    representative = cluster_lines(lines, DEDUPE_DISTANCE if enabled else -1)
+
+    shown: set[str] = set()
+    deduped = []
+    for meta in metadatas:
+        kept = []
+        for line in (meta.get("images_passage") or "").splitlines():
+            best = representative[line]
+            if best in shown:
+                continue
+            shown.add(best)
+            kept.append(strip_phash(best))
+        passage = "\n".join(kept)
+        deduped.append({**meta, "images_passage": passage})
+
+    # Prompt entries are the distinct lines of every document
+    before = _prompt_entries(metadatas)
+    after = _prompt_entries(deduped)
+    group_sizes = Counter(representative.values())
+    stats = {
+        "groups_merged": sum(1 for size in group_sizes.values() if size > 1),
+        "entries_removed": len(before) - len(after),
+        "tokens_removed": sum(estimate_tokens(line) for _, line in before)
+        - sum(estimate_tokens(line) for _, line in after),
+    }
+    return deduped, stats
+
+
+def _prompt_entries(metadatas: list[dict]) -> set[tuple[str, str]]:
+    """Distinct images passage lines of every document, as shown to the LLM."""
+    return {
+        (meta.get("pdf_path", ""), strip_phash(line))
+        for meta in metadatas
+        for line in (meta.get("images_passage") or "").splitlines()
+    }
@@ -0,0 +1,85 @@
+"""Module with content hashing helpers shared by the ingestion pipeline."""
+
+import errno
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path) -> str:
+    """Compute the SHA-256 hash of a file, reading it in chunks.
+
+    Args:
+        path (str or Path): Path to the file.
+
+    Returns:
+        str: Hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def page_sha256(page, contents: Optional[bytes] = None) -> str:
+    """Compute the SHA-256 hash of the content of a PDF page.
+
+    The hash covers the page geometry, its content streams and the raw streams
+    of the images and forms it shows, which is all the extraction of a page
+    depends on. Fonts are left out: they are shared by all pages and their
+    subsets change whenever any page of the document does.
+
+    Args:
+        page (fitz.Page): The PDF page object.
+        contents (bytes, optional): Content streams of the page, if already read.
+
+    Returns:
+        str: Hex digest of the page content.
+    """
+    doc = page.parent
+    digest = hashlib.sha256()
+    digest.update(f"{tuple(page.rect)}:{page.rotation}".encode())
+    digest.update(page.read_contents() if contents is None else contents)
+    xrefs = [image[0] for image in page.get_images(full=True)]
+    xrefs += [xobject[0] for xobject in page.get_xobjects()]
+    for xref in sorted(set(xrefs)):
+        digest.update(doc.xref_stream_raw(xref) or b"")
+    return digest.hexdigest()
+
+
+def move_with_sha256(src, dst) -> str:
+    """Move a file and compute its SHA-256 hash, reading it only once.
+
+    On the same filesystem, the file is renamed without copying its content
+    and hashed in place. Across filesystems, it is hashed while being copied,
+    and removed once the copy is complete.
+
+    Args:
+        src (str or Path): Path to the file to move.
+        dst (str or Path): Destination path, replaced if it exists.
+
+    Returns:
+        str: Hex digest of the file content.
+    """
+    try:
+        os.replace(src, dst)
+        return file_sha256(dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    digest = hashlib.sha256()
+    try:
+        with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+            for chunk in iter(lambda: f_src.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                f_dst.write(chunk)
+    except BaseException:
+        Path(dst).unlink(missing_ok=True)
+        raise
+    os.remove(src)
+    return digest.hexdigest()
@@ -5,19 +5,34 @@ import hashlib
 import json
 import os
 import re
-from collections import defaultdict
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
 
 import fitz
 from langfuse.decorators import langfuse_context, observe
-from rtree import index
 
 from ..telemetry import Logger
+from .asset_store import AssetStore
+from .document_pool import get_document_pool
+from .drawing_clustering import cluster_boxes, cluster_drawings, page_drawings
+from .graphics_dedupe import perceptual_hash
+from .hashing import page_sha256
+from .page_layout import PageLayout
+from .records import FigureRecord, GraphicRecord, GraphicRef, ImageRecord
 
 LOGGER = Logger.get_logger()
 
+# Vector figures: area bounds as a fraction of the page, distance under which
+# drawings and text labels are grouped, and rendering zoom
+FIGURE_MIN_SIZE = 0.05
+FIGURE_MAX_SIZE = 0.30
+FIGURE_THRESHOLD = 5
+FIGURE_ZOOM = 4
 
-def find_image_caption(page, image_bbox, max_distance=100) -> Optional[str]:
+
+def find_image_caption(
+    page, image_bbox, max_distance=100, layout: Optional[PageLayout] = None
+) -> Optional[str]:
     """Method to find and extract image caption based on the image bounding box.
 
     Args:
@@ -25,12 +40,12 @@ def find_image_caption(page, image_bbox, max_distance=100) -> Optional[str]:
         image_bbox (fitz.Rect): The bounding box of the image.
         max_distance (int): The maximum vertical distance from the image bottom to consider
             a text block as a potential caption.
+        layout (PageLayout, optional): Pre-parsed layout of the page, built if not given.
 
     Returns:
         str: The extracted caption text if found, otherwise None.
     """
-    # Get all text blocks on the page
-    blocks = page.get_text("dict")["blocks"]
+    layout = layout or PageLayout(page)
     image_bottom = image_bbox.y1
     image_x_center = (image_bbox.x0 + image_bbox.x1) / 2
 
@@ -38,20 +53,20 @@ def find_image_caption(page, image_bbox, max_distance=100) -> Optional[str]:
     fallback_caption = None
     closest_distance = float("inf")
 
-    for block in blocks:
-        if block["type"] != 0:
-            continue
+    # Only blocks starting below the image and crossing its centre band can match
+    candidates = layout.query(
+        (
+            image_x_center - image_bbox.width / 2,
+            image_bottom,
+            image_x_center + image_bbox.width / 2,
+            image_bottom + max_distance,
+        )
+    )
 
-        block_bbox = block["bbox"]
-        x0, y0, x1, _ = block_bbox
+    for block_num in candidates:
+        x0, y0, x1, _ = layout.bboxes[block_num]
         vertical_distance = y0 - image_bottom
-
-        # Merge all spans' text into one string
-        block_text = " ".join(
-            span["text"]
-            for line in block.get("lines", [])
-            for span in line.get("spans", [])
-        ).strip()
+        block_text = layout.block_texts[block_num]
 
         if (
             y0 >= image_bottom
@@ -74,7 +89,134 @@ def find_image_caption(page, image_bbox, max_distance=100) -> Optional[str]:
     return None
 
 
-def extract_images(pdf, doc, page, page_num) -> list[dict]:
+# Name of an image extracted by another page range of its document, until the
+# page ranges are merged (see `resolve_shared_images`)
+SHARED_IMAGE_NAME = re.compile(r"doc[^\"/]*?_hashx([0-9a-f]{7})\.png")
+
+
+@dataclass
+class ImageCache:
+    """Per-document cache of the embedded images, so that an image repeated on
+    several pages (e.g. a logo) is extracted and hashed only once.
+
+    When a document is split into page ranges, an image placed in several of
+    them is only extracted by the first one. The others name it after its xref,
+    and the names are completed once the page ranges are merged.
+
+    Attributes:
+        hashes (dict[int, str]): MD5 hash of the image bytes, keyed by xref.
+        extracted (int): Number of images extracted from the document.
+        reused (int): Number of extractions saved by the cache.
+        store (AssetStore, optional): Store receiving the extracted image bytes.
+        phashes (dict[str, int]): Perceptual hash of the graphics, keyed by hash.
+        deferred (frozenset[int]): Xrefs extracted by an earlier page range.
+        shared (frozenset[int]): Xrefs whose hash later page ranges need.
+    """
+
+    hashes: dict[int, str] = field(default_factory=dict)
+    extracted: int = 0
+    reused: int = 0
+    store: Optional[AssetStore] = None
+    phashes: dict[str, int] = field(default_factory=dict)
+    deferred: frozenset[int] = frozenset()
+    shared: frozenset[int] = frozenset()
+
+    def image_hash(self, doc, xref: int) -> str:
+        """Get the MD5 hash of an embedded image, extracting it on first use.
+
+        Args:
+            doc (fitz.Document): The PDF document object.
+            xref (int): The xref of the image in the document.
+
+        Returns:
+            str: The MD5 hash of the image content.
+        """
+        if xref in self.hashes:
+            self.reused += 1
+            return self.hashes[xref]
+        if xref in self.deferred:
+            self.reused += 1
+            return f"x{xref:07x}"
+
+        base_image = doc.extract_image(xref)
+        image_bytes = base_image["image"]
+        image_hash = hashlib.md5(image_bytes, usedforsecurity=False).hexdigest()
+        self.hashes[xref] = image_hash
+        self.extracted += 1
+        if self.store is not None:
+            self.store.add(image_hash, image_bytes)
+        return image_hash
+
+    def perceptual_hash(self, page, graphic: GraphicRecord) -> int:
+        """Get the perceptual hash of a graphic, computed once per content.
+
+        Args:
+            page (fitz.Page or fitz.DisplayList): The PDF page showing the
+                graphic, or its display list.
+            graphic (GraphicRecord): Record of the image or figure.
+
+        Returns:
+            int: The 64-bit difference hash of the graphic.
+        """
+        if graphic.hash not in self.phashes:
+            self.phashes[graphic.hash] = perceptual_hash(page, graphic.bbox)
+        return self.phashes[graphic.hash]
+
+    def stats(self) -> dict:
+        """Counters of the cache, reported with the extraction results, and the
+        hashes of the images shared with later page ranges."""
+        stats: dict = {
+            "image_extractions": self.extracted,
+            "image_extractions_saved": self.reused,
+        }
+        if self.shared:
+            stats["image_hashes"] = {
+                xref: self.hashes[xref] for xref in self.shared if xref in self.hashes
+            }
+        return stats
+
+
+def resolve_shared_images(
+    passage: str, image_hashes: dict[int, str], store: Optional[AssetStore] = None
+) -> str:
+    """Complete the names of the images extracted by another page range.
+
+    Args:
+        passage (str): Merged images passage of a document.
+        image_hashes (dict[int, str]): MD5 hash of the shared images, keyed by xref.
+        store (AssetStore, optional): Store where the completed names are linked.
+
+    Returns:
+        str: The images passage with every image named after its content.
+    """
+    lines = []
+    for line in passage.splitlines():
+        match = SHARED_IMAGE_NAME.search(line)
+        if match is None:
+            lines.append(line)
+            continue
+        image_hash = image_hashes.get(int(match.group(1), 16))
+        if image_hash is None:
+            LOGGER.warning("⚠️ Image %s was not extracted, dropped", match.group(0))
+            continue
+        name = match.group(0).replace(
+            f"_hashx{match.group(1)}", f"_hash{image_hash[:8]}"
+        )
+        if store is not None:
+            store.link(name, image_hash)
+        lines.append(line.replace(match.group(0), name))
+    return "\n".join(lines)
+
+
+def extract_images(
+    pdf,
+    doc,
+    page,
+    page_num,
+    layout: Optional[PageLayout] = None,
+    cache: Optional[ImageCache] = None,
+    max_pixels: int = 0,
+) -> list[ImageRecord]:
     """Extract images from a PDF page and classify them based on their aspect ratio.
 
     Args:
@@ -82,32 +224,45 @@ def extract_images(pdf, doc, page, page_num) -> list[dict]:
         doc (fitz.Document): The PDF document object.
         page (fitz.Page): The PDF page object.
         page_num (int): The page number in the PDF document.
+        layout (PageLayout, optional): Pre-parsed layout of the page, built if not given.
+        cache (ImageCache, optional): Images already extracted from this document.
+        max_pixels (int): Images with more pixels are skipped without being
+            decompressed, 0 disables the cap.
 
     Returns:
-        list: A list of dictionaries containing image metadata, including:
-            - "name": The name of the image file.
-            - "caption": The caption of the image, if found.
-            - "ratio": The aspect ratio classification of the image ("horizontal", "vertical", or "square").
-            - "hash": The MD5 hash of the image content.
+        list[ImageRecord]: The records of the images, with their name, caption,
+            aspect ratio classification ("horizontal", "vertical", or "square"),
+            the MD5 hash of their content and their bbox on the page.
     """
     images = page.get_images(full=True)
+    if not images:
+        return []
+    if layout is None:
+        layout = PageLayout(page)
+    if cache is None:
+        cache = ImageCache()
+
+    # Oversized images, e.g. decompression bombs, are never decoded
+    oversized = {img[0] for img in images if 0 < max_pixels < img[2] * img[3]}
+
+    # Map every xref to the bbox of its first placement on the page
+    image_bboxes: dict[int, fitz.Rect] = {}
+    if oversized:
+        # Looking the xrefs up would decode every image of the page
+        for img in images:
+            if img[0] not in oversized:
+                image_bboxes.setdefault(img[0], fitz.Rect(page.get_image_bbox(img)))
+    else:
+        for img_info in page.get_image_info(xrefs=True):
+            image_bboxes.setdefault(img_info["xref"], fitz.Rect(img_info["bbox"]))
+
     imgs = []
     for img_index, img in enumerate(images):
-        # Extract the image
-        xref = img[0]
-        base_image = doc.extract_image(xref)
-        image_bytes = base_image["image"]
-        image_hash = hashlib.md5(image_bytes, usedforsecurity=False).hexdigest()
-        image_name = f"doc{pdf}_page{page_num}_img{img_index}_hash{image_hash[:8]}.png"
-
         # Find the bbox
-        image_bbox = None
-        for img_info in page.get_image_info(xrefs=True):
-            if img_info["xref"] == xref:
-                image_bbox = fitz.Rect(img_info["bbox"])
-                break
+        xref = img[0]
+        image_bbox = image_bboxes.get(xref)
 
-        if image_bbox:
+        if image_bbox and xref not in oversized:
             # Get the image ratio
             width = image_bbox.width
             height = image_bbox.height
@@ -125,17 +280,23 @@ def extract_images(pdf, doc, page, page_num) -> list[dict]:
             else:
                 image_type = "square"
 
+            # Extract the image, only once per document
+            image_hash = cache.image_hash(doc, xref)
+            image_name = (
+                f"doc{pdf}_page{page_num}_img{img_index}_hash{image_hash[:8]}.png"
+            )
+            # Names of deferred images are linked once completed
+            if cache.store is not None and xref not in cache.deferred:
+                cache.store.link(image_name, image_hash)
+
             # Get caption based on bbox
-            caption = find_image_caption(page, image_bbox) if image_bbox else None
+            caption = find_image_caption(page, image_bbox, layout=layout)
 
             # Append an image
             imgs.append(
-                {
-                    "name": image_name,
-                    "caption": caption,
-                    "ratio": image_type,
-                    "hash": image_hash,
-                }
+                ImageRecord(
+                    image_name, caption, image_type, image_hash, page_num, image_bbox
+                )
             )
 
     return imgs
@@ -193,157 +354,217 @@ def group_bounding_boxes(bboxes, threshold=50) -> list:
     Returns:
         list: A list of merged bounding boxes, where each box represents a group of close bounding boxes.
     """
-    # R-tree index setup
-    idx = index.Index()
-    for i, rect in enumerate(bboxes):
-        expanded = rect + (-threshold, -threshold, threshold, threshold)
-        idx.insert(i, expanded)
-
-    # Graph connectivity
-    adj_list = defaultdict(list)
-    for i, rect in enumerate(bboxes):
-        expanded = rect + (-threshold, -threshold, threshold, threshold)
-        for j in idx.intersection(expanded):
-            if i != j:
-                adj_list[i].append(j)
-
-    # Perform DFS to find connected components (groups of connected bounding boxes)
-    visited = [False] * len(bboxes)
-    components = []
-
-    def dfs(node, component):
-        visited[node] = True
-        component.append(bboxes[node])
-        for neighbor in adj_list[node]:
-            if not visited[neighbor]:
-                dfs(neighbor, component)
-
-    # Find all connected components using DFS
-    for i in range(len(bboxes)):
-        if not visited[i]:
-            component = []  # type: ignore
-            dfs(i, component)
-            components.append(component)
-
-    # Return grouped and merged bboxes
-    return [merge_bounding_boxes(group) for group in components]
-
-
-def process_large_drawing(drawings, max_drawings=1000, threshold=50) -> list:
-    """Process a large number of drawings by grouping them into bounding boxes.
+    return cluster_boxes(bboxes, threshold=threshold)
+
+
+def find_surrounding_text(
+    page, group, threshold=50, layout: Optional[PageLayout] = None
+) -> list:
+    """Find text blocks surrounding a given bounding box on a PDF page.
 
     Args:
-        drawings (list): A list of drawing dictionaries, each containing a "rect" key with bounding box coordinates.
-        max_drawings (int): Maximum number of drawings to process at once.
-        threshold (int): The distance threshold to consider two boxes as close.
+        page (fitz.Page): The PDF page object.
+        group (fitz.Rect): The bounding box of the group of drawings.
+        threshold (int): The distance threshold to consider a text block as surrounding.
+        layout (PageLayout, optional): Pre-parsed layout of the page, built if not given.
 
     Returns:
-        list: A list of merged bounding boxes, where each box represents a group of close drawings.
+        list: A list of bounding boxes of surrounding text blocks.
     """
-    bboxes = [fitz.Rect(d["rect"]) for d in drawings if d.get("rect")]
+    layout = layout or PageLayout(page)
+    expanded = group + (-threshold, -threshold, threshold, threshold)
+    surrounding = []
 
-    if len(bboxes) < max_drawings:
-        return group_bounding_boxes(bboxes, threshold=threshold)
+    for block_num in layout.query(expanded):
+        block_rect = layout.bboxes[block_num]
+        if expanded.intersects(block_rect):
+            surrounding.append(fitz.Rect(block_rect))
 
-    # Split the data into smaller chunks
-    num_chunks = (len(bboxes) // max_drawings) + 1
-    all_results = []
+    return surrounding
 
-    for chunk_index in range(num_chunks):
-        chunk = bboxes[chunk_index * max_drawings : (chunk_index + 1) * max_drawings]
-        results = group_bounding_boxes(chunk, threshold=threshold)
-        all_results.extend(results)
 
-    # Return the combined results
-    return group_bounding_boxes(all_results, threshold=threshold)
+def figure_identity(page_hash: str, figure_bbox, num_drawings: int) -> str:
+    """Compute a deterministic identity of a vector figure without rendering it.
 
+    The identity only depends on the page showing the figure, so it is kept
+    when a revision of the document reuses or moves the page.
+
+    Args:
+        page_hash (str): SHA-256 hash of the page content (see `page_sha256`).
+        figure_bbox (fitz.Rect): The clip rectangle of the figure.
+        num_drawings (int): Number of drawings on the page.
+
+    Returns:
+        str: MD5 hex digest identifying the figure.
+    """
+    clip = ",".join(f"{coord:.2f}" for coord in figure_bbox)
+    key = f"{page_hash}|{clip}|{num_drawings}"
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
 
-def find_surrounding_text(page, group, threshold=50) -> list:
-    """Find text blocks surrounding a given bounding box on a PDF page.
+
+def clip_has_raster(page, figure_bbox) -> bool:
+    """Check if a clip of a PDF page shows any raster image.
 
     Args:
         page (fitz.Page): The PDF page object.
-        group (fitz.Rect): The bounding box of the group of drawings.
-        threshold (int): The distance threshold to consider a text block as surrounding.
+        figure_bbox (fitz.Rect): The clip rectangle of the figure.
 
     Returns:
-        list: A list of bounding boxes of surrounding text blocks.
+        bool: True if an image placed on the page intersects the clip.
     """
-    text_blocks = page.get_text("dict")["blocks"]
-    expanded = group + (-threshold, -threshold, threshold, threshold)
-    surrounding = []
+    clip = fitz.Rect(figure_bbox)
+    return any(clip.intersects(info["bbox"]) for info in page.get_image_info())
 
-    for block in text_blocks:
-        if block["type"] != 0:
-            continue
 
-        block_rect = fitz.Rect(block["bbox"])
-        if expanded.intersects(block_rect):
-            surrounding.append(block_rect)
+def figure_format(page, figure_bbox, preferred: str) -> str:
+    """Choose the file format of a vector figure.
 
-    return surrounding
+    Figures are exported as PDF clips when preferred, unless the clip contains
+    raster content, which is kept as a PNG rendering.
+
+    Args:
+        page (fitz.Page): The PDF page object.
+        figure_bbox (fitz.Rect): The clip rectangle of the figure.
+        preferred (str): The preferred format, "pdf" or "png".
+
+    Returns:
+        str: The format, also used as file extension.
+    """
+    if preferred == "pdf" and not clip_has_raster(page, figure_bbox):
+        return "pdf"
+    return "png"
+
+
+def render_figure(page, figure_bbox, zoom: float, fmt: str = "png") -> bytes:
+    """Render a clip of a PDF page to PNG, or export it as a single-page PDF.
+
+    The PDF export displays the source page on a new page cropped to the clip,
+    keeping the figure as vectors. It is written without a random file ID, so that
+    the same figure always gives the same bytes.
+
+    Args:
+        page (fitz.Page): The PDF page object.
+        figure_bbox (fitz.Rect): The clip rectangle of the figure.
+        zoom (float): The scaling factor of the PNG rendering.
+        fmt (str): The output format, "png" or "pdf".
+
+    Returns:
+        bytes: The PNG image or the PDF file.
+    """
+    if fmt == "pdf":
+        clip = fitz.Rect(figure_bbox) & page.rect
+        figure_doc = fitz.open()
+        try:
+            figure_page = figure_doc.new_page(width=clip.width, height=clip.height)
+            figure_page.show_pdf_page(
+                figure_page.rect, page.parent, page.number, clip=clip
+            )
+            return figure_doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+        finally:
+            figure_doc.close()
+
+    scale_mat = fitz.Matrix(zoom, zoom)
+    figure_pix = page.get_pixmap(matrix=scale_mat, clip=figure_bbox)
+    return figure_pix.tobytes("png")
 
 
-def extract_vector(pdf, page, page_num) -> list[dict]:
+def materialise_figure(assets: AssetStore, name: str) -> bool:
+    """Make sure a figure is rendered in the asset store, e.g. once it is selected
+    for a presentation or previewed.
+
+    Args:
+        assets (AssetStore): The session's store of extracted graphics.
+        name (str): File name of the figure, as used in the prompt.
+
+    Returns:
+        bool: True if the figure is available in the store.
+    """
+    if assets.has_name(name):
+        return True
+    recipe = assets.recipe(name)
+    if recipe is None:
+        return False
+
+    with get_document_pool().open(recipe["pdf_path"]) as doc:
+        figure_bytes = render_figure(
+            doc[recipe["page"]],
+            fitz.Rect(recipe["clip"]),
+            recipe["zoom"],
+            recipe.get("format", "png"),
+        )
+    figure_hash = hashlib.md5(figure_bytes, usedforsecurity=False).hexdigest()
+    assets.put(name, figure_hash, figure_bytes)
+    return True
+
+
+def extract_vector(
+    pdf,
+    page,
+    page_num,
+    layout: Optional[PageLayout] = None,
+    store: Optional[AssetStore] = None,
+    page_hash: Optional[str] = None,
+    drawings: Optional[list] = None,
+    pdf_path: Optional[str] = None,
+    preferred_format: str = "png",
+) -> list[FigureRecord]:
     """Extract vector graphics from a PDF page and classify them based on their aspect ratio.
 
+    With `page_hash` given, figures are extracted lazily: their identity comes from
+    the page hash and the figure geometry, and only a rendering recipe is kept in
+    the asset store until the figure is actually used.
+
     Args:
         pdf (str): The PDF filename without extension.
         page (fitz.Page): The PDF page object.
         page_num (int): The page number in the PDF document.
+        layout (PageLayout, optional): Pre-parsed layout of the page, built if not given.
+        store (AssetStore, optional): Store receiving the figures or their recipes.
+        page_hash (str, optional): SHA-256 hash of the page content, enables lazy
+            rendering.
+        drawings (list, optional): Drawings of the page, as returned by `page_drawings`.
+        pdf_path (str, optional): Path to the PDF file, kept in the rendering recipes.
+            Defaults to the name of the document the page belongs to.
+        preferred_format (str): "pdf" to export figures as PDF clips when they hold
+            no raster content, "png" to render them all at 4x zoom.
 
     Returns:
-        list: A list of dictionaries containing figure metadata, including:
-            - "name": The name of the figure file.
-            - "caption": The caption of the figure, if found.
-            - "ratio": The aspect ratio classification of the figure ("horizontal", "vertical", or "square").
-            - "hash": The MD5 hash of the figure content.
+        list[FigureRecord]: The records of the figures, with their name, caption,
+            aspect ratio classification ("horizontal", "vertical", or "square"),
+            the MD5 hash of their content (of their identity in lazy mode) and
+            their bbox on the page.
     """
-    # pylint: disable=invalid-name
-    MAX_DRAWINGS = 800
-    MIN_SIZE = 0.05
-    MAX_SIZE = 0.30
-    THRESHOLD = 5
-    ZOOM = 4
-    # pylint: enable=invalid-name
-
     page_size = page.rect.width * page.rect.height
-    min_size = page_size * MIN_SIZE
-    max_size = page_size * MAX_SIZE
+    min_size = page_size * FIGURE_MIN_SIZE
+    max_size = page_size * FIGURE_MAX_SIZE
 
-    drawings = page.get_drawings()
+    if drawings is None:
+        drawings = page_drawings(page)
 
     # Group drawings into figures
-    grouped = process_large_drawing(
-        drawings, max_drawings=MAX_DRAWINGS, threshold=THRESHOLD
-    )
+    grouped = cluster_drawings(drawings, threshold=FIGURE_THRESHOLD, page=page)
+    if layout is None and grouped:
+        layout = PageLayout(page)
 
     figs = []
     for group_num, group in enumerate(grouped):
         # Try to include any text labels around
-        surrounding = find_surrounding_text(page, group, threshold=THRESHOLD)
+        surrounding = find_surrounding_text(
+            page, group, threshold=FIGURE_THRESHOLD, layout=layout
+        )
         if surrounding:
             figure_bbox = merge_bounding_boxes([group] + surrounding)
         else:
             figure_bbox = group
 
         # Filter by minimal plot size
-        if figure_bbox is not None:
-            width = figure_bbox[2] - figure_bbox[0]
-            height = figure_bbox[3] - figure_bbox[1]
-        else:
-            width = height = 0
+        if figure_bbox is None:
+            continue
+        width = figure_bbox[2] - figure_bbox[0]
+        height = figure_bbox[3] - figure_bbox[1]
 
         area = width * height
         if min_size < area < max_size:
-            scale_mat = fitz.Matrix(ZOOM, ZOOM)
-            figure_pix = page.get_pixmap(matrix=scale_mat, clip=figure_bbox)
-            figure_bytes = figure_pix.tobytes("png")
-            figure_hash = hashlib.md5(figure_bytes, usedforsecurity=False).hexdigest()
-            figure_name = (
-                f"doc{pdf}_page{page_num}_fig{group_num}_hash{figure_hash[:8]}.png"
-            )
-
             # Get the figure ratio
             ratio = width / height if height != 0 else 20
 
@@ -359,163 +580,220 @@ def extract_vector(pdf, page, page_num) -> list[dict]:
             else:
                 figure_type = "square"
 
+            fmt = figure_format(page, figure_bbox, preferred_format)
+            if page_hash is not None:
+                # Identify the figure by its geometry, render it only once selected
+                figure_hash = figure_identity(page_hash, figure_bbox, len(drawings))
+                figure_name = f"doc{pdf}_page{page_num}_fig{group_num}_hash{figure_hash[:8]}.{fmt}"
+                if store is not None:
+                    store.put_recipe(
+                        figure_name,
+                        {
+                            "pdf_path": pdf_path or page.parent.name,
+                            "page": page_num,
+                            "clip": list(figure_bbox),
+                            "zoom": FIGURE_ZOOM,
+                            "format": fmt,
+                        },
+                    )
+            else:
+                figure_bytes = render_figure(page, figure_bbox, FIGURE_ZOOM, fmt)
+                figure_hash = hashlib.md5(
+                    figure_bytes, usedforsecurity=False
+                ).hexdigest()
+                figure_name = f"doc{pdf}_page{page_num}_fig{group_num}_hash{figure_hash[:8]}.{fmt}"
+
+                # Keep the rendered figure for the presentation
+                if store is not None:
+                    store.put(figure_name, figure_hash, figure_bytes)
+
             # Get caption based on bbox
-            caption = find_image_caption(page, figure_bbox) if figure_bbox else None
+            caption = (
+                find_image_caption(page, figure_bbox, layout=layout)
+                if figure_bbox
+                else None
+            )
 
             # Append an image
             figs.append(
-                {
-                    "name": figure_name,
-                    "caption": caption,
-                    "ratio": figure_type,
-                    "hash": figure_hash,
-                }
+                FigureRecord(
+                    figure_name,
+                    caption,
+                    figure_type,
+                    figure_hash,
+                    page_num,
+                    figure_bbox,
+                )
             )
 
     return figs
 
 
-def save_pdf_images(pdf_path: str, req_imgs: list, images_dir: str) -> bool:
+def save_pdf_images(pdf_path: str, req_imgs: list[GraphicRef], images_dir: str) -> bool:
     """Save images used in the presentation to the specified directory.
 
     Args:
         pdf_path (str): Path to the PDF file.
-        req_imgs (list): List of dictionaries containing required images metadata.
+        req_imgs (list[GraphicRef]): References of the required images.
         images_dir (str): Directory where the images will be saved.
 
     Returns:
         bool: True if images were saved successfully, False otherwise.
     """
-    doc = fitz.open(pdf_path)
-    pdf = os.path.splitext(os.path.basename(pdf_path))[0]
-
-    # Create a set of page to process
-    pages_to_inspect = set()
-    for img in req_imgs:
-        if pdf == img["doc"]:
-            pages_to_inspect.add(img["page"])
-
-    for page_num, page in enumerate(doc):
-        if page_num in pages_to_inspect:
-
-            # Extract images
-            images_info = page.get_images(full=True)
-            for img_index, img in enumerate(images_info):
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_hash = hashlib.md5(image_bytes, usedforsecurity=False).hexdigest()
-
-                image_found = any(
-                    pdf == img["doc"]
-                    and page_num == img["page"]
-                    and img_index == img["img"]
-                    and image_hash.startswith(img["hash"])
-                    for img in req_imgs
-                )
+    with get_document_pool().open(pdf_path) as doc:
+        pdf = os.path.splitext(os.path.basename(pdf_path))[0]
+
+        # Create a set of page to process
+        pages_to_inspect = set()
+        for img in req_imgs:
+            if pdf == img.doc:
+                pages_to_inspect.add(img.page)
+
+        for page_num, page in enumerate(doc):
+            if page_num in pages_to_inspect:
+
+                # Extract images
+                images_info = page.get_images(full=True)
+                for img_index, img in enumerate(images_info):
+                    # Only decompress the requested images
+                    if not any(
+                        req.matches(pdf, page_num, img_index) for req in req_imgs
+                    ):
+                        continue
+                    xref = img[0]
+                    base_image = doc.extract_image(xref)
+                    image_bytes = base_image["image"]
+                    image_hash = hashlib.md5(
+                        image_bytes, usedforsecurity=False
+                    ).hexdigest()
 
-                # Save the image
-                if image_found:
-                    image_name = f"doc{pdf}_page{page_num}_img{img_index}_hash{image_hash[:8]}.png"
-                    image_path = os.path.join(images_dir, image_name)
-                    with open(image_path, "wb") as f:
-                        f.write(image_bytes)
+                    image_found = any(
+                        req.matches(pdf, page_num, img_index)
+                        and image_hash.startswith(req.hash)
+                        for req in req_imgs
+                    )
+
+                    # Save the image
+                    if image_found:
+                        image_name = f"doc{pdf}_page{page_num}_img{img_index}_hash{image_hash[:8]}.png"
+                        image_path = os.path.join(images_dir, image_name)
+                        with open(image_path, "wb") as f:
+                            f.write(image_bytes)
 
     return True
 
 
-def save_pdf_figures(pdf_path: str, req_figs: list, figures_dir: str) -> bool:
+def save_pdf_figures(
+    pdf_path: str, req_figs: list[GraphicRef], figures_dir: str
+) -> bool:
     """Save figures used in the presentation to the specified directory.
 
     Args:
         pdf_path (str): Path to the PDF file.
-        req_figs (list): List of dictionaries containing required figures metadata.
+        req_figs (list[GraphicRef]): References of the required figures.
         figures_dir (str): Directory where the figures will be saved.
 
     Returns:
         bool: True if figures were saved successfully, False otherwise.
     """
-    doc = fitz.open(pdf_path)
-    pdf = os.path.splitext(os.path.basename(pdf_path))[0]
-
-    # Create a set of page to process
-    pages_to_inspect = set()
-    for fig in req_figs:
-        if pdf == fig["doc"]:
-            pages_to_inspect.add(fig["page"])
-
-    for page_num, page in enumerate(doc):
-        if page_num in pages_to_inspect:
-            # pylint: disable=invalid-name
-            MAX_DRAWINGS = 1000
-            MIN_SIZE = 0.05
-            MAX_SIZE = 0.30
-            THRESHOLD = 5
-            ZOOM = 4
-            # pylint: enable=invalid-name
-
-            page_size = page.rect.width * page.rect.height
-            min_size = page_size * MIN_SIZE
-            max_size = page_size * MAX_SIZE
-
-            drawings = page.get_drawings()
-
-            # Group drawings into figures
-            grouped = process_large_drawing(
-                drawings, max_drawings=MAX_DRAWINGS, threshold=THRESHOLD
-            )
-
-            for group_num, group in enumerate(grouped):
-                # Try to include any text labels around
-                surrounding = find_surrounding_text(page, group, threshold=THRESHOLD)
-                if surrounding:
-                    figure_bbox = merge_bounding_boxes([group] + surrounding)
-                else:
-                    figure_bbox = group
-
-                # Filter by minimal plot size
-                if figure_bbox is not None:
-                    width = figure_bbox[2] - figure_bbox[0]
-                    height = figure_bbox[3] - figure_bbox[1]
-                else:
-                    width = height = 0
-
-                area = width * height
-                if min_size < area < max_size:
-                    scale_mat = fitz.Matrix(ZOOM, ZOOM)
-                    figure_pix = page.get_pixmap(matrix=scale_mat, clip=figure_bbox)
-                    figure_bytes = figure_pix.tobytes("png")
-                    figure_hash = hashlib.md5(
-                        figure_bytes, usedforsecurity=False
-                    ).hexdigest()
+    with get_document_pool().open(pdf_path) as doc:
+        pdf = os.path.splitext(os.path.basename(pdf_path))[0]
+
+        # Create a set of page to process
+        pages_to_inspect = set()
+        for fig in req_figs:
+            if pdf == fig.doc:
+                pages_to_inspect.add(fig.page)
+
+        for page_num, page in enumerate(doc):
+            if page_num in pages_to_inspect:
+                page_size = page.rect.width * page.rect.height
+                min_size = page_size * FIGURE_MIN_SIZE
+                max_size = page_size * FIGURE_MAX_SIZE
+
+                drawings = page_drawings(page)
+
+                # Group drawings into figures
+                grouped = cluster_drawings(
+                    drawings, threshold=FIGURE_THRESHOLD, page=page
+                )
+                layout = PageLayout(page)
+                page_hash = page_sha256(page)
 
-                    figure_found = any(
-                        pdf == fig["doc"]
-                        and page_num == fig["page"]
-                        and group_num == fig["fig"]
-                        and figure_hash.startswith(fig["hash"])
-                        for fig in req_figs
+                for group_num, group in enumerate(grouped):
+                    # Try to include any text labels around
+                    surrounding = find_surrounding_text(
+                        page, group, threshold=FIGURE_THRESHOLD, layout=layout
                     )
-
-                    # Save the figure
-                    if figure_found:
-                        figure_name = f"doc{pdf}_page{page_num}_fig{group_num}_hash{figure_hash[:8]}.png"
-                        figure_path = os.path.join(figures_dir, figure_name)
-                        with open(figure_path, "wb") as f:
-                            f.write(figure_bytes)
+                    if surrounding:
+                        figure_bbox = merge_bounding_boxes([group] + surrounding)
+                    else:
+                        figure_bbox = group
+
+                    # Filter by minimal plot size
+                    if figure_bbox is not None:
+                        width = figure_bbox[2] - figure_bbox[0]
+                        height = figure_bbox[3] - figure_bbox[1]
+                    else:
+                        width = height = 0
+
+                    area = width * height
+                    if min_size < area < max_size:
+                        requested = [
+                            fig
+                            for fig in req_figs
+                            if fig.matches(pdf, page_num, group_num)
+                        ]
+                        if not requested:
+                            continue
+
+                        # Lazily extracted figures are identified by their geometry,
+                        # eagerly extracted ones by the hash of their rendering
+                        fmt = requested[0].ext
+                        figure_bytes = render_figure(
+                            page, figure_bbox, FIGURE_ZOOM, fmt
+                        )
+                        figure_hash = figure_identity(
+                            page_hash, figure_bbox, len(drawings)
+                        )
+                        if not any(
+                            figure_hash.startswith(fig.hash) for fig in requested
+                        ):
+                            figure_hash = hashlib.md5(
+                                figure_bytes, usedforsecurity=False
+                            ).hexdigest()
+
+                        figure_found = any(
+                            figure_hash.startswith(fig.hash) for fig in requested
+                        )
+
+                        # Save the figure
+                        if figure_found:
+                            figure_name = f"doc{pdf}_page{page_num}_fig{group_num}_hash{figure_hash[:8]}.{fmt}"
+                            figure_path = os.path.join(figures_dir, figure_name)
+                            with open(figure_path, "wb") as f:
+                                f.write(figure_bytes)
 
     return True
 
 
 @observe(name="🔍 find_used_gfx")
-def find_used_gfx(answer, work_dir: str, metadatas: list) -> None:
+def find_used_gfx(
+    answer, work_dir: str, metadatas: list, assets: Sequence[AssetStore] = ()
+) -> None:
     """Finds and saves the figures used in the LLM output to the gfx directory
     where the presentation will be compiled.
 
+    Graphics kept in the asset stores are linked directly, the PDFs are only
+    parsed again for graphics missing from the stores.
+
     Args:
         answer (str): The LLM answer containing names of the figures.
         work_dir (str): The working directory where the presentation will be compiled.
-        metadatas (list): List of metadata dictionaries containing PDF paths.
+        metadatas (list): List of metadata dictionaries of the retrieved chunks,
+            containing PDF paths.
+        assets (Sequence[AssetStore]): The stores of extracted graphics, the
+            session's one and the corpus one.
     """
     graphics_dir = os.path.join(work_dir, "gfx")
     os.makedirs(graphics_dir, exist_ok=True)
@@ -527,35 +805,46 @@ def find_used_gfx(answer, work_dir: str, metadatas: list) -> None:
     )
     matches_img = pattern_img.finditer(answer.text)
 
-    req_imgs = []
+    req_imgs: list[GraphicRef] = []
     for match in matches_img:
-        req_img = {
-            "doc": match.group("doc"),
-            "page": int(match.group("page")),
-            "img": int(match.group("img")),
-            "hash": match.group("hash"),
-        }
-        req_imgs.append(req_img)
+        if any(store.export(match.group(0), graphics_dir) for store in assets):
+            continue
+        req_imgs.append(GraphicRef.from_match(match, "img"))
 
     # Find figures, which are used in the presentation
     pattern_fig = re.compile(
-        r"doc(?P<doc>[a-zA-Z0-9_]+)_page(?P<page>\d+)_fig(?P<fig>\d+)_hash(?P<hash>[a-fA-F0-9]{8})\.png"
+        r"doc(?P<doc>[a-zA-Z0-9_]+)_page(?P<page>\d+)_fig(?P<fig>\d+)_hash(?P<hash>[a-fA-F0-9]{8})\.(?P<ext>png|pdf)"
     )
     matches_fig = pattern_fig.finditer(answer.text)
-    req_figs = []
+    req_figs: list[GraphicRef] = []
     for match in matches_fig:
-        req_fig = {
-            "doc": match.group("doc"),
-            "page": int(match.group("page")),
-            "fig": int(match.group("fig")),
-            "hash": match.group("hash"),
-        }
-        req_figs.append(req_fig)
+        if any(
+            materialise_figure(store, match.group(0))
+            and store.export(match.group(0), graphics_dir)
+            for store in assets
+        ):
+            continue
+        req_figs.append(GraphicRef.from_match(match, "fig"))
     # span.set_attribute("output.req_figs", json.dumps(req_figs))
     langfuse_context.update_current_observation(
-        output={"output.req_figs": json.dumps(req_figs)}
+        output={
+            "output.req_figs": json.dumps([fig.as_dict() for fig in req_figs]),
+            "output.from_assets": len(os.listdir(graphics_dir)),
+        }
     )
-    # Save the required graphics
-    for metadata in metadatas:
-        save_pdf_images(metadata["pdf_path"], req_imgs, graphics_dir)
-        save_pdf_figures(metadata["pdf_path"], req_figs, graphics_dir)
+    # Save the required graphics, which were not found in the asset store.
+    # Several chunks of a PDF may have been retrieved, parse it only once.
+    pdf_paths = dict.fromkeys(metadata["pdf_path"] for metadata in metadatas)
+    for pdf_path in pdf_paths:
+        if any(img.doc == _pdf_stem(pdf_path) for img in req_imgs):
+            save_pdf_images(pdf_path, req_imgs, graphics_dir)
+        if any(fig.doc == _pdf_stem(pdf_path) for fig in req_figs):
+            save_pdf_figures(pdf_path, req_figs, graphics_dir)
+    langfuse_context.update_current_observation(
+        output={"output.documents": get_document_pool().stats()}
+    )
+
+
+def _pdf_stem(pdf_path: str) -> str:
+    """PDF filename without extension, as used in the graphics names."""
+    return os.path.splitext(os.path.basename(pdf_path))[0]
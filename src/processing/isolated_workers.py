@@ -0,0 +1,236 @@
+"""Module running extraction tasks in isolated, killable worker processes."""
+
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Callable, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+# Workers are forked from a single-threaded server process, not from the
+# multi-threaded application whose locks could be held at fork time. The
+# extraction modules are imported once by the server, not by every worker.
+_CONTEXT = multiprocessing.get_context("forkserver")
+_CONTEXT.set_forkserver_preload([f"{__package__}.document_processing"])
+
+
+class ExtractionLimitError(RuntimeError):
+    """Raised when a PDF file exceeds a limit of the extraction."""
+
+
+class WorkerKilledError(RuntimeError):
+    """Raised when a worker process was killed or died before returning its result."""
+
+
+def _address_space() -> int:
+    """Virtual memory size of the current process in bytes, 0 if unknown."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _limit_memory(memory_mb: int) -> None:
+    """Cap the address space of the process to `memory_mb` MB over its current size."""
+    if memory_mb <= 0 or resource is None:
+        return
+    limit = _address_space() + memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _run_task(conn, fn: Callable, args: tuple, kwargs: dict, memory_mb: int) -> None:
+    """Entry point of a worker process: run one task and send back its outcome."""
+    _limit_memory(memory_mb)
+    try:
+        outcome = (True, fn(*args, **kwargs))
+    except BaseException as e:  # pylint: disable=broad-exception-caught
+        outcome = (False, e)
+    try:
+        conn.send(outcome)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # The result or the exception cannot be pickled, e.g. a MuPDF error
+        success, value = outcome
+        error = value if not success else e
+        conn.send((False, RuntimeError(f"{type(error).__name__}: {error}")))
+    finally:
+        conn.close()
+
+
+class IsolatedExecutor:
+    """Executor running every task in its own worker process.
+
+    Unlike a process pool, a task which runs past its wall-clock timeout is
+    killed on its own and its future fails, while the other tasks go on. The
+    address space every worker may add to its start-up size is capped, so a
+    task exhausting it fails (or its process dies) without putting the server
+    under memory pressure. The tasks and their arguments must be picklable.
+
+    Attributes:
+        max_workers (int): Maximal number of tasks running at once.
+        timeout (float): Wall-clock seconds allowed per task, 0 disables the timeout.
+        memory_mb (int): Address space a worker may allocate in MB, 0 disables it.
+        killed (int): Number of tasks killed or whose process died.
+    """
+
+    def __init__(
+        self, max_workers: int, timeout: float = 0, memory_mb: int = 0
+    ) -> None:
+        """Start the executor and its supervisor thread.
+
+        Args:
+            max_workers (int): Maximal number of tasks running at once.
+            timeout (float): Wall-clock seconds allowed per task, 0 disables it.
+            memory_mb (int): Address space a worker may allocate in MB, 0
+                disables it.
+        """
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.killed = 0
+        self._queue: deque = deque()
+        self._running: dict = {}
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._cancel = False
+        self._wake_reader, self._wake_writer = _CONTEXT.Pipe(duplex=False)
+        self._thread = threading.Thread(
+            target=self._supervise, name="extraction-supervisor", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule a task in a new worker process.
+
+        Args:
+            fn (Callable): Function to run, with its positional and keyword arguments.
+
+        Returns:
+            Future: The future of the task result.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new tasks after shutdown")
+            self._queue.append((future, fn, args, kwargs))
+        self._wake()
+        return future
+
+    def shutdown(self, wait_tasks: bool = True, cancel: bool = False) -> None:
+        """Stop accepting tasks and release the workers.
+
+        Args:
+            wait_tasks (bool): Wait for the supervisor to finish.
+            cancel (bool): Cancel the queued tasks and kill the running ones.
+        """
+        with self._lock:
+            self._shutdown = True
+            self._cancel = self._cancel or cancel
+        self._wake()
+        if wait_tasks:
+            self._thread.join()
+
+    def __enter__(self) -> "IsolatedExecutor":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Kill the workers when the consumer gave up, e.g. a closed generator
+        self.shutdown(wait_tasks=True, cancel=exc_type is not None)
+
+    def _wake(self) -> None:
+        """Wake the supervisor up, waiting for the workers."""
+        try:
+            self._wake_writer.send_bytes(b"")
+        except OSError:
+            pass
+
+    def _start(self, future: Future, fn: Callable, args: tuple, kwargs: dict) -> None:
+        """Start a worker process for a task."""
+        if not future.set_running_or_notify_cancel():
+            return
+        reader, writer = _CONTEXT.Pipe(duplex=False)
+        process = _CONTEXT.Process(
+            target=_run_task,
+            args=(writer, fn, args, kwargs, self.memory_mb),
+            daemon=True,
+        )
+        try:
+            process.start()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            reader.close()
+            future.set_exception(e)
+            return
+        finally:
+            writer.close()
+        deadline = time.monotonic() + self.timeout if self.timeout > 0 else None
+        self._running[reader] = (process, future, deadline)
+
+    def _finish(self, reader) -> None:
+        """Collect the outcome of a worker whose pipe is readable."""
+        process, future, _ = self._running.pop(reader)
+        try:
+            success, value = reader.recv()
+        except (EOFError, OSError):
+            process.join()
+            self.killed += 1
+            success, value = False, WorkerKilledError(
+                f"Extraction worker died with exit code {process.exitcode}"
+            )
+        reader.close()
+        process.join()
+        if success:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _kill(self, reader, reason: str) -> None:
+        """Kill a running worker and fail its task."""
+        process, future, _ = self._running.pop(reader)
+        process.kill()
+        process.join()
+        reader.close()
+        self.killed += 1
+        future.set_exception(WorkerKilledError(reason))
+
+    def _supervise(self) -> None:
+        """Start the queued tasks, collect their results and enforce the timeouts."""
+        while True:
+            with self._lock:
+                if self._cancel:
+                    while self._queue:
+                        self._queue.popleft()[0].cancel()
+                    for reader in list(self._running):
+                        self._kill(reader, "Extraction cancelled")
+                if self._shutdown and not self._queue and not self._running:
+                    break
+                while self._queue and len(self._running) < self.max_workers:
+                    self._start(*self._queue.popleft())
+
+            # Sleep until a worker is done, a task is submitted or a deadline passes
+            deadlines = [d for _, _, d in self._running.values() if d is not None]
+            timeout: Optional[float] = None
+            if deadlines:
+                timeout = max(0.0, min(deadlines) - time.monotonic())
+            for ready in wait([self._wake_reader, *self._running], timeout):
+                if ready is self._wake_reader:
+                    while self._wake_reader.poll():
+                        self._wake_reader.recv_bytes()
+                else:
+                    self._finish(ready)
+
+            now = time.monotonic()
+            for reader, (_, _, deadline) in list(self._running.items()):
+                if deadline is not None and now >= deadline:
+                    self._kill(reader, f"Extraction timed out after {self.timeout:g} s")
+
+        self._wake_reader.close()
+        self._wake_writer.close()
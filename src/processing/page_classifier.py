@@ -0,0 +1,113 @@
+"""Module deciding which PDF pages may hold a vector figure worth extracting."""
+
+import re
+from typing import Optional
+
+import numpy as np
+
+from .drawing_clustering import page_drawings
+from .images_processing import FIGURE_MIN_SIZE, FIGURE_THRESHOLD
+from .page_layout import PageLayout
+
+# Path painting operators of a content stream (fill, stroke or both, and shadings).
+# They take no operands, so they always follow a whitespace.
+PAINT_OPERATOR = re.compile(rb"\s(?:[fbB]\*?|[FSs]|sh)(?=[\s()<>\[\]{}/%]|\Z)")
+
+
+def paints_paths(page, contents: Optional[bytes] = None) -> bool:
+    """Tell whether a page may paint a path, without extracting its drawings.
+
+    The content streams of the page and of the form XObjects it shows, nested
+    ones included, are scanned for an operator painting a path. Every drawing
+    of the page is painted by one of them, so a page without any holds no
+    drawing. Operator-like tokens in text strings or inline images count too,
+    the answer may be a false positive but never a false negative.
+
+    Args:
+        page (fitz.Page): The PDF page object.
+        contents (bytes, optional): Content streams of the page, if already read.
+
+    Returns:
+        bool: Whether a painting operator was found.
+    """
+    if contents is None:
+        contents = page.read_contents()
+    if PAINT_OPERATOR.search(contents):
+        return True
+    doc = page.parent
+    return any(
+        PAINT_OPERATOR.search(doc.xref_stream(xref) or b"")
+        for xref, *_ in page.get_xobjects()
+    )
+
+
+def classify_page(
+    page, layout: PageLayout, contents: Optional[bytes] = None
+) -> tuple[dict, Optional[list]]:
+    """Decide whether a page may hold a vector figure passing the minimal size.
+
+    Pages whose content streams paint no path are skipped without extracting
+    their drawings. On the others, every figure candidate is a group of drawings merged with the text blocks
+    around it, so it lies within the box spanning all the drawings of the page
+    and the text blocks touching that box. When this upper bound is not larger
+    than the minimal figure area, the clustering and the text lookups of
+    `extract_vector` are skipped for the page. The bound is conservative, the
+    figures extracted from the pages which are not skipped are unchanged.
+
+    Args:
+        page (fitz.Page): The PDF page object.
+        layout (PageLayout): Pre-parsed layout of the page.
+        contents (bytes, optional): Content streams of the page, if already read.
+
+    Returns:
+        tuple: A 2-element tuple:
+            - dict: The decision, with the page number, the number of drawings,
+              the upper bound of the figure area as a fraction of the page, whether
+              vector figures are extracted and why.
+            - list: The drawings of the page, to be reused by `extract_vector`, or
+              None if they were not extracted.
+    """
+    decision = {
+        "page": page.number,
+        "drawings": 0,
+        "bound": 0.0,
+        "vector": False,
+        "reason": "no-drawings",
+    }
+    if not paints_paths(page, contents):
+        return decision, None
+
+    drawings = page_drawings(page)
+    decision["drawings"] = len(drawings)
+    if not drawings:
+        return decision, drawings
+
+    # Box spanning all the drawings, empty ones included
+    rects = np.array([tuple(drawing["rect"]) for drawing in drawings])
+    bound = np.concatenate([rects[:, :2].min(axis=0), rects[:, 2:].max(axis=0)])
+
+    # Extend it with the text blocks which may be merged into a figure
+    if layout.bboxes:
+        blocks = np.array([tuple(bbox) for bbox in layout.bboxes])
+        reach = bound + np.array(
+            [-FIGURE_THRESHOLD, -FIGURE_THRESHOLD, FIGURE_THRESHOLD, FIGURE_THRESHOLD]
+        )
+        touching = blocks[
+            (blocks[:, 0] < reach[2])
+            & (blocks[:, 2] > reach[0])
+            & (blocks[:, 1] < reach[3])
+            & (blocks[:, 3] > reach[1])
+        ]
+        if len(touching):
+            bound[:2] = np.minimum(bound[:2], touching[:, :2].min(axis=0))
+            bound[2:] = np.maximum(bound[2:], touching[:, 2:].max(axis=0))
+
+    page_size = page.rect.width * page.rect.height
+    area = float((bound[2] - bound[0]) * (bound[3] - bound[1]))
+    decision["bound"] = round(area / page_size, 4) if page_size else 0.0
+    if area > page_size * FIGURE_MIN_SIZE:
+        decision["vector"] = True
+        decision["reason"] = "candidate"
+    else:
+        decision["reason"] = "too-small"
+    return decision, drawings
@@ -0,0 +1,67 @@
+"""Module holding the text layout of a PDF page, shared by all per-page lookups."""
+
+import fitz
+from rtree import index
+
+
+class PageLayout:
+    """Text layout of a PDF page, built from a single layout analysis.
+
+    The plain text of the page and its text blocks are taken from the same
+    text page, and an R-tree over the block bounding boxes serves the spatial
+    lookups done for every image and figure on the page.
+
+    Attributes:
+        text (str): Plain text of the page, as returned by `page.get_text()`.
+        blocks (list[dict]): Text blocks of the page in reading order.
+        bboxes (list[fitz.Rect]): Bounding box of each text block.
+        block_texts (list[str]): Merged text of all spans of each text block.
+    """
+
+    def __init__(self, page) -> None:
+        """Parse the page layout.
+
+        Args:
+            page (fitz.Page): The PDF page object.
+        """
+        textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+        self.text = page.get_text(textpage=textpage)
+        blocks = page.get_text("dict", textpage=textpage)["blocks"]
+
+        self.blocks = [block for block in blocks if block["type"] == 0]
+        self.bboxes = [fitz.Rect(block["bbox"]) for block in self.blocks]
+        self.block_texts = [
+            " ".join(
+                span["text"]
+                for line in block.get("lines", [])
+                for span in line.get("spans", [])
+            ).strip()
+            for block in self.blocks
+        ]
+
+        self.index = index.Index()
+        for block_num, bbox in enumerate(self.bboxes):
+            self.index.insert(block_num, _bounds(bbox))
+
+    def query(self, rect) -> list[int]:
+        """Find the text blocks which may intersect a rectangle.
+
+        The R-tree lookup is inclusive of the rectangle borders, so the result is
+        a superset of the strictly intersecting blocks and callers apply their
+        exact conditions on top of it.
+
+        Args:
+            rect (fitz.Rect or tuple): The rectangle (left, top, right, bottom).
+
+        Returns:
+            list[int]: Indices of the candidate blocks, in reading order.
+        """
+        if not self.blocks:
+            return []
+        return sorted(self.index.intersection(_bounds(rect)))
+
+
+def _bounds(rect) -> tuple[float, float, float, float]:
+    """Normalise a rectangle to the (min x, min y, max x, max y) order of the R-tree."""
+    x0, y0, x1, y1 = rect
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
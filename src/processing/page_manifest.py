@@ -0,0 +1,226 @@
+"""Module keeping per-page hashes and results to re-ingest revised PDFs incrementally."""
+
+import hashlib
+import json
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from .asset_store import AssetStore
+from .chunking import GRAPHICS_PAGE, split_pages
+
+# Text and images passage lines of a page, reused from a former version of its PDF
+PageResult = tuple[str, list[str]]
+
+
+class PageManifest:
+    """Per-session record of the pages of the ingested PDF files.
+
+    For every PDF path, the manifest keeps the content hash of the file, the
+    hash of each page, and the text and images passage lines extracted from
+    it. When a revised file is uploaded under the same name, its unchanged
+    pages are reused from the manifest instead of being extracted again.
+
+    Attributes:
+        root (Path): Directory holding one JSON file per PDF path.
+    """
+
+    def __init__(self, root) -> None:
+        """Initialise the manifest, creating its directory if needed.
+
+        Args:
+            root (str or Path): Directory holding the manifest entries.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, pdf_path: str) -> Path:
+        """Path of the entry of a PDF file."""
+        key = hashlib.sha256(os.path.abspath(pdf_path).encode()).hexdigest()[:32]
+        return self.root / f"{key}.json"
+
+    def get(self, pdf_path: str) -> Optional[dict]:
+        """Get the entry of a PDF file.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+
+        Returns:
+            dict: The content hash, extractor tag and pages of the last version
+                of the file, or None if it is not recorded.
+        """
+        try:
+            return json.loads(self._entry_path(pdf_path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def record(
+        self,
+        pdf_path: str,
+        content_hash: str,
+        extractor_tag: str,
+        text: str,
+        metadata: dict,
+    ) -> Optional[dict]:
+        """Record the pages of a PDF file, once its graphics are extracted.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+            content_hash (str): SHA-256 hash of the file.
+            extractor_tag (str): Tag of the extractor which produced the results.
+            text (str): Extracted text of the document.
+            metadata (dict): Its metadata, with the offsets of the pages in the
+                text, the hash of every page and its images passage.
+
+        Returns:
+            dict: The recorded entry, or None if the pages were not hashed.
+        """
+        hashes = metadata.get("page_hashes") or []
+        texts = [page[1:] for page in split_pages(text, metadata["page_starts"])]
+        lines: list[list[str]] = [[] for _ in texts]
+        for line in metadata["images_passage"].splitlines():
+            match = GRAPHICS_PAGE.search(line)
+            if match and int(match.group(1)) < len(lines):
+                lines[int(match.group(1))].append(line)
+
+        if len(hashes) != len(texts):
+            # The pages were not hashed by the extraction, do not record them
+            return None
+        entry = {
+            "content_hash": content_hash,
+            "extractor_tag": extractor_tag,
+            "pages": [
+                {"hash": page_hash, "text": page_text, "images": page_lines}
+                for page_hash, page_text, page_lines in zip(hashes, texts, lines)
+            ],
+        }
+        self.put(pdf_path, entry)
+        return entry
+
+    def put(self, pdf_path: str, entry: dict) -> None:
+        """Store the entry of a PDF file, e.g. restored from the ingestion cache.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+            entry (dict): The content hash, extractor tag and pages of the file.
+        """
+        entry_path = self._entry_path(pdf_path)
+        tmp_path = self.root / f".{entry_path.name}.{uuid.uuid4().hex}"
+        tmp_path.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(tmp_path, entry_path)
+
+
+def plan_page_reuse(
+    entry: dict, new_hashes: list[str]
+) -> tuple[dict[int, PageResult], dict[str, tuple[str, int]], set[str]]:
+    """Match the pages of a revised PDF file with those of its former version.
+
+    Pages are matched by hash, at the same index first, so that pages moved by
+    an insertion or a removal are reused too. The graphics of a moved page are
+    renamed after its new page number, and those of the former pages which
+    are not reused become stale.
+
+    Args:
+        entry (dict): Manifest entry of the former version of the file.
+        new_hashes (list[str]): Page hashes of the revised file.
+
+    Returns:
+        tuple: A 3-element tuple:
+            - dict: Text and images passage lines of the reused pages, keyed by
+              their page number in the revised file.
+            - dict: New name and page number of the graphics of moved pages,
+              keyed by their former name.
+            - set: Names of the graphics of the former pages not reused.
+    """
+    old_pages = entry["pages"]
+    by_hash: dict[str, list[int]] = {}
+    for old_num, page in enumerate(old_pages):
+        by_hash.setdefault(page["hash"], []).append(old_num)
+
+    matches: dict[int, int] = {}
+    for new_num, page_hash in enumerate(new_hashes):
+        candidates = by_hash.get(page_hash)
+        if candidates and new_num in candidates:
+            candidates.remove(new_num)
+            matches[new_num] = new_num
+    for new_num, page_hash in enumerate(new_hashes):
+        candidates = by_hash.get(page_hash)
+        if new_num not in matches and candidates:
+            matches[new_num] = candidates.pop(0)
+
+    reused: dict[int, PageResult] = {}
+    renames: dict[str, tuple[str, int]] = {}
+    kept = set()
+    for new_num, old_num in matches.items():
+        lines = []
+        for line in old_pages[old_num]["images"]:
+            if new_num != old_num:
+                old_name = _graphics_name(line)
+                line = line.replace(f"_page{old_num}_", f"_page{new_num}_", 1)
+                renames[old_name] = (_graphics_name(line), new_num)
+            kept.add(_graphics_name(line))
+            lines.append(line)
+        reused[new_num] = (old_pages[old_num]["text"], lines)
+
+    stale = {
+        _graphics_name(line) for page in old_pages for line in page["images"]
+    } - kept
+    return reused, renames, stale
+
+
+def _graphics_name(line: str) -> str:
+    """File name of the graphics of an images passage line."""
+    match = re.search(r'"path": "gfx/([^"]+)"', line)
+    return match.group(1) if match else ""
+
+
+def apply_page_reuse(
+    store: AssetStore, renames: dict[str, tuple[str, int]], stale: set[str]
+) -> None:
+    """Rename the graphics of moved pages and remove those of replaced pages.
+
+    Args:
+        store (AssetStore): The session's asset store.
+        renames (dict): New name and page number, keyed by former name.
+        stale (set): Names of the graphics no longer shown in the document.
+    """
+    store.rename(renames)
+    store.remove(stale)
+
+
+def finish_page_reuse(
+    store: AssetStore, previous: dict, new_hashes: list[str], images_passage: str
+) -> int:
+    """Update the graphics of a revised PDF file once its new version is stored.
+
+    Nothing is renamed or removed before the extraction succeeds, so a revision
+    which fails leaves the graphics of the former version in place. The
+    graphics just extracted are kept, even under the name of a former one.
+
+    Args:
+        store (AssetStore): The session's asset store.
+        previous (dict): Manifest entry of the former version of the file.
+        new_hashes (list[str]): Page hashes of the revised file.
+        images_passage (str): Images passage extracted from the revised file.
+
+    Returns:
+        int: Number of pages reused from the former version.
+    """
+    reused, renames, stale = plan_page_reuse(previous, new_hashes)
+    extracted = {_graphics_name(line) for line in images_passage.splitlines()}
+    apply_page_reuse(store, renames, stale - extracted)
+    return len(reused)
+
+
+def session_manifest_dir(session_id: str) -> Path:
+    """Directory of the page manifest of a session.
+
+    Args:
+        session_id (str): Unique identifier for the current session.
+
+    Returns:
+        Path: Path to the manifest root.
+    """
+    return Path.cwd() / "tmp" / session_id / "pages"
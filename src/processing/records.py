@@ -0,0 +1,165 @@
+"""Module with the compact records of the extraction results."""
+
+from array import array
+from typing import Optional
+
+
+class GraphicRecord:
+    """Metadata of a graphic extracted from a PDF page.
+
+    Records use `__slots__` and keep their bounding box in a flat array of
+    doubles, they are several times smaller than the equivalent dictionaries.
+
+    Attributes:
+        name (str): Name of the graphic file.
+        caption (str, optional): Caption of the graphic, if found.
+        ratio (str): Orientation of the graphic ("horizontal", "vertical" or "square").
+        hash (str): Hash of the graphic content, or of its identity in lazy mode.
+        page (int): Page number of the graphic in the PDF document.
+        bbox (array): Left, top, right and bottom of the graphic on the page.
+        phash (int): Perceptual hash of the graphic, 0 if not computed.
+    """
+
+    __slots__ = ("name", "caption", "ratio", "hash", "page", "bbox", "phash")
+
+    def __init__(
+        self,
+        name: str,
+        caption: Optional[str],
+        ratio: str,
+        hash: str,  # pylint: disable=redefined-builtin
+        page: int = 0,
+        bbox=(0.0, 0.0, 0.0, 0.0),
+        phash: int = 0,
+    ) -> None:
+        self.name = name
+        self.caption = caption
+        self.ratio = ratio
+        self.hash = hash
+        self.page = page
+        self.bbox = array("d", bbox)
+        self.phash = phash
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self) and all(
+            getattr(self, slot) == getattr(other, slot)
+            for slot in GraphicRecord.__slots__
+        )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r}, page={self.page})"
+
+
+class ImageRecord(GraphicRecord):
+    """Metadata of a raster image embedded in a PDF page."""
+
+    __slots__ = ()
+
+
+class FigureRecord(GraphicRecord):
+    """Metadata of a vector figure drawn on a PDF page."""
+
+    __slots__ = ()
+
+
+class PageRecord:
+    """Text, graphics and classifier decision of one extracted PDF page.
+
+    Attributes:
+        page (int): Page number in the PDF document.
+        text (str): Extracted text of the page.
+        graphics (list[GraphicRecord]): Images and figures of the page.
+        decision (dict, optional): Decision of the page classifier, None when
+            only the text was extracted.
+        hash (str, optional): Hash of the page content (see `page_sha256`), None
+            when only the text was extracted.
+    """
+
+    __slots__ = ("page", "text", "graphics", "decision", "hash")
+
+    def __init__(
+        self,
+        page: int,
+        text: str,
+        graphics: Optional[list[GraphicRecord]] = None,
+        decision: Optional[dict] = None,
+        page_hash: Optional[str] = None,
+    ) -> None:
+        self.page = page
+        self.text = text
+        self.graphics = graphics if graphics is not None else []
+        self.decision = decision
+        self.hash = page_hash
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PageRecord) and all(
+            getattr(self, slot) == getattr(other, slot) for slot in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        return f"PageRecord(page={self.page}, graphics={len(self.graphics)})"
+
+
+class GraphicRef:
+    """Graphic requested by name in a generated presentation.
+
+    Attributes:
+        doc (str): Filename of the PDF document without extension.
+        page (int): Page number of the graphic.
+        num (int): Index of the image or figure on the page.
+        hash (str): Prefix of the graphic hash found in its name.
+        ext (str): Extension of the graphic file.
+    """
+
+    __slots__ = ("doc", "page", "num", "hash", "ext")
+
+    def __init__(
+        self,
+        doc: str,
+        page: int,
+        num: int,
+        hash: str,  # pylint: disable=redefined-builtin
+        ext: str = "png",
+    ) -> None:
+        self.doc = doc
+        self.page = page
+        self.num = num
+        self.hash = hash
+        self.ext = ext
+
+    @classmethod
+    def from_match(cls, match, num_group: str) -> "GraphicRef":
+        """Build the reference of a graphic name matched in an answer.
+
+        Args:
+            match (re.Match): Match of a graphics name pattern.
+            num_group (str): Name of the group holding the index of the graphic.
+
+        Returns:
+            GraphicRef: The requested graphic.
+        """
+        groups = match.groupdict()
+        return cls(
+            groups["doc"],
+            int(groups["page"]),
+            int(groups[num_group]),
+            groups["hash"],
+            groups.get("ext") or "png",
+        )
+
+    def matches(self, doc: str, page: int, num: int) -> bool:
+        """Whether the reference designates a graphic of a page.
+
+        Args:
+            doc (str): Filename of the PDF document without extension.
+            page (int): Page number.
+            num (int): Index of the image or figure on the page.
+
+        Returns:
+            bool: True if the graphic is the requested one.
+        """
+        return self.doc == doc and self.page == page and self.num == num
+
+    def as_dict(self) -> dict:
+        """Fields of the reference, for the telemetry."""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
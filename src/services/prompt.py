@@ -1,5 +1,7 @@
 """Module contatining the master prompt."""
 
+from ..processing import strip_phash
+
 
 # This is an AI prompt template, not a SQL statement.
 # Bandit flagged it mistakenly as a possible SQL injection.
@@ -187,19 +189,57 @@ Return only the JSON object. Do not include any explanations, LaTeX, or Markdown
 """
 
 
+def merge_chunks(documents, metadatas) -> list[tuple[str, str]]:
+    """
+    Merge the retrieved chunks of each document into a single passage.
+    Chunks are put back in reading order, the text repeated from the previous
+    chunk is dropped and gaps between chunks are marked with "[...]".
+    Args:
+        documents (list): List of retrieved chunks.
+        metadatas (list): List of metadata dictionaries corresponding to the chunks.
+    Returns:
+        list: The passage and images passage of every document, in order of relevance.
+    """
+    by_pdf: dict = {}
+    for chunk, metas in zip(documents, metadatas):
+        by_pdf.setdefault(metas["pdf_path"], []).append((chunk, metas))
+
+    merged = []
+    for chunks in by_pdf.values():
+        chunks.sort(key=lambda item: item[1].get("chunk", 0))
+        passage = ""
+        images: list[str] = []
+        previous = None
+        for chunk, metas in chunks:
+            index = metas.get("chunk", 0)
+            if previous is None:
+                passage = chunk
+            elif index == previous + 1:
+                passage += "\n" + chunk[metas.get("overlap_chars", 0) :]
+            else:
+                passage += " [...] " + chunk
+            previous = index
+            for line in metas["images_passage"].splitlines():
+                line = strip_phash(line)
+                if line not in images:
+                    images.append(line)
+        merged.append((passage, "\n".join(images)))
+    return merged
+
+
 def build_prompt(documents, metadatas, aspect_ratio, topic) -> str:
     """
-    Build the prompt for the LLM based on the provided documents and metadata.
+    Build the prompt for the LLM based on the provided chunks and metadata.
     Args:
-        documents (list): List of document passages.
-        metadatas (list): List of metadata dictionaries corresponding to the documents.
+        documents (list): List of retrieved chunks.
+        metadatas (list): List of metadata dictionaries corresponding to the chunks.
         aspect_ratio (str): The desired aspect ratio for the presentation, e.g., "16:9".
     Returns:
         str: The complete prompt string ready for LLM input.
     """
     prompt = get_prompt_json(aspect_ratio, topic)
-    for passage, metas in zip(documents, metadatas):
+    for passage, images_passage in merge_chunks(documents, metadatas):
         passage_oneline = passage.replace("\n", " ")
         prompt += f"PASSAGE: {passage_oneline}\n"
-        prompt += f"IMAGES: {metas['images_passage']}\n"
+        prompt += f"IMAGES: {images_passage}\n"
     return prompt
@@ -0,0 +1,187 @@
+"""Shared fixtures of the tests: generated PDFs, a working directory and a local
+embedding model standing for the API, so that no test needs an API key."""
+
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+
+import fitz
+import pytest
+
+try:
+    from chromadb import EmbeddingFunction
+except ImportError:  # The tests needing chromadb are skipped
+    EmbeddingFunction = object
+
+
+class CountingEmbeddingFunction(EmbeddingFunction):
+    """Deterministic local embedding counting the texts it embeds.
+
+    Attributes:
+        calls (int): Number of requests sent.
+        texts (int): Number of texts embedded.
+        crash_after (int): Number of requests after which every request raises,
+            0 never raises.
+        latency_s (float): Seconds taken by every request, like the API.
+    """
+
+    def __init__(self, batcher) -> None:
+        self.batcher = batcher
+        self.calls = 0
+        self.texts = 0
+        self.crash_after = 0
+        self.latency_s = 0.0
+
+    def __call__(self, inputs):
+        return self.batcher.embed(inputs, self._embed_batch)
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        """Embed one request, batched like those of the API."""
+        if self.crash_after and self.calls >= self.crash_after:
+            raise RuntimeError("simulated crash")
+        time.sleep(self.latency_s)
+        self.calls += 1
+        self.texts += len(batch)
+        return [
+            [float(len(text) % 97), float(sum(map(ord, text)) % 89)] for text in batch
+        ]
+
+
+def write_pdf(path: Path, title: str, num_pages: int = 3) -> None:
+    """Write a PDF whose pages hold enough text for a few chunks."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = fitz.open()
+    for page_num in range(num_pages):
+        page = doc.new_page()
+        text = "\n".join(
+            f"{title}, page {page_num}, line {line}: some text about the topic."
+            for line in range(40)
+        )
+        page.insert_textbox(fitz.Rect(36, 36, 560, 800), text, fontsize=8)
+    doc.save(path)
+
+
+@pytest.fixture(name="write_pdf")
+def write_pdf_fixture() -> Callable[..., None]:
+    """Writer of small text PDFs, see `write_pdf`."""
+    return write_pdf
+
+
+@pytest.fixture(scope="session", autouse=True)
+def forkserver() -> None:
+    """Start the fork server of the extraction workers from the repository.
+
+    The fork server preloads the extraction modules before it restores
+    `sys.path`: started after a test changed directory, it cannot import
+    them and every worker imports them again.
+    """
+    import multiprocessing.forkserver
+
+    import src.processing.isolated_workers  # noqa: F401 Sets the preload
+
+    multiprocessing.forkserver.ensure_running()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch) -> Path:
+    """Run the test in its own directory, with its own ingestion cache.
+
+    The graphics are extracted along with the text, as the ingestion does
+    by default.
+    """
+    from src.database import ingestion_cache
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("INGESTION_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("TWO_PHASE_INGESTION", "false")
+    monkeypatch.setattr(ingestion_cache, "_INGESTION_CACHE", None)
+    return tmp_path
+
+
+@pytest.fixture
+def embedder(monkeypatch) -> CountingEmbeddingFunction:
+    """Counting embedding used by the ingestion in place of the API."""
+    from src.database import db_manipulation
+    from src.database.embedding_batches import get_embedding_batcher
+
+    counter = CountingEmbeddingFunction(get_embedding_batcher())
+    monkeypatch.setattr(db_manipulation, "embed_fn", counter)
+    return counter
+
+
+@pytest.fixture
+def ingest(workdir, embedder) -> Callable[[list[Path], str], dict]:
+    """Ingest a batch of files into the collection of a session.
+
+    Returns:
+        callable: Function ingesting files into a session and returning its
+            ingestion diff, the number of chunks embedded and stored, the files
+            which failed and the entries of the collection.
+    """
+    from src.database import db_manipulation
+
+    def ingest_files(files: list[Path], session_id: str) -> dict:
+        db = db_manipulation.chroma_client.get_or_create_collection(
+            name=session_id, embedding_function=embedder
+        )
+        paths = [str(path) for path in files]
+        diff = db_manipulation.diff_ingestion(paths, session_id)
+        texts_before = embedder.texts
+        failed = db_manipulation.ingest_files_to_db(paths, session_id)
+        entries = db.get(include=["metadatas"])
+        return {
+            "diff": diff.summary(),
+            "embedded": embedder.texts - texts_before,
+            "stored": len(entries["ids"]),
+            "failed": failed,
+            "entries": entries,
+        }
+
+    return ingest_files
+
+
+@pytest.fixture
+def gradio_files(workdir) -> Callable[[dict[str, Path]], list[SimpleNamespace]]:
+    """Copy PDFs in their own temporary directories, as Gradio hands them over.
+
+    Returns:
+        callable: Function taking the path of the content of every file, keyed
+            by name, and returning file objects whose `name` is the path of the
+            temporary file.
+    """
+
+    def copy_files(pdfs: dict[str, Path]) -> list[SimpleNamespace]:
+        files = []
+        for file_name, source in pdfs.items():
+            temp_dir = Path(tempfile.mkdtemp(dir=workdir))
+            shutil.copy(source, temp_dir / file_name)
+            files.append(SimpleNamespace(name=str(temp_dir / file_name)))
+        return files
+
+    return copy_files
+
+
+@pytest.fixture
+def upload(gradio_files, embedder) -> Callable[[dict[str, Path], str], dict]:
+    """Upload PDFs through the UI handler and wait for their ingestion.
+
+    Returns:
+        callable: Function uploading files into a session and returning the
+            names of the saved files and the number of chunks embedded.
+    """
+    from src.database import get_job_queue
+    from src.interface.manage_files import upload_files
+
+    def upload_pdfs(pdfs: dict[str, Path], session_id: str) -> dict:
+        texts_before = embedder.texts
+        _, saved = upload_files(gradio_files(pdfs), session_id)
+        get_job_queue().wait(session_id)
+        return {
+            "saved": [Path(path).name for path in saved],
+            "embedded": embedder.texts - texts_before,
+        }
+
+    return upload_pdfs
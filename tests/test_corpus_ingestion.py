@@ -0,0 +1,108 @@
+"""Tests that a corpus ingestion resumes where an interrupted run stopped."""
+
+import shutil
+import time
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("google.genai")
+
+from src.database import db_manipulation  # noqa: E402
+from src.database.corpus_ingestion import (  # noqa: E402
+    CorpusCheckpoint,
+    ingest_corpus,
+)
+from src.database.embedding_limiter import get_embedding_limiter  # noqa: E402
+from src.database.ingestion_jobs import FAILED  # noqa: E402
+
+
+def test_resumes_after_crash_within_rate_limit(
+    workdir, write_pdf, embedder, monkeypatch
+):
+    monkeypatch.setenv("INGEST_WORKERS", "2")
+    limiter = get_embedding_limiter()
+    monkeypatch.setattr(limiter, "per_minute", 3000)
+    corpus = workdir / "corpus"
+    good = []
+    for num in range(12):
+        path = corpus / f"category_{num % 3}" / f"paper{num}.pdf"
+        write_pdf(path, f"Paper {num}", num_pages=2 + num % 3)
+        good.append(str(path.resolve()))
+    broken = corpus / "category_0" / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.7 truncated")
+    checkpoint = workdir / "corpus.checkpoint.jsonl"
+
+    embedder.crash_after = 5
+    start = time.monotonic()
+    with pytest.raises(RuntimeError):
+        ingest_corpus(corpus, "corpus", checkpoint, batch_files=4)
+    logged = len(CorpusCheckpoint(checkpoint).entries)
+
+    embedder.crash_after = 0
+    second = ingest_corpus(corpus, "corpus", checkpoint, batch_files=4)
+    texts_before = embedder.texts
+    third = ingest_corpus(corpus, "corpus", checkpoint, batch_files=4)
+    elapsed = time.monotonic() - start
+
+    assert second.skipped == logged, "the logged files were ingested again"
+    assert second.done + second.failed + second.skipped == len(good) + 1
+    entries = CorpusCheckpoint(checkpoint).entries
+    assert entries[str(broken.resolve())]["state"] == FAILED
+    assert not (third.done or third.failed or embedder.texts - texts_before)
+
+    db = db_manipulation.chroma_client.get_or_create_collection(name="corpus")
+    stored = {meta["pdf_path"] for meta in db.get(include=["metadatas"])["metadatas"]}
+    assert stored == set(good)
+    assert elapsed >= (embedder.calls - 1) * 60 / limiter.per_minute
+
+    # The graphics are kept next to the collection, not with the session files
+    data_dir = workdir / "chroma" / "corpus.files"
+    assert (data_dir / "assets").is_dir() and not (workdir / "tmp").exists()
+    db_manipulation.clean_db("corpus")
+    assert not data_dir.exists()
+
+
+def test_retrieval_merges_session_and_corpus(
+    workdir, write_pdf, ingest, embedder, monkeypatch
+):
+    monkeypatch.setattr(db_manipulation, "query_embed_fn", embedder)
+    session_id = "test_corpus_retrieval"
+    corpus = workdir / "corpus"
+    for num in range(3):
+        write_pdf(corpus / f"paper{num}.pdf", f"Corpus paper {num}")
+    ingest_corpus(corpus, "corpus", workdir / "corpus.checkpoint.jsonl")
+    uploads = [workdir / "upload.pdf", workdir / "shared.pdf"]
+    write_pdf(uploads[0], "Uploaded paper")
+    shutil.copy(corpus / "paper0.pdf", uploads[1])
+    session = ingest(uploads, session_id)["entries"]["metadatas"]
+    corpus_db = db_manipulation.chroma_client.get_collection(name="corpus")
+
+    # Every chunk retrieved, the chunks of the shared file counted once
+    monkeypatch.setattr(db_manipulation, "RETRIEVAL_CHUNKS", 1000)
+    [documents], [metadatas] = db_manipulation.retrive_files_from_db(
+        "topic", session_id
+    )
+    shared = sum(1 for meta in session if meta["pdf_path"] == str(uploads[1]))
+    assert len(documents) == corpus_db.count() + len(session) - shared
+    sources = {meta["pdf_path"] for meta in metadatas}
+    assert str(uploads[0]) in sources
+    assert str((corpus / "paper1.pdf").resolve()) in sources
+
+    # The chunks closest to the query come first, whichever collection holds them
+    query = corpus_db.get(include=["documents"])["documents"][-1]
+    [target] = embedder([query.replace("\n", " ")])
+
+    def distance(text: str) -> float:
+        [embedding] = embedder([text])
+        return sum((a - b) ** 2 for a, b in zip(target, embedding))
+
+    monkeypatch.setattr(db_manipulation, "RETRIEVAL_CHUNKS", 3)
+    [documents], _ = db_manipulation.retrive_files_from_db(query, session_id)
+    distances = [distance(text) for text in documents]
+    closest = min(distance(text) for text in corpus_db.get()["documents"])
+    assert len(documents) == 3 and distances == sorted(distances)
+    assert distances[0] <= closest
+
+    db_manipulation.clean_db(session_id)
+    db_manipulation.clean_db("corpus")
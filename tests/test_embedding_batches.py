@@ -0,0 +1,92 @@
+"""Tests that the embedding requests are batched, concurrent and retried alone."""
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("google.genai")
+
+from src.database import embedding_batches  # noqa: E402
+from src.database.embedding_batches import EmbeddingBatcher  # noqa: E402
+from src.processing.chunking import estimate_tokens  # noqa: E402
+
+
+class TransientError(Exception):
+    """Error standing for a quota reached, worth a retry."""
+
+
+class FakeEmbeddingAPI:
+    """Local embedding API failing once for the batches holding given texts."""
+
+    def __init__(self, fail_on: set[str], latency_s: float = 0.05) -> None:
+        self.fail_on = set(fail_on)
+        self.latency_s = latency_s
+        self.sent: list[tuple[str, ...]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, batch: list[str]) -> list:
+        with self._lock:
+            self.sent.append(tuple(batch))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            failing = self.fail_on & set(batch)
+            self.fail_on -= failing
+        time.sleep(self.latency_s)
+        with self._lock:
+            self.in_flight -= 1
+        if failing:
+            raise TransientError("429 quota reached")
+        return [[float(text.split()[0])] for text in batch]
+
+
+@pytest.fixture
+def texts(monkeypatch) -> list[str]:
+    """Texts numbered in order, of a few to a few thousand tokens."""
+    monkeypatch.setattr(embedding_batches, "RETRY_DELAY_S", 0.01)
+    return [
+        f"{num} " + "word " * (4000 if num % 97 == 13 else 20 + (num * 37) % 300)
+        for num in range(1000)
+    ]
+
+
+@pytest.mark.parametrize("in_flight", [1, 4])
+def test_batches_in_limits_order_and_retries(texts, in_flight):
+    fail_on = {texts[30], texts[700]}
+    batcher = EmbeddingBatcher(
+        max_items=100, max_tokens=8000, in_flight=in_flight, retries=3
+    )
+    api = FakeEmbeddingAPI(fail_on)
+    embeddings = batcher.embed(
+        texts, api, lambda error: isinstance(error, TransientError)
+    )
+
+    assert embeddings == [[float(num)] for num in range(len(texts))]
+    for batch in api.sent:
+        tokens = sum(estimate_tokens(text) for text in batch)
+        assert len(batch) <= batcher.max_items
+        assert len(batch) == 1 or tokens <= batcher.max_tokens
+    assert api.max_in_flight <= in_flight
+    # Only the failed batches are sent again
+    assert len(api.sent) - len(set(api.sent)) == len(fail_on)
+    assert batcher.stats()["retries"] == len(fail_on)
+
+
+def test_requests_in_flight_are_faster(texts):
+    durations = []
+    for in_flight in (1, 4):
+        batcher = EmbeddingBatcher(max_items=100, max_tokens=8000, in_flight=in_flight)
+        start = time.perf_counter()
+        batcher.embed(texts, FakeEmbeddingAPI(set()))
+        durations.append(time.perf_counter() - start)
+    assert durations[1] < durations[0] / 2
+
+
+def test_error_not_retriable_is_raised_at_once(texts):
+    api = FakeEmbeddingAPI(set(texts[:1]))
+    with pytest.raises(TransientError):
+        EmbeddingBatcher(retries=3).embed(texts[:10], api)
+    assert len(api.sent) == 1
@@ -0,0 +1,114 @@
+"""Tests that the embedding cache serves known texts and stays within its cap."""
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("google.genai")
+
+from src.database import embedding_cache  # noqa: E402
+from src.database.embedding_cache import (  # noqa: E402
+    CacheLockedError,
+    EmbeddingCache,
+)
+
+MODEL = "models/text-embedding-004"
+DIM = 768
+MAX_BYTES = 1500 * DIM * 4
+TEXTS = [f"chunk {num} " + "text " * (num % 50) for num in range(2000)]
+
+
+class CountingAPI:
+    """Local embedding function counting the texts it is sent."""
+
+    def __init__(self) -> None:
+        self.texts = 0
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.texts += len(texts)
+        return [[float(len(text) % 251)] * DIM for text in texts]
+
+
+@pytest.fixture
+def api() -> CountingAPI:
+    """Embedding function standing for the API."""
+    return CountingAPI()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Embedding cache in a temporary directory, closed after the test."""
+    cache = EmbeddingCache(tmp_path, max_bytes=MAX_BYTES)
+    yield cache
+    cache.close()
+
+
+def test_known_texts_are_not_sent_again(cache, api):
+    batch = TEXTS[:400] + TEXTS[:100]
+    first = cache.embed(batch, MODEL, "retrieval_document", api)
+    assert api.texts == 400, "a text repeated within a call was sent twice"
+
+    again = cache.embed(batch, MODEL, "retrieval_document", api)
+    assert api.texts == 400 and again == first
+
+    cache.embed(TEXTS[:10], MODEL, "retrieval_query", api)
+    assert api.texts == 410, "embeddings of another task type were reused"
+
+
+def test_directory_in_use_is_locked(cache, tmp_path):
+    with pytest.raises(CacheLockedError):
+        EmbeddingCache(tmp_path, max_bytes=MAX_BYTES)
+
+
+def test_cache_reopens_from_disk(tmp_path, api):
+    cache = EmbeddingCache(tmp_path, max_bytes=MAX_BYTES)
+    first = cache.embed(TEXTS[:400], MODEL, "retrieval_document", api)
+    cache.close()
+
+    cache = EmbeddingCache(tmp_path, max_bytes=MAX_BYTES)
+    reopened = cache.embed(TEXTS[:400], MODEL, "retrieval_document", api)
+    cache.close()
+    assert api.texts == 400 and reopened == first
+
+
+def test_cache_stays_within_cap_and_keeps_recent_entries(cache, api):
+    for start in range(0, 2000, 400):
+        cache.embed(TEXTS[:5], MODEL, "retrieval_document", api)
+        cache.embed(TEXTS[start : start + 400], MODEL, "retrieval_document", api)
+    stats = cache.stats()
+    assert stats["entries"] <= 1500 and stats["bytes"] <= MAX_BYTES
+    assert stats["evictions"]
+
+    sent = api.texts
+    cache.embed(TEXTS[:5], MODEL, "retrieval_document", api)
+    assert api.texts == sent, "recently used entries were evicted"
+
+
+def test_recent_use_survives_reopening(tmp_path, api):
+    cache = EmbeddingCache(tmp_path, max_bytes=MAX_BYTES)
+    cache.embed(TEXTS[:1000], MODEL, "retrieval_document", api)
+    cache.embed(TEXTS[:5], MODEL, "retrieval_document", api)
+    cache.close()
+
+    # The oldest entries are evicted, not those used last before closing
+    cache = EmbeddingCache(tmp_path, max_bytes=MAX_BYTES)
+    cache.embed(TEXTS[1000:1600], MODEL, "retrieval_document", api)
+    sent = api.texts
+    cache.embed(TEXTS[:5], MODEL, "retrieval_document", api)
+    assert cache.stats()["evictions"] and api.texts == sent
+    cache.close()
+
+
+def test_index_log_is_compacted(tmp_path, api, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "COMPACT_MIN_RECORDS", 100)
+    cache = EmbeddingCache(tmp_path, max_bytes=MAX_BYTES)
+    first = cache.embed(TEXTS[:50], MODEL, "retrieval_document", api)
+    for _ in range(20):
+        cache.embed(TEXTS[:50], MODEL, "retrieval_document", api)
+    log_lines = (tmp_path / "index.log").read_text(encoding="utf-8").splitlines()
+    cache.close()
+    assert len(log_lines) < 10, "the index log was not compacted"
+
+    cache = EmbeddingCache(tmp_path, max_bytes=MAX_BYTES)
+    reopened = cache.embed(TEXTS[:50], MODEL, "retrieval_document", api)
+    cache.close()
+    assert api.texts == 50 and reopened == first
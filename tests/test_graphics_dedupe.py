@@ -0,0 +1,111 @@
+"""Tests that near-duplicate graphics are shown once in the prompt."""
+
+from pathlib import Path
+
+import fitz
+import pytest
+
+from src.processing import dedupe_graphics
+from src.processing.document_processing import read_pdf_content
+from src.processing.extraction_config import ExtractionConfig
+
+SHORT = "Figure 1: Architecture."
+LONG = "Figure 3. Architecture of the model, with its encoder and decoder."
+
+
+def draw_plot(page: fitz.Page, rect: fitz.Rect, seed: int) -> None:
+    """Draw a simple plot as vector graphics, different for every seed."""
+    scale = fitz.Matrix(rect.width / 300, rect.height / 200)
+
+    def at(x: float, y: float) -> fitz.Point:
+        return fitz.Point(x, y) * scale + rect.tl
+
+    page.draw_rect(fitz.Rect(at(20, 20), at(280, 180)), color=(0, 0, 0))
+    points = [at(20 + x * 26, 180 - ((x * (seed + 3) * 37) % 150)) for x in range(11)]
+    page.draw_polyline(points, color=(0.8, 0.1, 0.1), width=3)
+    page.draw_circle(at(60 + seed * 50, 60), 15 * scale.a, fill=(0.1, 0.3, 0.8))
+
+
+def plot_pixmap(seed: int) -> fitz.Pixmap:
+    """Render a simple plot, different for every seed."""
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=200)
+    draw_plot(page, page.rect, seed)
+    return page.get_pixmap(matrix=fitz.Matrix(2, 2))
+
+
+def write_paper(path: Path, graphics: list[tuple[object, fitz.Rect, str]]) -> None:
+    """Write a PDF showing one graphic per page, above its caption.
+
+    Every graphic is either the bytes of an image or the seed of a plot drawn
+    as vector graphics.
+    """
+    doc = fitz.open()
+    for graphic, rect, caption in graphics:
+        page = doc.new_page()
+        page.insert_textbox(
+            fitz.Rect(36, 36, 560, 120), "Some text about the method. " * 12
+        )
+        if isinstance(graphic, bytes):
+            page.insert_image(rect, stream=graphic)
+        else:
+            draw_plot(page, rect, int(str(graphic)))
+        page.insert_textbox(
+            fitz.Rect(rect.x0, rect.y1 + 6, 560, rect.y1 + 60), caption, fontsize=9
+        )
+    doc.save(path)
+
+
+def passages(pdf_files: list[Path], asset_dir: Path) -> list[dict]:
+    """Extract the PDF files, with lazy figures, and return one chunk metadata
+    per document."""
+    config = ExtractionConfig(
+        asset_dir=str(asset_dir), max_workers=1, isolated=False, lazy_figures=True
+    )
+    metadatas = []
+    for pdf_path in pdf_files:
+        _, metas = read_pdf_content(str(pdf_path), config)
+        metadatas.append(
+            {"pdf_path": str(pdf_path), "images_passage": metas["images_passage"]}
+        )
+    return metadatas
+
+
+def image_plots() -> tuple[tuple, list]:
+    """A plot shared as PNG and JPEG, and a plot of its own for each paper."""
+    shared = plot_pixmap(0)
+    plots = [plot_pixmap(1).tobytes("png"), plot_pixmap(2).tobytes("png")]
+    return (shared.tobytes("png"), shared.tobytes("jpeg")), plots
+
+
+def vector_plots() -> tuple[tuple, list]:
+    """The seeds of a shared plot and of a plot of its own for each paper."""
+    return (0, 0), [1, 2]
+
+
+@pytest.mark.parametrize("graphics", [image_plots, vector_plots])
+def test_shared_plot_is_shown_once_with_its_longer_caption(tmp_path, graphics):
+    shared, plots = graphics()
+    write_paper(
+        tmp_path / "a.pdf",
+        [
+            (shared[0], fitz.Rect(100, 150, 400, 350), SHORT),
+            (plots[0], fitz.Rect(100, 150, 400, 350), "Fig. 2: Loss."),
+        ],
+    )
+    write_paper(
+        tmp_path / "b.pdf",
+        [
+            (shared[1], fitz.Rect(150, 160, 390, 320), LONG),
+            (plots[1], fitz.Rect(100, 150, 400, 350), "Fig. 4: Accuracy."),
+        ],
+    )
+    metadatas = passages([tmp_path / "a.pdf", tmp_path / "b.pdf"], tmp_path)
+
+    deduped, stats = dedupe_graphics(metadatas)
+    lines = [line for meta in deduped for line in meta["images_passage"].splitlines()]
+    captions = " ".join(lines)
+    assert len(lines) == 3 and stats["entries_removed"] == 1
+    assert "encoder and decoder" in captions
+    assert "Loss" in captions and "Accuracy" in captions
+    assert "phash" not in captions
@@ -0,0 +1,56 @@
+"""Tests that repeated and overlapping uploads only embed new content."""
+
+import shutil
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("google.genai")
+
+from src.database import db_manipulation  # noqa: E402
+
+SESSION_ID = "test_incremental_ingestion"
+
+
+def test_only_new_content_is_embedded(workdir, write_pdf, ingest):
+    files = {name: workdir / f"{name}.pdf" for name in ("a", "b", "c")}
+    for name, path in files.items():
+        write_pdf(path, f"Document {name}")
+
+    first = ingest([files["a"], files["b"]], SESSION_ID)
+    assert first["embedded"] and first["diff"]["new"] == 2
+
+    again = ingest([files["a"], files["b"]], SESSION_ID)
+    assert not again["embedded"], "the same files were embedded again"
+    assert again["stored"] == first["stored"]
+
+    overlap = ingest([files["b"], files["c"]], SESSION_ID)
+    assert overlap["diff"]["new"] == 1
+    assert overlap["stored"] - first["stored"] == overlap["embedded"] > 0
+
+    copy = workdir / "a_copy.pdf"
+    shutil.copy(files["a"], copy)
+    copied = ingest([copy], SESSION_ID)
+    assert not copied["embedded"], "a renamed copy was embedded again"
+    assert copied["stored"] == overlap["stored"]
+
+    # The former chunks of a revised file are replaced, the unchanged ones reused
+    write_pdf(files["a"], "Document a, second version", num_pages=1)
+    revised = ingest([files["a"]], SESSION_ID)
+    hashes = {
+        meta["content_hash"]
+        for meta in revised["entries"]["metadatas"]
+        if meta["pdf_path"] == str(files["a"])
+    }
+    assert revised["diff"]["replaced"] == 1 and len(hashes) == 1
+    assert revised["stored"] == overlap["stored"] - (
+        revised["diff"]["stale_chunks"] - revised["embedded"]
+    )
+
+    # A file whose revision fails keeps its former chunks
+    files["b"].write_bytes(b"%PDF-1.7 truncated by a failed upload")
+    broken = ingest([files["b"]], SESSION_ID)
+    assert broken["failed"] == [str(files["b"])]
+    assert broken["stored"] == revised["stored"]
+
+    db_manipulation.clean_db(SESSION_ID)
@@ -0,0 +1,116 @@
+"""Tests that pathological PDFs fail on their own in the isolated extraction workers."""
+
+import zlib
+from pathlib import Path
+
+import fitz
+import pytest
+
+from src.processing.document_processing import iter_documents
+from src.processing.extraction_config import ExtractionConfig
+
+
+def sound_pdf(path: Path) -> None:
+    """Write a small PDF with text and a vector figure."""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "A sound document with a small figure.")
+    page.draw_rect(fitz.Rect(100, 100, 400, 300), color=(0, 0, 1))
+    page.draw_line((100, 200), (400, 200), color=(1, 0, 0))
+    doc.save(path)
+
+
+def bomb_pdf(path: Path, side: int) -> None:
+    """Write a PDF showing a gray image of `side` x `side` zero bytes, deflated."""
+    compressor = zlib.compressobj(1)
+    row_block = bytes(side * 256)
+    chunks = [compressor.compress(row_block) for _ in range(side // 256)]
+    chunks.append(compressor.flush())
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "A document hiding a decompression bomb.")
+    placeholder = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 1, 1), False)
+    page.insert_image(fitz.Rect(100, 100, 500, 500), pixmap=placeholder)
+
+    # Swap the placeholder for the bomb
+    xref = page.get_images()[0][0]
+    doc.update_stream(xref, b"".join(chunks), compress=False)
+    doc.xref_set_key(xref, "Width", str(side))
+    doc.xref_set_key(xref, "Height", str(side))
+    doc.xref_set_key(xref, "Filter", "/FlateDecode")
+    doc.save(path)
+
+
+def drawings_pdf(path: Path, num_paths: int) -> None:
+    """Write a PDF with a page holding `num_paths` tiny stroked segments."""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "A document with far too many drawings.")
+    ops = "".join(
+        f"{100 + i % 400} {100 + (i // 400) % 600} m "
+        f"{101 + i % 400} {101 + (i // 400) % 600} l S\n"
+        for i in range(num_paths)
+    )
+    content = page.get_contents()[0]
+    doc.update_stream(content, doc.xref_stream(content) + b"\n" + ops.encode())
+    doc.save(path)
+
+
+def long_pdf(path: Path, num_pages: int) -> None:
+    """Write a PDF with `num_pages` pages of text."""
+    doc = fitz.open()
+    for page_num in range(num_pages):
+        doc.new_page().insert_text((72, 72), f"Page {page_num} of a long document.")
+    doc.save(path)
+
+
+@pytest.fixture
+def batch(tmp_path) -> dict[str, str]:
+    """Sound PDFs mixed with hostile ones, keyed by name."""
+    files = {
+        name: tmp_path / f"{name}.pdf"
+        for name in ("sound1", "bomb", "drawings", "long", "sound2")
+    }
+    sound_pdf(files["sound1"])
+    sound_pdf(files["sound2"])
+    bomb_pdf(files["bomb"], 16384)
+    drawings_pdf(files["drawings"], 20_000)
+    long_pdf(files["long"], 20)
+    return {name: str(path) for name, path in files.items()}
+
+
+def extract(batch: dict[str, str], config: ExtractionConfig) -> set[str]:
+    """Extract the batch and return the names of the files which failed."""
+    failed: list[str] = []
+    for _ in iter_documents(list(batch.values()), config, failed):
+        pass
+    return {name for name, path in batch.items() if path in failed}
+
+
+def test_hostile_pdfs_are_capped(batch):
+    config = ExtractionConfig(
+        max_workers=2,
+        timeout_s=10,
+        memory_mb=1024,
+        max_pages=10,
+        max_drawings=10_000,
+        max_image_pixels=50_000_000,
+        isolated=True,
+    )
+    assert extract(batch, config) == {"long"}
+
+
+def test_hostile_pdfs_without_caps_fail_alone(batch):
+    config = ExtractionConfig(
+        max_workers=2,
+        timeout_s=10,
+        memory_mb=256,
+        max_pages=10,
+        max_drawings=0,
+        max_image_pixels=0,
+        isolated=True,
+    )
+    failed = extract(batch, config)
+    assert "sound1" not in failed and "sound2" not in failed
+    assert {"bomb", "long"} <= failed
@@ -0,0 +1,98 @@
+"""Tests of the background ingestion jobs: progress, partial results and cancellation."""
+
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("google.genai")
+pytest.importorskip("gradio")
+
+from src.database import db_manipulation, get_job_queue  # noqa: E402
+from src.database.ingestion_jobs import (  # noqa: E402
+    CANCELLED,
+    DONE,
+    EMBEDDING,
+    EXTRACTING,
+    QUEUED,
+    IngestionJob,
+    session_jobs_dir,
+)
+from src.database.job_queue import JobQueue  # noqa: E402
+from src.interface.manage_files import cancel_ingestion, upload_files  # noqa: E402
+
+SESSION_ID = "test_job_queue"
+
+
+def test_upload_runs_in_background_and_cancels(
+    workdir, write_pdf, gradio_files, embedder
+):
+    embedder.latency_s = 0.3
+    sources = {}
+    for num in range(6):
+        sources[f"paper{num}.pdf"] = workdir / f"source_{num}.pdf"
+        write_pdf(sources[f"paper{num}.pdf"], f"Paper {num}")
+
+    start = time.perf_counter()
+    _, saved = upload_files(gradio_files(sources), SESSION_ID)
+    upload_s = time.perf_counter() - start
+
+    # Poll the progress as the UI does, and cancel once two files are ready
+    seen: dict[str, list[str]] = {path: [] for path in saved}
+    while not get_job_queue().wait(SESSION_ID, timeout=0.05):
+        [job] = get_job_queue().jobs(SESSION_ID)
+        for path, progress in job.files.items():
+            if progress.state not in seen[path][-1:]:
+                seen[path].append(progress.state)
+        if job.summary().get(DONE, 0) >= 2 and not job.cancelled:
+            cancel_ingestion(SESSION_ID)
+    ingest_s = time.perf_counter() - start
+
+    [job] = get_job_queue().jobs(SESSION_ID)
+    done = [path for path, p in job.files.items() if p.state == DONE]
+    cancelled = [path for path, p in job.files.items() if p.state == CANCELLED]
+    assert upload_s < ingest_s / 2, "the upload waited for the ingestion"
+    assert len(done) >= 2 and cancelled, "the job was not cancelled part-way"
+    order = [QUEUED, EXTRACTING, EMBEDDING, DONE, CANCELLED]
+    for path, states in seen.items():
+        assert states == sorted(states, key=order.index), Path(path).name
+
+    db = db_manipulation.chroma_client.get_or_create_collection(name=SESSION_ID)
+    stored = {meta["pdf_path"] for meta in db.get(include=["metadatas"])["metadatas"]}
+    assert stored == set(done)
+
+    # A new process reads the finished job back from its file
+    [reloaded] = JobQueue(max_jobs=1, workers=1).jobs(SESSION_ID)
+    assert reloaded.summary() == job.summary()
+
+    db_manipulation.clean_db(SESSION_ID)
+
+
+def test_interrupted_job_is_resumed(workdir, write_pdf, ingest, embedder):
+    session_id = "test_job_queue_resume"
+    pdfs = [workdir / "tmp" / session_id / f"paper{num}.pdf" for num in range(3)]
+    for num, path in enumerate(pdfs):
+        write_pdf(path, f"Paper {num}")
+    ingest(pdfs[:1], session_id)
+    texts_before = embedder.texts
+
+    # A job persisted by a process stopped while it embedded its second file
+    job = IngestionJob.create(session_id, [str(path) for path in pdfs], {})
+    job.set_state(str(pdfs[0]), DONE)
+    job.set_state(str(pdfs[1]), EMBEDDING)
+    job.save(session_jobs_dir(session_id))
+
+    queue = JobQueue(max_jobs=1, workers=1)
+    assert queue.resume() == 1
+    assert queue.wait(session_id, timeout=60)
+    [resumed] = queue.jobs(session_id)
+    assert resumed.summary() == {DONE: 3} and not resumed.error
+
+    db = db_manipulation.chroma_client.get_or_create_collection(name=session_id)
+    stored = {meta["pdf_path"] for meta in db.get(include=["metadatas"])["metadatas"]}
+    assert stored == {str(path) for path in pdfs}
+    assert embedder.texts - texts_before, "the unfinished files were not embedded"
+    assert queue.resume() == 0, "a finished job was queued again"
+
+    db_manipulation.clean_db(session_id)
@@ -0,0 +1,115 @@
+"""Tests of the page classifier on generated PDF pages."""
+
+import fitz
+import pytest
+
+from src.processing import page_classifier
+from src.processing.document_processing import iter_page_records
+from src.processing.extraction_config import ExtractionConfig
+from src.processing.page_classifier import classify_page, paints_paths
+from src.processing.page_layout import PageLayout
+
+
+def text_page(doc: fitz.Document, text: str = "Some text") -> fitz.Page:
+    """Add a page showing a line of text only."""
+    page = doc.new_page()
+    page.insert_text((72, 72), text)
+    return page
+
+
+def drawing_page(doc: fitz.Document, rect: fitz.Rect) -> fitz.Page:
+    """Add a page with a line of text and a filled and stroked rectangle."""
+    page = text_page(doc)
+    page.draw_rect(rect, color=(0, 0, 0), fill=(0.5, 0.5, 1))
+    return page
+
+
+def classify(page: fitz.Page) -> dict:
+    """Decision of the classifier on a page."""
+    decision, _ = classify_page(page, PageLayout(page))
+    return decision
+
+
+@pytest.fixture
+def no_drawings(monkeypatch):
+    """Fail the test if the drawings of a page are extracted."""
+
+    def fail(page):
+        raise AssertionError(f"drawings of page {page.number} extracted")
+
+    monkeypatch.setattr(page_classifier, "page_drawings", fail)
+
+
+def test_text_page_is_skipped_without_extracting_drawings(no_drawings):
+    doc = fitz.open()
+    page = text_page(doc)
+    assert not paints_paths(page)
+    assert classify(page)["reason"] == "no-drawings"
+
+
+def test_image_page_is_skipped_without_extracting_drawings(no_drawings):
+    doc = fitz.open()
+    page = text_page(doc)
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+    pixmap.clear_with(128)
+    page.insert_image(fitz.Rect(100, 100, 400, 400), pixmap=pixmap)
+    assert page.get_images()
+    assert classify(page)["reason"] == "no-drawings"
+
+
+def test_operators_in_text_are_false_positives_only():
+    doc = fitz.open()
+    page = text_page(doc, "f S b* B sh")
+    decision = classify(page)
+    assert decision["reason"] == "no-drawings"
+    assert decision["drawings"] == 0
+
+
+def test_small_drawing_is_too_small():
+    doc = fitz.open()
+    page = drawing_page(doc, fitz.Rect(300, 300, 310, 310))
+    assert paints_paths(page)
+    decision = classify(page)
+    assert decision["drawings"] == 1
+    assert decision["reason"] == "too-small"
+
+
+def test_large_drawing_is_a_candidate():
+    doc = fitz.open()
+    page = drawing_page(doc, fitz.Rect(100, 200, 400, 450))
+    assert classify(page)["reason"] == "candidate"
+
+
+def test_drawing_in_nested_form_is_found():
+    source = fitz.open()
+    drawing_page(source, fitz.Rect(100, 200, 400, 450))
+    wrapper = fitz.open()
+    wrapper.new_page().show_pdf_page(wrapper[0].rect, source, 0)
+    doc = fitz.open()
+    page = doc.new_page()
+    page.show_pdf_page(page.rect, wrapper, 0)
+    assert not page_classifier.PAINT_OPERATOR.search(page.read_contents())
+    assert paints_paths(page)
+    assert classify(page)["reason"] == "candidate"
+
+
+def test_classifier_leaves_the_figures_unchanged(tmp_path):
+    doc = fitz.open()
+    text_page(doc)
+    drawing_page(doc, fitz.Rect(300, 300, 310, 310))
+    drawing_page(doc, fitz.Rect(100, 200, 400, 450))
+    pdf_path = str(tmp_path / "generated.pdf")
+    doc.save(pdf_path)
+
+    def graphics(classify_pages: bool) -> list[str]:
+        config = ExtractionConfig(
+            max_workers=1,
+            classify_pages=classify_pages,
+            asset_dir=str(tmp_path / f"assets-{classify_pages}"),
+        )
+        records = iter_page_records(pdf_path, config=config)
+        return sorted(fig.name for record in records for fig in record.graphics)
+
+    reference = graphics(classify_pages=False)
+    assert reference
+    assert graphics(classify_pages=True) == reference
@@ -0,0 +1,41 @@
+"""Tests that uploads are deduplicated by content before being parsed."""
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("google.genai")
+pytest.importorskip("gradio")
+
+from src.database import db_manipulation  # noqa: E402
+
+SESSION_ID = "test_upload_dedupe"
+
+
+def test_duplicates_are_dropped_before_parsing(workdir, write_pdf, upload):
+    sources = {}
+    for title in ("a", "b", "c-d", "c_d", "a, second version"):
+        sources[title] = workdir / f"source_{len(sources)}.pdf"
+        write_pdf(sources[title], f"Document {title}")
+
+    first = upload({"a.pdf": sources["a"], "b.pdf": sources["b"]}, SESSION_ID)
+    assert first["saved"] == ["a.pdf", "b.pdf"] and first["embedded"]
+
+    again = upload({"a.pdf": sources["a"], "b.pdf": sources["b"]}, SESSION_ID)
+    assert not again["saved"] and not again["embedded"]
+
+    copy = upload({"a (copy).pdf": sources["a"]}, SESSION_ID)
+    assert not copy["saved"] and not copy["embedded"], "a renamed copy was ingested"
+
+    # Different files whose names sanitise to the same one are both kept
+    clash = upload({"c-d.pdf": sources["c-d"], "c_d.pdf": sources["c_d"]}, SESSION_ID)
+    assert clash["saved"] == ["c_d.pdf", "c_d_2.pdf"]
+
+    revised = upload({"a.pdf": sources["a, second version"]}, SESSION_ID)
+    assert revised["saved"] == ["a.pdf"] and revised["embedded"]
+
+    upload_dir = workdir / "tmp" / SESSION_ID
+    saved = sorted(path.name for path in upload_dir.glob("*.pdf"))
+    assert saved == ["a.pdf", "b.pdf", "c_d.pdf", "c_d_2.pdf"]
+    assert not any(upload_dir.glob(".upload_*")), "staged uploads were left behind"
+
+    db_manipulation.clean_db(SESSION_ID)